@@ -0,0 +1,139 @@
+## tìm chuỗi giá xấu nhất cho tỉ số cạnh tranh CR = doanh thu ALG / doanh thu Offline
+## tiến hoá (evolution strategy) trên quần thể chuỗi giá trong [m, M]:
+##   mỗi thế hệ giữ lại nhóm elite (CR thấp nhất), sinh con bằng lai ghép + đột biến
+## đánh giá cả quần thể 1 lần bằng plan() (vector hoá) + doanh thu kỳ vọng theo δ (công thức đóng)
+## => CR không nhiễu, so sánh được giữa các thế hệ
+## workers > 1: chia quần thể cho ProcessPoolExecutor, thuật toán chỉ gửi sang worker 1 lần
+
+import math
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from algorithms.base import Algorithm
+from algorithms.offline import Offline
+from models import WorstCaseResult
+
+
+def competitive_ratios(algorithm: Algorithm, offline: Offline, prices: np.ndarray) -> np.ndarray:
+    """Expected-revenue ratio ALG / Offline for every row of a (candidates, n) price matrix."""
+    prices = np.atleast_2d(np.asarray(prices, dtype=float))
+    alg_revenue = algorithm.demand.expected_revenue(prices, algorithm.plan(prices))
+    offline_revenue = offline.demand.expected_revenue(prices, offline.plan(prices))
+    return np.where(offline_revenue > 0, alg_revenue / np.where(offline_revenue > 0, offline_revenue, 1.0), 1.0)
+
+
+# thuật toán của mỗi process worker (gán trong initializer)
+_worker_algorithms = None
+
+
+def _init_worker(algorithm: Algorithm, offline: Offline):
+    global _worker_algorithms
+    _worker_algorithms = (algorithm, offline)
+
+
+def _evaluate_in_worker(prices: np.ndarray) -> np.ndarray:
+    return competitive_ratios(*_worker_algorithms, prices)
+
+
+class AdversarialSearch:
+    def __init__(self, algorithm: Algorithm, offline: Offline, n: int, population: int = 256,
+                 elite: int = 32, generations: int = 200, mutation: float = 0.15,
+                 workers: int = 1, keep: int = 5, seed: int = 0):
+        if not algorithm.batch_capable:
+            raise ValueError(f"{algorithm.name()} has no array engine (batch_capable = False)")
+
+        self.algorithm = algorithm
+        self.offline = offline
+        self.n = n
+        self.population = population
+        self.elite = min(elite, population)
+        self.generations = generations
+        self.mutation = mutation
+        self.workers = workers
+        self.keep = keep
+        self.seed = seed
+
+        self.m = algorithm.m
+        self.M = algorithm.M
+
+    def _initial_population(self, rng: np.random.Generator) -> np.ndarray:
+        # ngẫu nhiên đều + vài chuỗi có cấu trúc (tăng dần, giảm dần, thấp rồi vọt lên M)
+        population = rng.uniform(self.m, self.M, (self.population, self.n))
+        ramp = np.linspace(0.0, 1.0, self.n)
+        seeds = [self.m + (self.M - self.m) * ramp, self.M - (self.M - self.m) * ramp]
+        for jump in np.linspace(0.25, 0.9, 4):
+            seeds.append(np.where(ramp < jump, self.m + 0.1 * (self.M - self.m), self.M))
+        seeds = np.array(seeds)[:self.population]
+        population[:len(seeds)] = seeds
+        return population
+
+    def _offspring(self, rng: np.random.Generator, elites: np.ndarray, step: float) -> np.ndarray:
+        count = self.population - len(elites)
+        parents = elites[rng.integers(len(elites), size=count)]
+        partners = elites[rng.integers(len(elites), size=count)]
+
+        # lai ghép 1 điểm cắt
+        cut = rng.integers(1, max(self.n, 2), size=(count, 1))
+        children = np.where(np.arange(self.n) < cut, parents, partners)
+
+        # đột biến Gauss + thỉnh thoảng kéo 1 kỳ về biên m hoặc M (chuỗi xấu nhất hay nằm trên biên)
+        children = children + rng.normal(0.0, step * (self.M - self.m), children.shape)
+        to_bound = rng.random(children.shape) < 1.0 / self.n
+        children = np.where(to_bound, np.where(rng.random(children.shape) < 0.5, self.m, self.M), children)
+        return np.clip(children, self.m, self.M)
+
+    def _evaluate(self, population: np.ndarray, pool) -> np.ndarray:
+        if pool is None:
+            return competitive_ratios(self.algorithm, self.offline, population)
+        parts = np.array_split(population, self.workers)
+        return np.concatenate(list(pool.map(_evaluate_in_worker, parts)))
+
+    def run(self, progress: bool = False) -> WorstCaseResult:
+        rng = np.random.default_rng(self.seed)
+        population = self._initial_population(rng)
+
+        pool = None
+        if self.workers > 1:
+            pool = ProcessPoolExecutor(self.workers, initializer=_init_worker,
+                                       initargs=(self.algorithm, self.offline))
+
+        worst_prices = np.empty((0, self.n))
+        worst_ratios = np.empty(0)
+        history = []
+        evaluations = 0
+        carried = 0  # số elite đầu population đã có trong worst_* từ thế hệ trước
+
+        try:
+            for generation in range(self.generations):
+                ratios = self._evaluate(population, pool)
+                evaluations += len(population)
+
+                # giữ `keep` chuỗi xấu nhất từ trước tới giờ; elite được đánh giá lại mỗi thế hệ
+                # => chỉ thêm con mới, nếu không danh sách toàn bản sao của 1 chuỗi
+                worst_prices = np.vstack([worst_prices, population[carried:]])
+                worst_ratios = np.concatenate([worst_ratios, ratios[carried:]])
+                order = np.argsort(worst_ratios)[:self.keep]
+                worst_prices, worst_ratios = worst_prices[order], worst_ratios[order]
+                history.append(float(worst_ratios[0]))
+
+                if progress and generation % 10 == 0:
+                    print(f"Log: generation {generation}: worst CR = {worst_ratios[0]:.4f}")
+
+                # bước đột biến giảm dần theo thế hệ
+                step = self.mutation * (1.0 - generation / self.generations) + 0.01
+                elites = population[np.argsort(ratios)[:self.elite]]
+                population = np.vstack([elites, self._offspring(rng, elites, step)])
+                carried = len(elites)
+        finally:
+            if pool is not None:
+                pool.shutdown()
+
+        return WorstCaseResult(
+            name=self.algorithm.name(),
+            bound=1.0 / (1.0 + math.log(self.M / self.m)),
+            prices=worst_prices,
+            ratios=worst_ratios,
+            history=history,
+            evaluations=evaluations,
+        )
@@ -1,9 +1,132 @@
-# hàng thêm , ko cần để ý
+## Myopic nhưng không biết trước a, b: học đường cầu E[D | p] = a - b·p từ (giá, doanh số) đã quan sát
+## RLS (recursive least squares) có hệ số quên λ: θ = (a, b), φ = (1, -p), mỗi kỳ O(1) thời gian + bộ nhớ
+##   g = Pφ / (λ + φᵀPφ),  θ += g (y - φᵀθ),  P = (P - g φᵀP) / λ
+## doanh số bị chặn bởi lượng lấy ra (censored): chỉ dùng kỳ sales < retrieval thì lệch thấp (E[δ | D < r] < 1),
+##   và prior thấp + lấy 1.2·d̂ => gần như kỳ nào cũng bị chặn, ước lượng đứng yên
+## => kiểu EM / Tobit: sales < retrieval thì y = sales (demand thật); sales == retrieval (= r) thì chỉ biết D >= r,
+##   thay bằng y = E[D | D >= r] theo ước lượng hiện tại = d̂ (E[δ] - E[δ ; δ < r/d̂]) / P(δ >= r/d̂)
+##   mô hình hiện tại cho P(D >= r) = 0 (d̂ quá thấp) -> y = r: kéo ước lượng lên phía lượng đã bán hết
+## quyết định: lấy min(I, max(1.2·d̂, I / số kỳ còn lại)) => kỳ cuối bán hết
+## prior θ_0: (a, b) cho trước, hoặc mặc định (a·(1 - e), b·(1 + e)) với e = prior_error (sai lệch so với đường
+##   cầu thật: ước lượng thấp cầu ở mọi giá) => chính sách thực sự phải học; độ bất định prior_scale * |θ_0|
+## state reset khi t == 1 (kịch bản mới)
+
+import numpy as np
+
+from .base import Algorithm
+from simulator import run_lockstep
+from tracing import TraceSink, trace_matrix
+
+
+def _rls_update(state, price, y, forgetting: float):
+    # chạy được cho float lẫn mảng (kịch bản) -> dùng chung cho đường scalar và lockstep
+    a, b, p11, p12, p22 = state
+    # Pφ với φ = (1, -p)
+    k1 = p11 - p12 * price
+    k2 = p12 - p22 * price
+    denominator = forgetting + k1 - k2 * price
+    g1, g2 = k1 / denominator, k2 / denominator
+    error = y - (a - b * price)
+    return (a + g1 * error, b + g2 * error,
+            (p11 - g1 * k1) / forgetting, (p12 - g1 * k2) / forgetting, (p22 - g2 * k2) / forgetting)
+
+
+def _censored_target(demand, a, b, prices, retrievals, sales):
+    # y cho RLS: sales nếu không bị chặn, ngược lại E[D | D >= retrieval] theo (a, b) hiện tại
+    forecast = a - b * prices
+    z = retrievals / np.where(forecast > 0, forecast, 1.0)
+    tail = np.where(forecast > 0, 1.0 - demand.fluctuation_cdf(z), 0.0)
+    mean = demand.partial_expectation(demand.upper)
+    conditional = forecast * (mean - demand.partial_expectation(z)) / np.where(tail > 0, tail, 1.0)
+    # E[δ | δ >= z] nằm trong [z, 1+Δ]; tail = 0 => y = r
+    imputed = np.where(tail > 0, np.clip(conditional, retrievals, np.maximum(retrievals, forecast * demand.upper)),
+                       retrievals)
+    return np.where(sales < retrievals, sales, imputed)
+
 
 class AdaptiveMyopic(Algorithm):
+    batch_capable = True
+    uses_feedback = True
+
+    def __init__(self, Q, m, M, demand, forgetting: float = 0.98, prior_scale: float = 0.5,
+                 prior=None, prior_error: float = 0.3):
+        """prior: initial (a, b) guess; None => the true curve misspecified by prior_error."""
+        super().__init__(Q, m, M, demand)
+        self.forgetting = forgetting
+        self.prior_scale = prior_scale
+        if prior is None:
+            prior = (float(demand.a) * (1 - prior_error), float(demand.b) * (1 + prior_error))
+        self.prior = tuple(float(v) for v in prior)
+        self._state = self._prior(None)
+
     def name(self) -> str:
         return "Adaptive-Myopic"
 
+    def _prior(self, size):
+        # (a, b, P11, P12, P22); size None => float cho đường scalar
+        a, b = self.prior
+        values = (a, b, (self.prior_scale * a) ** 2, 0.0, (self.prior_scale * b) ** 2)
+        if size is None:
+            return values
+        return tuple(np.full(size, v) for v in values)
+
+    @property
+    def estimate(self):
+        """Current (a, b) estimate (arrays after a lockstep run)."""
+        return self._state[0], self._state[1]
+
+    # --- SCALAR ---
+
     def decide(self, t: int, n: int, price: float, inventory: float, cumulative: float) -> float:
+        if t == 1 or isinstance(self._state[0], np.ndarray):
+            self._state = self._prior(None)
+        a, b = self._state[0], self._state[1]
+        forecast = max(a - b * price, 0.0)
+        return min(inventory, max(1.2 * forecast, inventory / (n - t + 1)))
+
+    def observe(self, t: int, price: float, retrieval: float, sales: float):
+        # retrieval = 0: chỉ biết D >= 0, không có thông tin
+        if retrieval > 0:
+            y = float(_censored_target(self.demand, self._state[0], self._state[1], price, retrieval, sales))
+            self._state = _rls_update(self._state, price, y, self.forgetting)
+
+    def observe_chunk(self, t0: int, prices, retrievals, sales):
+        # decide_chunk mặc định gọi decide từng kỳ: trong run_long phản hồi tới theo đoạn (trễ <= chunk_size kỳ)
+        for price, retrieval, sold in zip(np.asarray(prices).tolist(), np.asarray(retrievals).tolist(),
+                                          np.asarray(sales).tolist()):
+            self.observe(0, price, retrieval, sold)
+
+    # --- LOCKSTEP (nhiều kịch bản cùng kỳ t) ---
+
+    def decide_batch(self, t: int, n: int, prices, inventory, cumulative) -> np.ndarray:
+        prices, inventory = np.broadcast_arrays(np.asarray(prices, dtype=float), np.asarray(inventory, dtype=float))
+        if t == 1 or np.shape(self._state[0]) != prices.shape:
+            self._state = self._prior(prices.shape)
+        a, b = self._state[0], self._state[1]
+        forecast = np.maximum(a - b * prices, 0.0)
+        inventory = np.maximum(inventory, 0.0)
+        return np.minimum(inventory, np.maximum(1.2 * forecast, inventory / (n - t + 1)))
+
+    def observe_batch(self, t: int, prices, retrievals, sales):
+        informative = retrievals > 0
+        if not np.any(informative):
+            return
+        y = _censored_target(self.demand, self._state[0], self._state[1], prices, retrievals, sales)
+        updated = _rls_update(self._state, prices, y, self.forgetting)
+        self._state = tuple(np.where(informative, new, old) for new, old in zip(updated, self._state))
+
+    def run_matrix(self, prices: np.ndarray, fluctuations: np.ndarray = None, sink: TraceSink = None):
+        # quyết định phụ thuộc doanh số đã thấy => không có plan() khép kín, bước từng kỳ cùng δ
+        prices = np.atleast_2d(np.asarray(prices, dtype=float))
+        if fluctuations is None:
+            fluctuations = self.demand.sample_fluctuations(prices.shape)
+        actual_demand = self.demand.expected_array(prices) * fluctuations
+
+        retrievals = run_lockstep([self], prices, actual_demand)[self.name()]
+        if sink is not None:
+            trace_matrix(sink, self, prices, retrievals, fluctuations)
+        return retrievals, prices * np.minimum(retrievals, actual_demand)
 
-        pass
\ No newline at end of file
+    def plan(self, prices: np.ndarray) -> np.ndarray:
+        # analytic mode: vẫn cần doanh số để học -> rút δ cho đường học, doanh thu tính kỳ vọng bên ngoài
+        return self.run_matrix(prices)[0]
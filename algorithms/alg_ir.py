@@ -1,13 +1,19 @@
+import math
 import numpy as np
 from scipy.optimize import brentq
 from .base import Algorithm
+from .roots import bisect_decreasing, newton_decreasing_scalar
 
 
 class ALG_IR(Algorithm):
+    batch_capable = True
+
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         # Threshold tĩnh: Q / (1 + ln(theta))
         self.threshold = self.Q / (1 + np.log(self.theta))
+        # hệ số mũ của phi: (1 + ln(theta)) / Q
+        self._growth = (1 + math.log(self.theta)) / self.Q
 
     def name(self) -> str:
         return "ALG-IR"
@@ -94,6 +100,9 @@ class ALG_IR(Algorithm):
             # Line 14: Check luật phòng thủ
             if price <= phi_val:
                 retrieval = 0.0
+            elif self.demand.distribution == "uniform":
+                # Uniform: Newton thuần Python, không qua scipy
+                retrieval = self._stage_2_scalar(price, base_demand, inventory, cumulative)
             else:
                 # Line 17: Giải phương trình pi'(x) = phi(y + x)
                 # Tìm x sao cho: marginal_revenue(x) - phi(cumulative + x) = 0
@@ -122,6 +131,114 @@ class ALG_IR(Algorithm):
         # Đảm bảo không bán quá tồn kho
         return max(0.0, min(retrieval, inventory))
 
+    def _stage_2_scalar(self, price: float, base_demand: float, inventory: float, cumulative: float) -> float:
+        # pi'(x) = phi(y + x) với delta ~ Uniform, cùng nghiệm với nhánh brentq
+        lower, upper = 1 - self.delta, 1 + self.delta
+        m, threshold, growth = self.m, self.threshold, self._growth
+        # delta = 0: pi'(x) là bậc thang tại x = a-bp (slope = 0, newton tự lùi về chia đôi)
+        slope = price / (base_demand * (upper - lower)) if upper > lower else 0.0
+
+        def phi(y):
+            return m if y < threshold else m * math.exp(y * growth - 1)
+
+        def equation(x):
+            z = x / base_demand
+            mr = price if z < lower else (0.0 if z >= upper else price - slope * (x - lower * base_demand))
+            return mr - phi(cumulative + x)
+
+        def derivative(x):
+            z = x / base_demand
+            y = cumulative + x
+            return (-slope if lower <= z <= upper else 0.0) - (0.0 if y < threshold else phi(y) * growth)
+
+        if equation(0.0) < 0: return 0.0
+        if equation(inventory) > 0: return inventory
+        # pi'(x) = 0 khi x > (a-bp)(1+Δ) => nghiệm nằm trong [0, min(inventory, (a-bp)(1+Δ))]
+        return newton_decreasing_scalar(equation, derivative, 0.0, min(inventory, base_demand * upper))
+
+    def decide_chunk(self, t0: int, n: int, prices, inventory: float, cumulative: float) -> np.ndarray:
+        # x_1(p) của cả đoạn tính 1 lần (vector), vòng lặp chỉ còn check stage + Stage 2
+        prices = np.asarray(prices, dtype=float)
+        x_candidates = self.stage_1_batch(prices).tolist()
+        base_demands = self.demand.expected_array(prices).tolist()
+        retrievals = np.empty(len(prices))
+
+        for k, price in enumerate(prices.tolist()):
+            t = t0 + k
+            if t == n:
+                retrieval = inventory
+            elif base_demands[k] <= 0:
+                retrieval = 0.0
+            elif cumulative + x_candidates[k] <= self.threshold:
+                retrieval = x_candidates[k]
+            else:
+                retrieval = self.decide(t, n, price, inventory, cumulative)
+
+            retrieval = max(0.0, min(retrieval, inventory))
+            retrievals[k] = retrieval
+            inventory -= retrieval
+            cumulative += retrieval
+
+        return retrievals
+
+    # --- BẢN VECTOR HOÁ (mảng giá / cumulative cùng shape) ---
+
+    def phi_array(self, y) -> np.ndarray:
+        y = np.asarray(y, dtype=float)
+        exponent = (y * (1 + np.log(self.theta)) / self.Q) - 1
+        return np.where(y < self.threshold, self.m, self.m * np.exp(exponent))
+
+    def stage_1_batch(self, prices) -> np.ndarray:
+        # x_1 = (a-bp) * F^-1(1 - m/p), = 0 nếu p <= m
+        prices = np.asarray(prices, dtype=float)
+        safe_price = np.where(prices > self.m, prices, self.m + 1.0)
+        factor = self.demand.fluctuation_ppf(1 - self.m / safe_price)
+        return np.where(prices > self.m, self.demand.expected_array(prices) * factor, 0.0)
+
+    def stage_2_batch(self, prices, inventory, cumulative) -> np.ndarray:
+        # Giải pi'(x) = phi(y + x) cho từng phần tử, g(x) giảm dần theo x
+        prices, inventory, cumulative = np.broadcast_arrays(
+            np.asarray(prices, dtype=float),
+            np.asarray(inventory, dtype=float),
+            np.asarray(cumulative, dtype=float),
+        )
+        base_demand = self.demand.expected_array(prices)
+        safe_base = np.where(base_demand > 0, base_demand, 1.0)
+        solve = (base_demand > 0) & (prices > self.phi_array(cumulative))
+
+        def equation(x):
+            mr = prices * (1 - self.demand.fluctuation_cdf(x / safe_base))
+            return mr - self.phi_array(cumulative + x)
+
+        retrieval = np.zeros_like(prices)
+        if np.any(solve):
+            sell_all = equation(inventory) > 0
+            root = bisect_decreasing(equation, 0.0, np.minimum(inventory, base_demand * (1 + self.delta)))
+            retrieval = np.where(solve, np.where(sell_all, inventory, root), 0.0)
+        return retrieval
+
+    def decide_batch(self, t: int, n: int, prices, inventory, cumulative) -> np.ndarray:
+        """Same rule as decide(), element-wise over arrays of prices / inventory / cumulative."""
+        prices, inventory, cumulative = np.broadcast_arrays(
+            np.asarray(prices, dtype=float),
+            np.asarray(inventory, dtype=float),
+            np.asarray(cumulative, dtype=float),
+        )
+        if t == n:
+            return inventory.copy()
+
+        x_candidate = self.stage_1_batch(prices)
+        is_stage_1 = (cumulative + x_candidate) <= self.threshold
+
+        retrieval = x_candidate.copy()
+        if not np.all(is_stage_1):
+            retrieval[~is_stage_1] = self.stage_2_batch(
+                prices[~is_stage_1], inventory[~is_stage_1], cumulative[~is_stage_1]
+            )
+
+        retrieval = np.where(self.demand.expected_array(prices) > 0, retrieval, 0.0)
+        return np.clip(retrieval, 0.0, np.maximum(inventory, 0.0))
+
     # Cần thêm property delta vào Algorithm base hoặc lấy từ demand model
     @property
     def delta(self):
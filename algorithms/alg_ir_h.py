@@ -1,16 +1,62 @@
+import math
 import numpy as np
-from scipy.optimize import brentq
 from .base import Algorithm
+from .roots import newton_decreasing, newton_decreasing_scalar
 
 
 class ALG_IR_H(Algorithm):
-    def __init__(self, Q, m, M, demand, h: float):
+    batch_capable = True
+
+    def __init__(self, Q, m, M, demand, h: float, n: int = None):
         super().__init__(Q, m, M, demand)
         self.h = h
 
+        # Tham số theo kỳ (m_t, M_t, theta_t, threshold_t) chỉ phụ thuộc t => tính sẵn cho cả horizon
+        # Từ kỳ m_t <= 0 trở đi (hoặc mọi kỳ nếu h = 0) tham số không đổi => bảng chỉ cần dài tới đó
+        self._saturation = 1 if h <= 0 else int(np.ceil((m - 1e-9) / h)) + 1
+        self.horizon = 0
+        if n is not None:
+            self._ensure_schedule(n)
+
     def name(self) -> str:
         return "ALG-IR-H"
 
+    # --- BẢNG THAM SỐ THEO KỲ ---
+
+    def _build_schedule(self, length: int):
+        past_periods = np.arange(length, dtype=float)  # t - 1
+        m_t = self.m - past_periods * self.h
+        M_t = self.M - past_periods * self.h
+
+        # Nếu chi phí tồn kho ăn hết giá sàn -> kỳ đó bán tháo (alive = False)
+        alive = m_t > 1e-9
+        safe_m_t = np.where(alive, m_t, 1.0)
+        log_theta_t = np.where(alive, np.log(np.where(alive, M_t, 1.0) / safe_m_t), 0.0)
+
+        self.horizon = length
+        self.m_t = m_t
+        self.M_t = M_t
+        self.alive_t = alive
+        self.log_theta_t = log_theta_t
+        self.theta_t = np.exp(log_theta_t)
+        self.threshold_t = self.Q / (1 + log_theta_t)
+
+        # bản list cho đường scalar (decide / phi_h)
+        self._m_list = m_t.tolist()
+        self._log_theta_list = log_theta_t.tolist()
+        self._threshold_list = self.threshold_t.tolist()
+
+    def _ensure_schedule(self, t: int):
+        length = min(t, self._saturation)
+        if length > self.horizon:
+            self._build_schedule(max(length, min(2 * self.horizon, self._saturation)))
+
+    def _k(self, t: int) -> int:
+        # chỉ số trong bảng cho kỳ t
+        return min(t, self._saturation) - 1
+
+    # --- CÁC HÀM PHỤ TRỢ ---
+
     def inverse_cdf(self, u: float) -> float:
         return (1 - self.delta) + u * 2 * self.delta
 
@@ -30,22 +76,18 @@ class ALG_IR_H(Algorithm):
         return mr_pure - holding_cost_sunk
 
     def phi_h(self, y: float, t: int, n: int) -> float:
-        past_periods = t - 1
-        m_t = self.m - past_periods * self.h
-        M_t = self.M - past_periods * self.h
+        self._ensure_schedule(max(t, n))
+        m_t = self._m_list[self._k(t)]
 
         # Nếu chi phí tồn kho ăn hết giá sàn -> Giá trị hàng về 0
         if m_t <= 1e-9:
             return 0.0
 
-        theta_t = M_t / m_t
         # Threshold phụ thuộc vào t (Horizon)
-        threshold_t = self.Q / (1 + np.log(theta_t))
-
-        if y < threshold_t:
+        if y < self._threshold_list[self._k(t)]:
             return m_t
 
-        exponent = (y * (1 + np.log(theta_t)) / self.Q) - 1
+        exponent = (y * (1 + self._log_theta_list[self._k(t)]) / self.Q) - 1
         return m_t * np.exp(exponent)
 
     def decide(self, t: int, n: int, price: float, inventory: float, cumulative: float) -> float:
@@ -56,23 +98,17 @@ class ALG_IR_H(Algorithm):
         base_demand = self.demand.expected(price)
         if base_demand <= 0: return 0.0
 
-        # Tính toán tham số động
-        past_periods = t - 1
-        m_t = self.m - past_periods * self.h
-        M_t = self.M - past_periods * self.h
+        # Tham số động lấy từ bảng
+        self._ensure_schedule(n)
+        m_t = self._m_list[self._k(t)]
 
         if m_t <= 1e-9: return inventory  # Bán tháo nếu lỗ phí kho
 
-        theta_t = M_t / m_t
-        threshold_t = self.Q / (1 + np.log(theta_t))
+        threshold_t = self._threshold_list[self._k(t)]
 
         # --- GIAI ĐOẠN 1 (While Loop trong Paper) ---
-        # Kiểm tra điều kiện ngưỡng
-        # Tính x dự kiến (Stage 1 retrieval)
-        p_net = price - past_periods * self.h
-
-        # --- STAGE 1: Lines 3-11 (While Loop) ---
-
+        # Tính x dự kiến (Stage 1 retrieval) theo giá ròng
+        p_net = price - (t - 1) * self.h
 
         if p_net <= m_t:
             x_candidate = 0.0
@@ -89,26 +125,121 @@ class ALG_IR_H(Algorithm):
         phi_val = self.phi_h(cumulative, t, n)
 
         # Line 14: Check điều kiện giá
-        # Cực kỳ quan trọng: So sánh Net Price vs Net Opportunity Cost
-        # Nếu p_net <= phi_val thì không bán
         if price <= phi_val:
             return 0.0
-        else:
-            # Line 17: Giải phương trình Pi'_t(x) = phi^h(y+x)
-            def equation(x):
-                lhs = self.marginal_revenue_net(x, price, t)
-                rhs = self.phi_h(cumulative + x, t, n)
-                return lhs - rhs
 
-            try:
-                # Kiểm tra biên
-                if equation(0) < 0: return 0.0
-                if equation(inventory) > 0: return inventory
+        # Line 17: Giải phương trình Pi'_t(x) = phi^h(y+x)
+        return self._stage_2_scalar(t, price, base_demand, inventory, cumulative)
+
+    def _stage_2_scalar(self, t: int, price: float, base_demand: float, inventory: float,
+                        cumulative: float, xtol: float = 1e-9, maxiter: int = 50) -> float:
+        # Newton có chặn (rtsafe) thuần Python, cùng công thức với stage_2_batch
+        lower, upper = 1 - self.delta, 1 + self.delta
+        sunk = (t - 1) * self.h
+        m_t = self._m_list[self._k(t)]
+        threshold_t = self._threshold_list[self._k(t)]
+        growth = (1 + self._log_theta_list[self._k(t)]) / self.Q
+
+        def phi(y):
+            return m_t if y < threshold_t else m_t * math.exp(y * growth - 1)
+
+        def equation(x):
+            return price * (1 - self.cdf(x / base_demand)) - sunk - phi(cumulative + x)
+
+        def derivative(x):
+            z = x / base_demand
+            d_mr = -price / (base_demand * (upper - lower)) if lower <= z <= upper else 0.0
+            y = cumulative + x
+            return d_mr - (0.0 if y < threshold_t else phi(y) * growth)
+
+        if equation(0.0) < 0: return 0.0
+        if equation(inventory) > 0: return inventory
+
+        # MR ròng <= 0 khi x > (a-bp)(1+Δ) => nghiệm nằm trong [0, min(inventory, (a-bp)(1+Δ))]
+        x = newton_decreasing_scalar(equation, derivative, 0.0, min(inventory, base_demand * upper), xtol, maxiter)
+        return max(0.0, min(x, inventory))
+
+    # --- BẢN VECTOR HOÁ (nhiều kịch bản cùng kỳ t) ---
+
+    def phi_h_batch(self, y, t: int) -> np.ndarray:
+        self._ensure_schedule(t)
+        y = np.asarray(y, dtype=float)
+        if not self.alive_t[self._k(t)]:
+            return np.zeros_like(y)
+
+        m_t = self.m_t[self._k(t)]
+        exponent = (y * (1 + self.log_theta_t[self._k(t)]) / self.Q) - 1
+        return np.where(y < self.threshold_t[self._k(t)], m_t, m_t * np.exp(exponent))
+
+    def stage_2_batch(self, t: int, prices, inventory, cumulative) -> np.ndarray:
+        """Solve Pi'_t(x) = phi^h(y + x) on [0, inventory] with a safeguarded Newton step."""
+        prices, inventory, cumulative = np.broadcast_arrays(
+            np.asarray(prices, dtype=float),
+            np.asarray(inventory, dtype=float),
+            np.asarray(cumulative, dtype=float),
+        )
+        self._ensure_schedule(t)
+        base_demand = self.demand.expected_array(prices)
+        safe_base = np.where(base_demand > 0, base_demand, 1.0)
+        lower, upper = 1 - self.delta, 1 + self.delta
+        sunk = (t - 1) * self.h
+        growth = (1 + self.log_theta_t[self._k(t)]) / self.Q
+        threshold_t = self.threshold_t[self._k(t)]
+
+        def equation(x):
+            z = x / safe_base
+            mr_net = prices * (1 - np.clip((z - lower) / (upper - lower), 0.0, 1.0)) - sunk
+            return mr_net - self.phi_h_batch(cumulative + x, t)
+
+        def derivative(x):
+            z = x / safe_base
+            inside = (z >= lower) & (z <= upper)
+            d_mr = np.where(inside, -prices / (safe_base * (upper - lower)), 0.0)
+            y = cumulative + x
+            d_phi = np.where(y < threshold_t, 0.0, self.phi_h_batch(y, t) * growth)
+            return d_mr - d_phi
+
+        g_low = equation(np.zeros_like(prices))
+        g_high = equation(inventory)
+
+        retrieval = newton_decreasing(equation, derivative, 0.0, np.minimum(inventory, base_demand * upper))
+        retrieval = np.where(g_high > 0, inventory, retrieval)
+        retrieval = np.where(g_low < 0, 0.0, retrieval)
+        return np.clip(retrieval, 0.0, np.maximum(inventory, 0.0))
+
+    def decide_batch(self, t: int, n: int, prices, inventory, cumulative) -> np.ndarray:
+        """Same rule as decide(), element-wise over arrays of prices / inventory / cumulative."""
+        prices, inventory, cumulative = np.broadcast_arrays(
+            np.asarray(prices, dtype=float),
+            np.asarray(inventory, dtype=float),
+            np.asarray(cumulative, dtype=float),
+        )
+        if t == n:
+            return inventory.copy()
+
+        self._ensure_schedule(n)
+        base_demand = self.demand.expected_array(prices)
+        if not self.alive_t[self._k(t)]:
+            return np.where(base_demand > 0, inventory, 0.0)
+
+        m_t = self.m_t[self._k(t)]
+        p_net = prices - (t - 1) * self.h
+
+        # Stage 1
+        safe_p_net = np.where(p_net > m_t, p_net, m_t + 1.0)
+        x_candidate = np.where(p_net > m_t, base_demand * self.inverse_cdf(1 - m_t / safe_p_net), 0.0)
+        is_stage_1 = (cumulative + x_candidate) <= self.threshold_t[self._k(t)]
+
+        # Stage 2
+        retrieval = x_candidate.copy()
+        solve = ~is_stage_1 & (prices > self.phi_h_batch(cumulative, t))
+        retrieval[~is_stage_1] = 0.0
+        if np.any(solve):
+            retrieval[solve] = self.stage_2_batch(t, prices[solve], inventory[solve], cumulative[solve])
 
-                return brentq(equation, 0, inventory)
-            except (ValueError, RuntimeError):
-                return 0.0
+        retrieval = np.where(base_demand > 0, retrieval, 0.0)
+        return np.clip(retrieval, 0.0, np.maximum(inventory, 0.0))
 
     @property
     def delta(self):
-        return self.demand.delta
\ No newline at end of file
+        return self.demand.delta
@@ -9,10 +9,12 @@
 
 from abc import ABC, abstractmethod
 import numpy as np
-from typing import List
-from models import AlgorithmResult
+from typing import List, Iterable
+from models import AlgorithmResult, LongRunResult
+from tracing import TraceSink, trace_matrix
+from simulator import simulate_scenario
 
-from scipy.stats import truncnorm, uniform
+from scipy.stats import truncnorm, uniform, norm
 
 
 class DemandModel:
@@ -42,6 +44,53 @@ class DemandModel:
     def expected(self, price: float) -> float:
         return max(0.0, self.a - self.b * price)
 
+    # Bản vector của expected(), cdf/ppf của δ (nhận mảng numpy)
+    def expected_array(self, prices) -> np.ndarray:
+        return np.maximum(0.0, self.a - self.b * np.asarray(prices, dtype=float))
+
+    def fluctuation_cdf(self, z) -> np.ndarray:
+        z = np.asarray(z, dtype=float)
+        if self.distribution == "truncnorm":
+            return self.truncnorm.cdf(z)
+        if self.delta == 0:
+            return (z >= self.lower).astype(float)
+        return np.clip((z - self.lower) / (self.upper - self.lower), 0.0, 1.0)
+
+    def fluctuation_ppf(self, u) -> np.ndarray:
+        u = np.asarray(u, dtype=float)
+        if self.distribution == "truncnorm":
+            return self.truncnorm.ppf(u)
+        return self.lower + u * (self.upper - self.lower)
+
+    # E[δ ; δ <= z] = ∫_{1-Δ}^{z} δ f(δ) dδ (kỳ vọng riêng phần, tính đúng không tích phân số)
+    def partial_expectation(self, z) -> np.ndarray:
+        z = np.clip(np.asarray(z, dtype=float), self.lower, self.upper)
+        if self.distribution == "truncnorm":
+            alpha = (self.lower - 1) / self.sigma
+            beta = (self.upper - 1) / self.sigma
+            beta_z = (z - 1) / self.sigma
+            mass = norm.cdf(beta) - norm.cdf(alpha)
+            return ((norm.cdf(beta_z) - norm.cdf(alpha))
+                    + self.sigma * (norm.pdf(alpha) - norm.pdf(beta_z))) / mass
+        if self.delta == 0:
+            return (z >= self.upper).astype(float)
+        return (z ** 2 - self.lower ** 2) / (2 * (self.upper - self.lower))
+
+    # E[min(x, (a-bp)δ)]: lượng bán kỳ vọng khi lấy ra x đơn vị
+    # base: (a-bp) đã tính sẵn (MultiPolicySimulator dùng chung cho mọi thuật toán)
+    def expected_sales(self, retrievals, prices, base=None) -> np.ndarray:
+        retrievals = np.asarray(retrievals, dtype=float)
+        base = self.expected_array(prices) if base is None else base
+        safe_base = np.where(base > 0, base, 1.0)
+        z = retrievals / safe_base
+        sales = base * (self.partial_expectation(z) + z * (1 - self.fluctuation_cdf(z)))
+        return np.where(base > 0, np.minimum(sales, retrievals), 0.0)
+
+    # π_t(x_t) = p_t E[min(x_t, D_t)], cộng theo trục cuối (mỗi hàng = 1 kịch bản)
+    def expected_revenue(self, prices, retrievals, base=None) -> np.ndarray:
+        prices = np.asarray(prices, dtype=float)
+        return np.sum(prices * self.expected_sales(retrievals, prices, base), axis=-1)
+
     # ✅ HÀM DEMAND THỰC TẾ (uniform hoặc truncnorm)
     def actual(self, price: float) -> float:
         base = self.expected(price)
@@ -53,8 +102,19 @@ class DemandModel:
 
         return base * fluctuation
 
+    # Rút δ hàng loạt (1 lần cho cả ma trận kịch bản x kỳ)
+    def sample_fluctuations(self, size) -> np.ndarray:
+        if self.distribution == "truncnorm":
+            return self.truncnorm.rvs(size=size)
+        return self.dist.rvs(size=size)
+
 
 class Algorithm(ABC):
+    # True nếu thuật toán có bản mảng (plan / decide_batch) -> runner tự chọn run_matrix
+    batch_capable = False
+    # True nếu quyết định phụ thuộc doanh số đã quan sát (observe / observe_batch) -> không có plan() khép kín
+    uses_feedback = False
+
     def __init__(self, Q: int, m: float, M: float, demand: DemandModel):
         self.Q = Q
         self.m = m
@@ -70,72 +130,162 @@ class Algorithm(ABC):
     def decide(self, t: int, n: int, price: float, inventory: float, cumulative: float) -> float:
         pass
 
-    def run(self, prices: List[float]) -> AlgorithmResult:
-        n = len(prices)
-        inventory = float(self.Q)
-        cumulative = 0.0
+    def decide_batch(self, t: int, n: int, prices, inventory, cumulative) -> np.ndarray:
+        raise NotImplementedError(f"{self.name()} has no array-level decide")
 
-        retrievals = []
-        revenues = []
-        inventory_levels = [self.Q]
-        period_logs = []  #
-        total_revenue = 0.0
-        total_holding_cost = 0.0
+    # --- PHẢN HỒI SAU MỖI KỲ (thuật toán học từ doanh số: AdaptiveMyopic) ---
+    # sales = min(retrieval, demand thật); mặc định bỏ qua
+
+    def observe(self, t: int, price: float, retrieval: float, sales: float):
+        pass
+
+    def observe_batch(self, t: int, prices, retrievals, sales):
+        """Feedback for period t of every scenario stepped by decide_batch."""
+        pass
+
+    def observe_chunk(self, t0: int, prices, retrievals, sales):
+        """Feedback for the periods of one decide_chunk call (run_long)."""
+        pass
 
-        for t, price in enumerate(prices, start=1):
-            inventory_before = inventory
+    def _clip_to_inventory(self, desired: np.ndarray, cumulative=0.0) -> np.ndarray:
+        # r_t = min(d_t, I_t) với I_t = Q - Σ r  <=>  cumulative_t = min(y_0 + Σ d, Q)
+        # (đúng khi d_t không phụ thuộc tồn kho); cumulative = y_0 lúc bắt đầu đoạn
+        start = np.minimum(np.asarray(cumulative, dtype=float), float(self.Q))
+        start = np.broadcast_to(start, np.shape(desired)[:-1])
+        total = np.minimum(np.expand_dims(start, -1) + np.cumsum(desired, axis=-1), float(self.Q))
+        return np.diff(total, axis=-1, prepend=np.expand_dims(start, -1))
 
-            # 1. Quyết định lấy bao nhiêu
-            retrieval = self.decide(t, n, price, inventory, cumulative)
+    def decide_chunk(self, t0: int, n: int, prices, inventory: float, cumulative: float) -> np.ndarray:
+        """Retrievals for the consecutive periods t0, t0+1, ... of one scenario."""
+        retrievals = np.empty(len(prices))
+        for k, price in enumerate(np.asarray(prices, dtype=float).tolist()):
+            retrieval = self.decide(t0 + k, n, price, inventory, cumulative)
             retrieval = max(0.0, min(retrieval, inventory))
+            retrievals[k] = retrieval
+            inventory -= retrieval
+            cumulative += retrieval
+        return retrievals
 
-            # 2. Demand
-            base_demand = self.demand.expected(price)
+    def plan(self, prices: np.ndarray) -> np.ndarray:
+        """Retrievals for a (scenarios, n) price matrix, all scenarios stepped in lockstep."""
+        prices = np.atleast_2d(np.asarray(prices, dtype=float))
+        num_scenarios, n = prices.shape
+        retrievals = np.zeros_like(prices)
+        inventory = np.full(num_scenarios, float(self.Q))
+        cumulative = np.zeros(num_scenarios)
 
-            if self.demand.distribution == "truncnorm":
-                fluctuation = self.demand.truncnorm.rvs()
-            else:
-                fluctuation = self.demand.dist.rvs()
+        for t in range(1, n + 1):
+            retrieval = self.decide_batch(t, n, prices[:, t - 1], inventory, cumulative)
+            retrieval = np.clip(retrieval, 0.0, inventory)
+            retrievals[:, t - 1] = retrieval
+            inventory = inventory - retrieval
+            cumulative = cumulative + retrieval
 
-            actual_demand = base_demand * fluctuation
+        return retrievals
 
-            # 3. Sales & revenue
-            sales = min(retrieval, actual_demand)
-            revenue = price * sales
+    def run_matrix(self, prices: np.ndarray, fluctuations: np.ndarray = None, sink: TraceSink = None):
+        """Array version of run(): returns (retrievals, revenues), both (scenarios, n)."""
+        prices = np.atleast_2d(np.asarray(prices, dtype=float))
+        retrievals = self.plan(prices)
 
-            # 4. Holding cost
-            inventory_after = inventory - retrieval
-            holding_cost = inventory_after * 0.0  #  nếu chưa có h thì để 0, hoặc truyền h vào
+        if fluctuations is None:
+            fluctuations = self.demand.sample_fluctuations(prices.shape)
 
-            # 5. Update trạng thái
-            inventory = inventory_after
-            cumulative += retrieval
-            total_revenue += revenue
-            total_holding_cost += holding_cost
-
-            retrievals.append(retrieval)
-            revenues.append(revenue)
-            inventory_levels.append(inventory_after)
-
-            #  6. GHI LOG ĐẦY ĐỦ CHO PDF
-            period_logs.append({
-                "Period": t,
-                "Price": price,
-                "Inventory": inventory_before,
-                "Retrieval": retrieval,
-                "Delta": fluctuation,
-                "Demand": actual_demand,
-                "Sales": sales,
-                "Revenue": revenue,
-                "HoldingCost": holding_cost,
-                "Remaining": inventory_after
-            })
-
-        return AlgorithmResult(
+        actual_demand = self.demand.expected_array(prices) * fluctuations
+        revenues = prices * np.minimum(retrievals, actual_demand)
+
+        if sink is not None:
+            trace_matrix(sink, self, prices, retrievals, fluctuations)
+        return retrievals, revenues
+
+    def run(self, prices: List[float], sink: TraceSink = None, h: float = 0.0) -> AlgorithmResult:
+        return self._simulate(prices, self.decision_rule(prices), sink, h)
+
+    def decision_rule(self, prices: List[float]):
+        """decide() to use for this price scenario (Offline: allocations solved from the whole sequence)."""
+        return self.decide
+
+    def _simulate(self, prices: List[float], decide, sink: TraceSink = None, h: float = 0.0) -> AlgorithmResult:
+        # vòng mô phỏng chung (simulator.simulate_scenario với 1 thuật toán); sink = None => không dựng log theo kỳ
+        return simulate_scenario(prices, [(self, decide, sink)], self.demand, h)[self.name()]
+
+    # --- LONG-HORIZON MODE (n = 10^5 .. 10^6 kỳ) ---
+    # không giữ list/dict theo từng kỳ: xử lý theo đoạn (chunk), δ rút hàng loạt,
+    # chỉ giữ tổng + (tuỳ chọn) vết thưa mỗi trace_every kỳ => bộ nhớ ~ chunk_size
+
+    def run_long(self, prices, n: int = None, chunk_size: int = 65536, trace_every: int = None,
+                 h: float = 0.0) -> LongRunResult:
+        if n is None:
+            n = len(prices)
+
+        fluctuations = np.empty(chunk_size)
+        sales = np.empty(chunk_size)
+
+        inventory = float(self.Q)
+        cumulative = 0.0
+        total_revenue = 0.0
+        total_holding_cost = 0.0
+        t0 = 1
+        trace = {"period": [], "retrieval": [], "revenue": [], "inventory": []}
+
+        for chunk in _iter_price_chunks(prices, chunk_size):
+            size = len(chunk)
+            if t0 + size - 1 > n:
+                raise ValueError(f"Price stream longer than n={n}")
+            if size > len(fluctuations):
+                fluctuations = np.empty(size)
+                sales = np.empty(size)
+
+            retrievals = self.decide_chunk(t0, n, chunk, inventory, cumulative)
+
+            fluct = fluctuations[:size]
+            fluct[:] = self.demand.sample_fluctuations(size)
+            sold = sales[:size]
+            np.multiply(self.demand.expected_array(chunk), fluct, out=sold)
+            np.minimum(retrievals, sold, out=sold)
+            revenues = chunk * sold
+            self.observe_chunk(t0, chunk, retrievals, sold)
+            # tồn kho cuối mỗi kỳ của đoạn; holding cost = h * tồn kho cuối kỳ (như _simulate)
+            remaining = inventory - np.cumsum(retrievals)
+
+            if trace_every:
+                # kỳ t được giữ nếu t % trace_every == 0
+                first = (-t0) % trace_every
+                keep = slice(first, size, trace_every)
+                trace["period"].append(np.arange(t0, t0 + size)[keep])
+                trace["retrieval"].append(retrievals[keep])
+                trace["revenue"].append(revenues[keep])
+                trace["inventory"].append(remaining[keep])
+
+            retrieved = float(retrievals.sum())
+            inventory -= retrieved
+            cumulative += retrieved
+            total_revenue += float(revenues.sum())
+            if h:
+                total_holding_cost += h * float(remaining.sum())
+            t0 += size
+
+        trace = {k: np.concatenate(v) if v else np.empty(0) for k, v in trace.items()}
+        return LongRunResult(
             name=self.name(),
+            n=t0 - 1,
             total_revenue=total_revenue,
-            retrievals=retrievals,
-            revenues=revenues,
-            inventory=inventory_levels,
-            period_logs=period_logs
+            total_holding_cost=total_holding_cost,
+            total_retrieved=cumulative,
+            final_inventory=inventory,
+            trace_periods=trace["period"],
+            trace_retrievals=trace["retrieval"],
+            trace_revenues=trace["revenue"],
+            trace_inventory=trace["inventory"],
         )
+
+
+def _iter_price_chunks(prices, chunk_size: int) -> Iterable[np.ndarray]:
+    # Mảng / list giá -> cắt thành đoạn; iterator các đoạn (stream) -> dùng nguyên
+    if isinstance(prices, (list, tuple, np.ndarray)):
+        prices = np.asarray(prices, dtype=float)
+        for start in range(0, len(prices), chunk_size):
+            yield prices[start:start + chunk_size]
+    else:
+        for chunk in prices:
+            yield np.asarray(chunk, dtype=float)
@@ -1,12 +1,23 @@
 ## base line 1
 
+import numpy as np
 from .base import Algorithm
 
 
 class ConstantRate(Algorithm):
+    batch_capable = True
+
     def name(self) -> str:
         return "Constant-Rate"
 
     def decide(self, t: int, n: int, price: float, inventory: float, cumulative: float) -> float:
         rate = self.Q / n
-        return min(rate, inventory)
\ No newline at end of file
+        return min(rate, inventory)
+
+    def decide_chunk(self, t0: int, n: int, prices, inventory, cumulative) -> np.ndarray:
+        prices = np.asarray(prices, dtype=float)
+        return self._clip_to_inventory(np.full(prices.shape, self.Q / n), cumulative)
+
+    def plan(self, prices: np.ndarray) -> np.ndarray:
+        prices = np.atleast_2d(np.asarray(prices, dtype=float))
+        return self.decide_chunk(1, prices.shape[1], prices, float(self.Q), 0.0)
@@ -0,0 +1,230 @@
+## bảng quyết định tính sẵn cho ALG-IR
+## ngoài kỳ cuối, ALG_IR.decide chỉ phụ thuộc (price, cumulative) vì inventory = Q - cumulative
+## => tính 1 lần trên lưới giá x cumulative, sau đó tra bảng bằng nội suy song tuyến (bilinear)
+## bảng lưu riêng x_1(p) (1 chiều) và nghiệm Stage 2 (2 chiều) vì retrieval nhảy bậc ở ranh giới 2 stage;
+## nội suy từng phần rồi mới chọn stage => sai số không bị "nhoè" qua chỗ nhảy
+
+import json
+from bisect import bisect_left
+
+import numpy as np
+from pathlib import Path
+
+from .alg_ir import ALG_IR
+
+
+def _config_key(alg: ALG_IR, price_points: int, cumulative_points: int) -> dict:
+    # độ phân giải lưới cũng nằm trong key: bảng lưới khác => sai số khác, không dùng lại
+    demand = alg.demand
+    return {
+        "Q": float(alg.Q),
+        "m": float(alg.m),
+        "M": float(alg.M),
+        "a": float(demand.a),
+        "b": float(demand.b),
+        "delta": float(demand.delta),
+        "distribution": demand.distribution,
+        "sigma": float(demand.sigma),
+        "price_points": int(price_points),
+        "cumulative_points": int(cumulative_points),
+    }
+
+
+class DecisionTable:
+    def __init__(self, prices: np.ndarray, cumulatives: np.ndarray, stage_1: np.ndarray,
+                 stage_2: np.ndarray, key: dict, error_bound: float = None):
+        self.prices = np.asarray(prices, dtype=float)
+        self.cumulatives = np.asarray(cumulatives, dtype=float)
+        self.stage_1 = np.asarray(stage_1, dtype=float)
+        self.stage_2 = np.asarray(stage_2, dtype=float)
+        self.threshold = key["Q"] / (1 + np.log(key["M"] / key["m"]))
+        self.key = key
+        self.error_bound = error_bound
+
+        # bản list cho lookup_scalar (tránh overhead numpy khi tra từng điểm)
+        self._price_list = self.prices.tolist()
+        self._cumulative_list = self.cumulatives.tolist()
+        self._stage_1_list = self.stage_1.tolist()
+        self._stage_2_list = self.stage_2.tolist()
+
+    @classmethod
+    def build(cls, alg: ALG_IR, price_points: int = 256, cumulative_points: int = 256) -> "DecisionTable":
+        prices = np.linspace(alg.m, alg.M, price_points)
+        cumulatives = np.linspace(0.0, float(alg.Q), cumulative_points)
+
+        # Retrieval nhảy bậc ngay khi p > m (x_1 từ 0 lên (a-bm)F^-1(0)):
+        # hàng đầu lưu giới hạn phải tại m, còn p <= m thì lookup trả 0
+        solve_prices = prices.copy()
+        solve_prices[0] = np.nextafter(alg.m, np.inf)
+
+        P, Y = np.meshgrid(solve_prices, cumulatives, indexing="ij")
+        stage_1 = alg.stage_1_batch(solve_prices)
+        stage_2 = alg.stage_2_batch(P, alg.Q - Y, Y)
+
+        return cls(prices, cumulatives, stage_1, stage_2, _config_key(alg, price_points, cumulative_points))
+
+    def matches(self, alg: ALG_IR, price_points: int, cumulative_points: int) -> bool:
+        return self.key == _config_key(alg, price_points, cumulative_points)
+
+    def lookup(self, price, cumulative) -> np.ndarray:
+        """Retrieval for a non-final period; inputs are clamped to the grid."""
+        price = np.clip(np.asarray(price, dtype=float), self.prices[0], self.prices[-1])
+        cumulative = np.clip(np.asarray(cumulative, dtype=float), self.cumulatives[0], self.cumulatives[-1])
+
+        i = np.clip(np.searchsorted(self.prices, price) - 1, 0, len(self.prices) - 2)
+        j = np.clip(np.searchsorted(self.cumulatives, cumulative) - 1, 0, len(self.cumulatives) - 2)
+
+        p0, p1 = self.prices[i], self.prices[i + 1]
+        y0, y1 = self.cumulatives[j], self.cumulatives[j + 1]
+        wp = (price - p0) / (p1 - p0)
+        wy = (cumulative - y0) / (y1 - y0)
+
+        x_candidate = (1 - wp) * self.stage_1[i] + wp * self.stage_1[i + 1]
+
+        v = self.stage_2
+        x_stage_2 = ((1 - wp) * (1 - wy) * v[i, j] + wp * (1 - wy) * v[i + 1, j]
+                     + (1 - wp) * wy * v[i, j + 1] + wp * wy * v[i + 1, j + 1])
+
+        retrieval = np.where(cumulative + x_candidate <= self.threshold, x_candidate, x_stage_2)
+        return np.where(price > self.prices[0], retrieval, 0.0)
+
+    def lookup_scalar(self, price: float, cumulative: float) -> float:
+        """Pure-Python lookup() for a single (price, cumulative) point."""
+        ps, ys = self._price_list, self._cumulative_list
+        if price <= ps[0]:
+            return 0.0
+        price = min(price, ps[-1])
+        cumulative = min(max(cumulative, ys[0]), ys[-1])
+
+        i = min(max(bisect_left(ps, price) - 1, 0), len(ps) - 2)
+        j = min(max(bisect_left(ys, cumulative) - 1, 0), len(ys) - 2)
+        wp = (price - ps[i]) / (ps[i + 1] - ps[i])
+        wy = (cumulative - ys[j]) / (ys[j + 1] - ys[j])
+
+        x_candidate = (1 - wp) * self._stage_1_list[i] + wp * self._stage_1_list[i + 1]
+        if cumulative + x_candidate <= self.threshold:
+            return x_candidate
+
+        row0, row1 = self._stage_2_list[i], self._stage_2_list[i + 1]
+        return ((1 - wp) * (1 - wy) * row0[j] + wp * (1 - wy) * row1[j]
+                + (1 - wp) * wy * row0[j + 1] + wp * wy * row1[j + 1])
+
+    def measure_error(self, alg: ALG_IR, samples: int = 20000, seed: int = 0) -> float:
+        """Max |table - exact decide| over random points plus every cell centre."""
+        rng = np.random.default_rng(seed)
+        prices = np.concatenate([
+            rng.uniform(alg.m, alg.M, samples),
+            np.repeat(0.5 * (self.prices[:-1] + self.prices[1:]), len(self.cumulatives) - 1),
+        ])
+        cumulatives = np.concatenate([
+            rng.uniform(0.0, alg.Q, samples),
+            np.tile(0.5 * (self.cumulatives[:-1] + self.cumulatives[1:]), len(self.prices) - 1),
+        ])
+
+        # lời giải chính xác (CompiledALG_IR.decide_batch chính là bảng này)
+        exact = ALG_IR.decide_batch(alg, 1, 2, prices, alg.Q - cumulatives, cumulatives)
+        approx = self.lookup(prices, cumulatives)
+
+        self.error_bound = float(np.max(np.abs(exact - approx)))
+        return self.error_bound
+
+    def save(self, path: str):
+        np.savez_compressed(
+            path,
+            prices=self.prices,
+            cumulatives=self.cumulatives,
+            stage_1=self.stage_1,
+            stage_2=self.stage_2,
+            key=json.dumps(self.key, sort_keys=True),
+            error_bound=np.nan if self.error_bound is None else self.error_bound,
+        )
+
+    @classmethod
+    def load(cls, path: str) -> "DecisionTable":
+        with np.load(path) as data:
+            error_bound = float(data["error_bound"])
+            return cls(
+                data["prices"],
+                data["cumulatives"],
+                data["stage_1"],
+                data["stage_2"],
+                json.loads(str(data["key"])),
+                None if np.isnan(error_bound) else error_bound,
+            )
+
+
+class CompiledALG_IR(ALG_IR):
+    """ALG-IR whose non-final decisions are a single DecisionTable lookup."""
+
+    def __init__(self, *args, price_points: int = 256, cumulative_points: int = 256,
+                 table_path: str = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.table = None
+        # np.savez_compressed tự thêm ".npz" => chuẩn hoá trước khi kiểm tra file đã có
+        if table_path:
+            table_path = str(Path(table_path).with_suffix(".npz"))
+
+        if table_path and Path(table_path).exists():
+            table = DecisionTable.load(table_path)
+            if table.matches(self, price_points, cumulative_points):
+                self.table = table
+
+        if self.table is None:
+            self.table = DecisionTable.build(self, price_points, cumulative_points)
+            self.table.measure_error(self)
+            if table_path:
+                self.table.save(table_path)
+
+    def decide(self, t: int, n: int, price: float, inventory: float, cumulative: float) -> float:
+        if t == n:
+            return inventory
+
+        # Ngoài lưới giá -> tính chính xác
+        if not (self.m <= price <= self.M):
+            return super().decide(t, n, price, inventory, cumulative)
+
+        retrieval = self.table.lookup_scalar(price, cumulative)
+        return max(0.0, min(retrieval, inventory))
+
+    def decide_batch(self, t: int, n: int, prices, inventory, cumulative) -> np.ndarray:
+        prices, inventory, cumulative = np.broadcast_arrays(
+            np.asarray(prices, dtype=float),
+            np.asarray(inventory, dtype=float),
+            np.asarray(cumulative, dtype=float),
+        )
+        if t == n:
+            return inventory.copy()
+
+        retrieval = self.table.lookup(prices, cumulative)
+        # Ngoài lưới giá -> tính chính xác
+        outside = (prices < self.m) | (prices > self.M)
+        if np.any(outside):
+            retrieval[outside] = super().decide_batch(t, n, prices[outside], inventory[outside],
+                                                      cumulative[outside])
+        return np.clip(retrieval, 0.0, np.maximum(inventory, 0.0))
+
+    def decide_chunk(self, t0: int, n: int, prices, inventory: float, cumulative: float) -> np.ndarray:
+        # x_1(p) của cả đoạn nội suy 1 lần (vector), vòng lặp chỉ còn check stage + tra Stage 2
+        prices = np.asarray(prices, dtype=float)
+        table = self.table
+        x_candidates = np.where(prices > table.prices[0],
+                                np.interp(prices, table.prices, table.stage_1), 0.0).tolist()
+        retrievals = np.empty(len(prices))
+
+        for k, price in enumerate(prices.tolist()):
+            t = t0 + k
+            if t == n:
+                retrieval = inventory
+            elif not (self.m <= price <= self.M):
+                retrieval = ALG_IR.decide(self, t, n, price, inventory, cumulative)
+            elif cumulative + x_candidates[k] <= table.threshold:
+                retrieval = x_candidates[k]
+            else:
+                retrieval = table.lookup_scalar(price, cumulative)
+
+            retrieval = max(0.0, min(retrieval, inventory))
+            retrievals[k] = retrieval
+            inventory -= retrieval
+            cumulative += retrieval
+
+        return retrievals
@@ -0,0 +1,178 @@
+## chính sách online tối ưu khi biết phân phối giá (p_t ~ U[m, M] độc lập) nhưng không biết giá tương lai
+## Bellman theo số kỳ còn lại r:
+##   V_0 = 0,  V_r(I) = E_p[ max_{0<=x<=I} p E[min(x, (a-bp)δ)] + V_{r-1}(I - x) ]
+## lưới tồn kho (inventory_points) x lưới giá (price_points, trung điểm các ô đều trên [m, M])
+## không dò nghiệm từng ô: theo lượng còn lại y = I - x, điều kiện bậc 1 p(1 - F(x/(a-bp))) = V'_{r-1}(y)
+## cho x = (a-bp) F^-1(1 - V'(y)/p) dạng đóng => I = y + x, nội suy ngược về lưới I (endogenous grid)
+## lời giải cache theo cấu hình (trong process + tuỳ chọn file .npz), horizon dài hơn thì giải tiếp từ r cũ
+
+from pathlib import Path
+
+import numpy as np
+
+from .base import Algorithm
+
+# cấu hình -> (V theo r, V' theo r)
+_solutions = {}
+
+
+def _interp_uniform(x, start: float, step: float, table: np.ndarray):
+    # np.interp cho lưới cách đều: tính thẳng chỉ số thay vì tìm nhị phân, ngoài lưới thì kẹp 2 đầu
+    position = np.clip((x - start) / step, 0.0, len(table) - 1)
+    j = np.minimum(position.astype(np.int64), len(table) - 2)
+    weight = position - j
+    return table[j] * (1 - weight) + table[j + 1] * weight
+
+
+class DynamicProgramming(Algorithm):
+    batch_capable = True
+
+    def __init__(self, Q, m, M, demand, n: int = None, inventory_points: int = 1001,
+                 price_points: int = 64, cache_path: str = None):
+        super().__init__(Q, m, M, demand)
+        self.inventory_points = inventory_points
+        self.price_points = price_points
+        self.cache_path = cache_path
+
+        self.inventory_grid = np.linspace(0.0, float(Q), inventory_points)
+        edges = np.linspace(m, M, price_points + 1)
+        self.price_grid = 0.5 * (edges[:-1] + edges[1:])
+        self._build_demand_tables()
+
+        self._key = (float(Q), float(m), float(M), float(demand.a), float(demand.b), float(demand.delta),
+                     demand.distribution, float(demand.sigma), inventory_points, price_points)
+        if self._key not in _solutions:
+            _solutions[self._key] = self._load() or ([np.zeros(inventory_points)], [np.zeros(inventory_points)])
+        self._values, self._slopes = _solutions[self._key]
+
+        if n is not None:
+            self.solve(n)
+
+    def name(self) -> str:
+        return "DP-Optimal"
+
+    # --- BẢNG δ: F^-1(u) và E[min(z, δ)] (nội suy thay vì gọi scipy trong vòng lặp) ---
+
+    def _build_demand_tables(self, points: int = 4097):
+        demand = self.demand
+        self._u_grid = np.linspace(0.0, 1.0, points)
+        self._ppf_table = demand.fluctuation_ppf(self._u_grid)
+        self._z_grid = np.linspace(demand.lower, demand.upper, points)
+        self._sales_table = (demand.partial_expectation(self._z_grid)
+                             + self._z_grid * (1 - demand.fluctuation_cdf(self._z_grid)))
+
+    def _ppf(self, u):
+        if self.demand.distribution == "uniform":
+            return self.demand.fluctuation_ppf(u)
+        return _interp_uniform(u, 0.0, self._u_grid[1], self._ppf_table)
+
+    def _expected_sales(self, x, base):
+        # E[min(x, base·δ)] = base · E[min(z, δ)], z = x / base
+        safe_base = np.where(base > 0, base, 1.0)
+        z = x / safe_base
+        lower, upper = self.demand.lower, self.demand.upper
+        if self.demand.distribution == "uniform" and upper > lower:
+            # dạng đóng: E[min(z, δ)] = (z² - l²)/(2w) + z(u - z)/w trên [l, u]
+            zc = np.clip(z, lower, upper)
+            factor = ((zc ** 2 - lower ** 2) / 2 + zc * (upper - zc)) / (upper - lower)
+        else:
+            z_step = self._z_grid[1] - self._z_grid[0]
+            factor = _interp_uniform(z, lower, z_step, self._sales_table)
+        factor = np.where(z < lower, z, factor)
+        return np.where(base > 0, base * factor, 0.0)
+
+    def _retrieval_for_remaining(self, slopes, prices, base):
+        # x tối ưu khi còn lại y sau kỳ này (V'(y) = slopes)
+        u = np.clip(1.0 - slopes / prices, 0.0, 1.0)
+        return np.where((slopes < prices) & (base > 0), base * self._ppf(u), 0.0)
+
+    # --- BACKWARD INDUCTION ---
+
+    def solve(self, horizon: int):
+        """Extend the value function to `horizon` remaining periods."""
+        start = len(self._values)
+        if horizon < start:
+            return
+
+        grid = self.inventory_grid
+        step = grid[1] - grid[0]
+        prices = self.price_grid[:, None]
+        base = self.demand.expected_array(prices)
+
+        for _ in range(start, horizon + 1):
+            values, slopes = self._values[-1], self._slopes[-1]
+
+            # endogenous grid: (y_j, p_k) -> x_kj, I_kj = y_j + x_kj (tăng theo j vì V' không tăng)
+            x_endo = self._retrieval_for_remaining(slopes[None, :], prices, base)
+            i_endo = grid[None, :] + x_endo
+
+            retrieval = np.empty((self.price_points, self.inventory_points))
+            for k in range(self.price_points):
+                retrieval[k] = np.interp(grid, i_endo[k], x_endo[k])
+            # I < I_k0: muốn lấy nhiều hơn số đang có -> lấy hết
+            retrieval = np.where(grid[None, :] < i_endo[:, :1], grid[None, :], np.minimum(retrieval, grid[None, :]))
+
+            reward = prices * self._expected_sales(retrieval, base)
+            continuation = _interp_uniform(grid[None, :] - retrieval, 0.0, step, values)
+            new_values = np.mean(reward + continuation, axis=0)
+
+            new_slopes = np.diff(new_values) / step
+            new_slopes = np.minimum.accumulate(np.append(new_slopes, new_slopes[-1]))
+
+            self._values.append(new_values)
+            self._slopes.append(np.maximum(new_slopes, 0.0))
+
+        self._save()
+
+    def value(self, inventory, remaining: int):
+        """Expected optimal revenue with `remaining` periods left."""
+        self.solve(remaining)
+        return np.interp(inventory, self.inventory_grid, self._values[remaining])
+
+    # --- QUYẾT ĐỊNH ---
+
+    def decide_batch(self, t: int, n: int, prices, inventory, cumulative) -> np.ndarray:
+        prices, inventory = np.broadcast_arrays(np.asarray(prices, dtype=float), np.asarray(inventory, dtype=float))
+        if t >= n:
+            return inventory.copy()
+
+        remaining = n - t  # số kỳ còn lại sau kỳ t
+        self.solve(remaining)
+        slopes = self._slopes[remaining]
+        step = self.inventory_grid[1]
+        base = self.demand.expected_array(prices)
+
+        def retrieval_at(y):
+            return self._retrieval_for_remaining(_interp_uniform(y, 0.0, step, slopes), prices, base)
+
+        # tìm y trong [0, I] với y + x(y) = I (vế trái tăng theo y)
+        low = np.zeros_like(inventory)
+        high = np.maximum(inventory, 0.0)
+        sell_all = retrieval_at(low) >= inventory
+        for _ in range(40):
+            mid = 0.5 * (low + high)
+            over = mid + retrieval_at(mid) > inventory
+            high = np.where(over, mid, high)
+            low = np.where(over, low, mid)
+
+        retrieval = np.where(sell_all, inventory, inventory - 0.5 * (low + high))
+        return np.clip(retrieval, 0.0, np.maximum(inventory, 0.0))
+
+    def decide(self, t: int, n: int, price: float, inventory: float, cumulative: float) -> float:
+        return float(self.decide_batch(t, n, price, inventory, cumulative))
+
+    # --- CACHE RA FILE ---
+
+    def _load(self):
+        if not self.cache_path or not Path(self.cache_path).exists():
+            return None
+        with np.load(self.cache_path) as data:
+            if tuple(data["key"].tolist()) != tuple(str(k) for k in self._key):
+                return None
+            return list(data["values"]), list(data["slopes"])
+
+    def _save(self):
+        if not self.cache_path:
+            return
+        np.savez_compressed(self.cache_path, key=np.array([str(k) for k in self._key]),
+                            values=np.array(self._values), slopes=np.array(self._slopes))
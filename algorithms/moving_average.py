@@ -1,20 +1,98 @@
+## base line 4: chỉ bán khi giá hiện tại >= trung bình `window` giá gần nhất (giá kỳ này chưa tính vào)
+## tổng cửa sổ cập nhật dần (cộng giá mới, trừ giá rơi khỏi cửa sổ) => O(1) mỗi kỳ thay vì tính lại mean
+## mỗi lần vòng ring buffer quay về đầu thì cộng lại tổng cho sạch sai số float (O(window) / window kỳ)
+## kỳ 1 chưa có lịch sử -> so với (m + M) / 2 như Fixed-Threshold
+## state reset khi t == 1 (kịch bản mới)
+
+from collections import deque
+
+import numpy as np
+from .base import Algorithm
+
 
 class MovingAverage(Algorithm):
+    batch_capable = True
+
+    def __init__(self, Q, m, M, demand, window: int = 5):
+        super().__init__(Q, m, M, demand)
+        self.window = window
+        self._history = deque()
+        self._sum = 0.0
+        # state của decide_batch: ring buffer (kịch bản, window) + tổng từng hàng
+        self._ring = np.zeros((0, window))
+        self._ring_sum = np.zeros(0)
+
     def name(self) -> str:
         return "Moving-Average"
 
+    # --- SCALAR (run / run_long) ---
+
+    def _push(self, price: float):
+        self._history.append(price)
+        self._sum += price
+        if len(self._history) > self.window:
+            self._sum -= self._history.popleft()
+
     def decide(self, t: int, n: int, price: float, inventory: float, cumulative: float) -> float:
+        if t == 1:
+            self._history.clear()
+            self._sum = 0.0
 
-        pass
+        average = self._sum / len(self._history) if self._history else (self.m + self.M) / 2
+        self._push(price)
+        if price < average:
+            return 0.0
+        return min(self.demand.expected(price), inventory)
 
+    # --- BẢN VECTOR HOÁ ---
 
-# algorithms/percentile_threshold.py
-class PercentileThreshold(Algorithm):
-    def name(self) -> str:
-        return "75th-Percentile"
+    def decide_batch(self, t: int, n: int, prices, inventory, cumulative) -> np.ndarray:
+        prices, inventory = np.broadcast_arrays(np.asarray(prices, dtype=float), np.asarray(inventory, dtype=float))
+        if t == 1 or self._ring.shape[0] != prices.shape[0]:
+            self._ring = np.zeros((prices.shape[0], self.window))
+            self._ring_sum = np.zeros(prices.shape[0])
 
-    def decide(self, t: int, n: int, price: float, inventory: float, cumulative: float) -> float:
+        seen = min(t - 1, self.window)
+        average = self._ring_sum / seen if seen else np.full(prices.shape, (self.m + self.M) / 2)
+
+        # ghi đè ô cũ nhất của ring buffer
+        slot = (t - 1) % self.window
+        self._ring_sum += prices - self._ring[:, slot]
+        self._ring[:, slot] = prices
+        if slot == self.window - 1:
+            self._ring_sum = self._ring.sum(axis=1)
+
+        retrieval = np.where(prices < average, 0.0, self.demand.expected_array(prices))
+        return np.clip(retrieval, 0.0, np.maximum(inventory, 0.0))
+
+    def decide_chunk(self, t0: int, n: int, prices, inventory, cumulative) -> np.ndarray:
+        # cả đoạn 1 lần: tổng cửa sổ = hiệu 2 điểm của cumsum trên (đuôi lịch sử + đoạn)
+        prices = np.asarray(prices, dtype=float)
+        if t0 == 1:
+            self._history.clear()
+            self._sum = 0.0
+
+        tail = np.broadcast_to(np.asarray(self._history, dtype=float), prices.shape[:-1] + (len(self._history),))
+        history = np.concatenate([tail, prices], axis=-1)
+        sums = np.concatenate([np.zeros(prices.shape[:-1] + (1,)), np.cumsum(history, axis=-1)], axis=-1)
+
+        # kỳ thứ k của đoạn: cửa sổ = history[start_k : offset + k]
+        offset = tail.shape[-1]
+        end = offset + np.arange(prices.shape[-1])
+        start = np.maximum(end - self.window, 0)
+        count = end - start
+        safe_count = np.maximum(count, 1)
+        average = np.where(count > 0, (sums[..., end] - sums[..., start]) / safe_count, (self.m + self.M) / 2)
+
+        if prices.ndim == 1:
+            self._history.extend(prices[-self.window:].tolist())
+            while len(self._history) > self.window:
+                self._history.popleft()
+            self._sum = float(sum(self._history))
 
-        pass
+        desired = np.where(prices < average, 0.0, self.demand.expected_array(prices))
+        return self._clip_to_inventory(desired, cumulative)
 
-    ## Đang developing ==> bỏ qua ko cần đọc
\ No newline at end of file
+    def plan(self, prices: np.ndarray) -> np.ndarray:
+        prices = np.atleast_2d(np.asarray(prices, dtype=float))
+        return self.decide_chunk(1, prices.shape[1], prices, float(self.Q), 0.0)
@@ -1,10 +1,21 @@
+import numpy as np
 from .base import Algorithm
 
 
 class Myopic(Algorithm):
+    batch_capable = True
+
     def name(self) -> str:
         return "Myopic"
 
     def decide(self, t: int, n: int, price: float, inventory: float, cumulative: float) -> float:
         exp_demand = self.demand.expected(price)
-        return min(exp_demand * 1.2, inventory)
\ No newline at end of file
+        return min(exp_demand * 1.2, inventory)
+
+    def decide_chunk(self, t0: int, n: int, prices, inventory, cumulative) -> np.ndarray:
+        prices = np.asarray(prices, dtype=float)
+        return self._clip_to_inventory(self.demand.expected_array(prices) * 1.2, cumulative)
+
+    def plan(self, prices: np.ndarray) -> np.ndarray:
+        prices = np.atleast_2d(np.asarray(prices, dtype=float))
+        return self.decide_chunk(1, prices.shape[1], prices, float(self.Q), 0.0)
@@ -0,0 +1,71 @@
+## cache LRU cho lời giải Offline (allocations + λ*)
+## key = hash(chuỗi giá float64) + Q + tham số demand + solver ("batch": solve() và plan() cùng lời giải)
+## => cùng chuỗi giá, cùng cấu hình thì bỏ qua bước tìm λ* hoàn toàn
+## path != None: nạp từ file lúc khởi tạo, save() ghi lại (pickle, ghi file tạm rồi os.replace)
+
+import hashlib
+import os
+import pickle
+from collections import OrderedDict
+from pathlib import Path
+
+import numpy as np
+
+
+class OfflineCache:
+    def __init__(self, maxsize: int = 4096, path: str = None):
+        self.maxsize = maxsize
+        self.path = Path(path) if path else None
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+
+        if self.path is not None and self.path.exists():
+            with open(self.path, 'rb') as f:
+                self._entries = pickle.load(f)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @staticmethod
+    def key(prices, offline, solver: str) -> str:
+        demand = offline.demand
+        params = (float(offline.Q), float(demand.a), float(demand.b), float(demand.delta),
+                  demand.distribution, float(demand.sigma), solver)
+        digest = hashlib.blake2b(np.ascontiguousarray(prices, dtype=np.float64).tobytes(), digest_size=16)
+        digest.update(repr(params).encode())
+        return digest.hexdigest()
+
+    def get(self, key: str):
+        """(allocations, λ*) or None; λ* is None when no root was needed."""
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry
+
+    def put(self, key: str, allocations, lam_star):
+        allocations = np.array(allocations, dtype=float)
+        allocations.setflags(write=False)
+        self._entries[key] = (allocations, lam_star)
+        self._entries.move_to_end(key)
+        if len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def save(self):
+        if self.path is None:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_name(self.path.name + ".tmp")
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(self._entries, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, self.path)
+
+    def stats(self) -> str:
+        total = self.hits + self.misses
+        rate = self.hits / total if total else 0.0
+        return f"{self.hits} hits, {self.misses} misses ({rate:.0%}), {len(self)} entries"
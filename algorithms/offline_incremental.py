@@ -0,0 +1,203 @@
+## Offline (hindsight) cập nhật dần khi giá mới tới (rolling horizon / theo dõi CR trực tiếp)
+## δ uniform: với λ < p_t, x_t(λ) = (a-bp_t)(1+Δ) - 2Δ(a-bp_t)λ/p_t
+##   => S(λ) = A - B·λ, A/B = tổng trên các kỳ còn "active" (p_t > λ)
+##   thêm giá chỉ làm S(λ) tăng => λ* không giảm => kỳ đã rời active set không bao giờ quay lại
+##   min-heap giá active + A, B: mỗi giá vào / ra heap đúng 1 lần => append O(log n) khấu hao
+##   S nhảy bậc tại λ = p_t: nếu nghiệm rơi vào chỗ nhảy thì λ* = p_t, chuẩn hoá về Q ở cả 2 phía (bỏ / giữ kỳ đó)
+##   rồi lấy phía doanh thu kỳ vọng cao hơn (giống Offline.plan)
+##   doanh thu kỳ vọng kỳ active: p·E[min(x_t, (a-bp)δ)] = p(a-bp) - Δ(a-bp)λ²/p
+##   => giữ thêm C = Σ p(a-bp), D = Σ Δ(a-bp)/p trên active set: expected_revenue() O(1) khi λ* không ở chỗ nhảy
+## δ truncnorm: không có dạng đóng -> brentq bắt đầu từ λ* cũ (warm start, S(λ*_cũ) >= Q)
+## expected_revenue() dựng lại allocations O(t) khi truncnorm hoặc λ* ở chỗ nhảy (Q càng khan hiếm càng hay gặp)
+##   => RatioMonitorSink với every cố định tốn O(n²/every) trong trường hợp xấu nhất: chuỗi dài để every ~ n/100
+
+import heapq
+
+import numpy as np
+from scipy.optimize import brentq
+
+from algorithms.base import DemandModel
+from tracing import TraceSink
+
+
+class IncrementalOffline:
+    def __init__(self, Q: float, demand: DemandModel, capacity: int = 1024):
+        self.Q = Q
+        self.demand = demand
+        self.n = 0
+        self.lam_star = 0.0
+
+        self._prices = np.empty(capacity)
+        self._base = np.empty(capacity)
+        self._total_upper = 0.0  # Σ (a-bp)(1+Δ): < Q => lấy hết cận trên, không cần λ
+        self._total_revenue = 0.0  # Σ p(a-bp): doanh thu kỳ vọng khi lấy hết cận trên (uniform, E[δ] = 1)
+
+        # chỉ dùng cho uniform
+        self._active = []  # min-heap (p_t, phần đóng góp vào A, B, C, D)
+        self._A = 0.0
+        self._B = 0.0
+        self._C = 0.0
+        self._D = 0.0
+        self._floor = 0.0  # giá lớn nhất đã rời active set
+
+    @property
+    def prices(self) -> np.ndarray:
+        return self._prices[:self.n]
+
+    def _store(self, price: float, base: float):
+        if self.n == len(self._prices):
+            self._prices = np.concatenate([self._prices, np.empty(len(self._prices))])
+            self._base = np.concatenate([self._base, np.empty(len(self._base))])
+        self._prices[self.n] = price
+        self._base[self.n] = base
+        self.n += 1
+
+    def append(self, price: float) -> float:
+        """Add the next period's price; returns the updated λ*."""
+        return self.extend([price])
+
+    def extend(self, prices) -> float:
+        delta = self.demand.delta
+        for price in prices:
+            price = float(price)
+            base = self.demand.expected(price)
+            self._store(price, base)
+            if base <= 0:
+                continue
+
+            self._total_upper += base * (1 + delta)
+            self._total_revenue += price * base
+            if self.demand.distribution != "truncnorm" and price > self.lam_star:
+                upper, slope = base * (1 + delta), 2 * delta * base / price
+                revenue, curvature = price * base, delta * base / price
+                heapq.heappush(self._active, (price, upper, slope, revenue, curvature))
+                self._A += upper
+                self._B += slope
+                self._C += revenue
+                self._D += curvature
+
+        if self._total_upper <= self.Q:
+            self.lam_star = 0.0
+        elif self.demand.distribution == "truncnorm":
+            self._solve_brentq()
+        else:
+            self._solve_uniform()
+        return self.lam_star
+
+    def _solve_uniform(self):
+        while True:
+            if self._B > 0:
+                candidate = (self._A - self.Q) / self._B
+            else:
+                candidate = np.inf if self._A > self.Q else -np.inf
+            lam = max(candidate, self._floor)
+
+            # kỳ có p_t <= λ không còn được phân bổ -> rời active set
+            if self._active and self._active[0][0] <= lam:
+                price, upper, slope, revenue, curvature = heapq.heappop(self._active)
+                self._A -= upper
+                self._B -= slope
+                self._C -= revenue
+                self._D -= curvature
+                self._floor = max(self._floor, price)
+                continue
+            break
+        self.lam_star = lam
+
+    def _solve_brentq(self):
+        prices, base = self.prices, self._base[:self.n]
+
+        def excess(lam):
+            active = (lam < prices) & (base > 0)
+            u = np.clip(1.0 - lam / prices, 0.0, 1.0)
+            return float(np.sum(np.where(active, base * self.demand.fluctuation_ppf(u), 0.0))) - self.Q
+
+        lam_low = max(self.lam_star, 1e-12)
+        lam_high = float(prices.max())
+        if excess(lam_low) < 0:
+            return  # nghiệm vẫn nằm ở chỗ nhảy cũ
+        lam = brentq(excess, lam_low, lam_high, xtol=1e-9, rtol=1e-9, maxiter=200)
+
+        # brentq hội tụ về chỗ nhảy p_t -> lấy đúng p_t để allocations() so sánh 2 phía
+        nearest = float(prices[np.argmin(np.abs(prices - lam))])
+        self.lam_star = nearest if abs(nearest - lam) <= 1e-7 * max(1.0, lam) else lam
+
+    def allocations(self) -> np.ndarray:
+        """Hindsight allocation over the prices seen so far (sums to Q)."""
+        prices, base = self.prices, self._base[:self.n]
+        positive = np.maximum(base, 0.0)
+
+        if self._total_upper <= self.Q:
+            allocations = positive * (1 + self.demand.delta)
+            if self.n:
+                allocations[-1] += self.Q - allocations.sum()
+            return allocations
+
+        u = np.clip(1.0 - self.lam_star / prices, 0.0, 1.0)
+        x = positive * self.demand.fluctuation_ppf(u)
+        allocations = self._normalize(np.where(self.lam_star < prices, x, 0.0))
+
+        # λ* đúng bằng 1 giá (chỗ nhảy của S): thử cả phía giữ kỳ đó, lấy phía doanh thu kỳ vọng cao hơn
+        if np.any(prices == self.lam_star):
+            including = self._normalize(np.where(self.lam_star <= prices, x, 0.0))
+            if (self.demand.expected_revenue(prices, including)
+                    > self.demand.expected_revenue(prices, allocations)):
+                return including
+        return allocations
+
+    def _normalize(self, allocations: np.ndarray) -> np.ndarray:
+        total = allocations.sum()
+        return allocations * (self.Q / total) if total > 0 else allocations
+
+    def expected_revenue(self) -> float:
+        if self.n == 0:
+            return 0.0
+        if self.demand.distribution != "truncnorm":
+            if self._total_upper <= self.Q:
+                return self._total_revenue
+            # λ* > giá lớn nhất đã rời active set: S(λ*) = Q đúng, không ở chỗ nhảy => dạng đóng
+            if self._floor < self.lam_star < np.inf:
+                return self._C - self.lam_star ** 2 * self._D
+        return float(self.demand.expected_revenue(self.prices, self.allocations()))
+
+    def ratio(self, policy_revenue: float) -> float:
+        """Competitive ratio so far: policy revenue / hindsight expected revenue on the same prices."""
+        benchmark = self.expected_revenue()
+        return policy_revenue / benchmark if benchmark > 0 else 1.0
+
+
+class RatioMonitorSink(TraceSink):
+    """Trace sink that tracks a running policy's CR against IncrementalOffline as periods arrive."""
+
+    def __init__(self, Q: float, demand: DemandModel, every: int = 1, stream=print):
+        self.Q = Q
+        self.demand = demand
+        # mỗi lần báo có thể tốn O(t) (xem đầu file) => chuỗi dài: every tăng theo n, vd. n // 100
+        self.every = every
+        self.stream = stream
+        self.history = []  # (t, doanh thu policy, doanh thu Offline kỳ vọng, CR)
+
+    def begin(self, name: str, n: int, context) -> bool:
+        self._name = name
+        self._offline = IncrementalOffline(self.Q, self.demand, capacity=max(n, 1))
+        self._revenue = 0.0
+        self.history = []
+        return True
+
+    def record(self, t, price, inventory, retrieval, delta, demand, sales, revenue, holding_cost, remaining):
+        self._offline.append(price)
+        self._revenue += revenue
+        if t % self.every == 0:
+            self._report(t)
+
+    def end(self, summary):
+        if not self.history or self.history[-1][0] != self._offline.n:
+            self._report(self._offline.n)
+
+    def _report(self, t: int):
+        benchmark = self._offline.expected_revenue()
+        ratio = self._revenue / benchmark if benchmark > 0 else 1.0
+        self.history.append((t, self._revenue, benchmark, ratio))
+        if self.stream is not None:
+            self.stream(f"Log: {self._name} t={t}: revenue {self._revenue:,.0f} / "
+                        f"hindsight {benchmark:,.0f} => CR so far {ratio:.3f}")
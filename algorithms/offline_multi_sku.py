@@ -0,0 +1,178 @@
+## Offline (hindsight) cho nhiều SKU dùng chung 1 kho
+## max Σ_k Σ_t π_kt(x_kt),  π_kt(x) = p_kt E[min(x, (a_k - b_k p_kt) δ)]   (lõm theo x)
+##   Σ_t x_kt <= Q_k          (tồn kho từng SKU)            -> λ_k
+##   Σ_k x_kt <= throughput_t (năng lực lấy hàng mỗi kỳ)     -> μ_t
+##   Σ_k Σ_t x_kt <= capacity (tổng lượng kho xuất cả mùa)  -> ν
+## đối ngẫu: với giá bóng c_kt = λ_k + μ_t + ν, x_kt(c) = (a_k - b_k p_kt) F^-1(1 - c/p_kt) nếu c < p_kt, ngược lại 0
+##   (giống Offline 1 SKU với λ thay bằng c_kt)
+## block coordinate: cố định μ -> K bài toán λ_k độc lập (bisection vector hoá trên mảng SKU) + ν vô hướng,
+##   rồi cố định λ -> μ (vector trên kỳ) + ν; lặp tới khi cận trên đối ngẫu thôi giảm
+## mọi bước là phép toán trên mảng (SKU, kỳ) => hàng nghìn SKU x 1 mùa trong vài giây
+## nghiệm cuối: x(λ, μ, ν) chỉnh cho khả thi (_make_feasible)
+##   doanh thu kỳ vọng của x khả thi <= OPT <= giá trị hàm đối ngẫu => gap báo độ tối ưu
+## δ truncnorm: F^-1 tra bảng (np.interp) thay cho scipy ppf trong vòng lặp
+
+import numpy as np
+
+from algorithms.base import DemandModel
+from algorithms.roots import bisect_decreasing
+from models import MultiSKUResult
+
+
+def _bisect_near(func, guess, step, cap: float, xtol: float):
+    # bisection trong [guess - 2·step, guess + 2·step] (step: thay đổi ở vòng trước), mở rộng ra [0, cap]
+    # ở phần tử nào khoảng đó không chứa nghiệm => các vòng sau (thay đổi nhỏ) tốn ít lần lặp hơn nhiều
+    width = np.maximum(2 * step, 64 * xtol)
+    lo = np.maximum(guess - width, 0.0)
+    hi = np.minimum(guess + width, cap)
+    outside = ((lo > 0) & (func(lo) <= 0)) | ((hi < cap) & (func(hi) > 0))
+    lo = np.where(outside, 0.0, lo)
+    hi = np.where(outside, cap, hi)
+    root = bisect_decreasing(func, lo, hi, xtol=xtol)
+    return root, np.abs(root - guess)
+
+
+class MultiSKUOffline:
+    def __init__(self, Q, a, b, demand: DemandModel, throughput=None, capacity: float = None,
+                 tol: float = 1e-6, max_sweeps: int = 100, ppf_points: int = 4097):
+        """Q, a, b: per-SKU stock and demand line (arrays of length K); demand supplies the δ distribution.
+
+        throughput: shared retrievals per period (scalar or length n); capacity: shared total over the season.
+        """
+        self.Q = np.asarray(Q, dtype=float)
+        self.a = np.asarray(a, dtype=float)
+        self.b = np.asarray(b, dtype=float)
+        self.demand = demand
+        self.throughput = throughput
+        self.capacity = capacity
+        self.tol = tol
+        self.max_sweeps = max_sweeps
+
+        self._ppf_grid = None
+        if demand.distribution == "truncnorm":
+            self._ppf_grid = np.linspace(0.0, 1.0, ppf_points)
+            self._ppf_values = demand.fluctuation_ppf(self._ppf_grid)
+
+    def _ppf(self, u: np.ndarray) -> np.ndarray:
+        if self._ppf_grid is None:
+            return self.demand.fluctuation_ppf(u)
+        return np.interp(u, self._ppf_grid, self._ppf_values)
+
+    def _allocations(self, cost: np.ndarray, prices: np.ndarray, base: np.ndarray) -> np.ndarray:
+        # x(c) cho mọi ô (SKU, kỳ); cost broadcast theo prices
+        active = (cost < prices) & (base > 0)
+        u = np.clip(1.0 - cost / prices, 0.0, 1.0)
+        return np.where(active, base * self._ppf(u), 0.0)
+
+    def solve(self, prices) -> MultiSKUResult:
+        """Coupled hindsight allocation for a (K, n) price matrix (one row of prices per SKU)."""
+        prices = np.atleast_2d(np.asarray(prices, dtype=float))
+        num_skus, n = prices.shape
+        base = np.maximum(0.0, self.a[:, None] - self.b[:, None] * prices)
+        price_cap = prices.max()
+
+        throughput = None if self.throughput is None else np.broadcast_to(
+            np.asarray(self.throughput, dtype=float), (n,))
+        lam = np.zeros(num_skus)
+        mu = np.zeros(n)
+        nu = np.zeros(())
+        # độ rộng khoảng tìm quanh nghiệm vòng trước (inf: vòng đầu tìm trên cả [0, max p])
+        steps = {"rows": np.inf, "columns": np.inf, "nu_rows": np.inf, "nu_columns": np.inf}
+        xtol = 1e-8 * price_cap
+
+        def allocate(cost):
+            return self._allocations(cost, prices, base)
+
+        def solve_total(levels, other, axis, key):
+            # ν chung cho cả kho: giá bóng hàng/cột = max(mức riêng, ν) (phần vượt ν là λ_k / μ_t)
+            if self.capacity is None:
+                return np.zeros(())
+            expand = (lambda v: np.maximum(levels, v)[:, None] + other[None, :]) if axis == 1 else \
+                (lambda v: other[:, None] + np.maximum(levels, v)[None, :])
+            root, steps[key] = _bisect_near(lambda v: allocate(expand(v)).sum() - self.capacity,
+                                            nu, steps[key], price_cap, xtol)
+            return root
+
+        def dual_value(lam_, mu_, nu_):
+            # hàm đối ngẫu tại (λ, μ, ν): cận trên của doanh thu tối ưu
+            cost = lam_[:, None] + mu_[None, :] + nu_
+            unconstrained = allocate(cost)
+            value = (np.sum(self.demand.expected_revenue(prices, unconstrained, base=base))
+                     - np.sum(cost * unconstrained) + lam_ @ self.Q)
+            if throughput is not None:
+                value += mu_ @ throughput
+            if self.capacity is not None:
+                value += nu_ * self.capacity
+            return float(value)
+
+        # block coordinate trên (λ, ν) rồi (μ, ν): mỗi khối giải đúng
+        #   hàng: mức ρ_k = λ_k + ν với tổng hàng = Q_k, rồi ν theo tổng kho, λ_k = max(ρ_k - ν, 0)
+        #   cột: tương tự với σ_t = μ_t + ν
+        # S(c) nhảy bậc tại c = p => hàm đối ngẫu có gấp khúc, có thể dừng ở gap nhỏ > 0:
+        # lặp tới khi 1 vòng quét không còn giảm cận trên quá tol (tương đối)
+        dual = bound = np.inf
+        sweeps = 0
+        for sweeps in range(1, self.max_sweeps + 1):
+            start = (lam, mu, nu)
+            rho, steps["rows"] = _bisect_near(lambda r: allocate(r[:, None] + mu[None, :]).sum(axis=1) - self.Q,
+                                              lam + nu, steps["rows"], price_cap, xtol)
+            nu = solve_total(rho, mu, 1, "nu_rows")
+            lam = np.maximum(rho - nu, 0.0)
+            if throughput is not None:
+                sigma, steps["columns"] = _bisect_near(
+                    lambda c: allocate(lam[:, None] + c[None, :]).sum(axis=0) - throughput,
+                    mu + nu, steps["columns"], price_cap, xtol)
+                nu = solve_total(sigma, lam, 0, "nu_columns")
+                mu = np.maximum(sigma - nu, 0.0)
+
+            previous, dual = dual, dual_value(lam, mu, nu)
+            # λ với μ ghép chặt => block coordinate đi zíc zắc: thử ngoại suy cả vòng quét (x2 bước),
+            # giữ nếu cận trên giảm thêm
+            if sweeps > 1 and throughput is not None:
+                trial = tuple(np.maximum(2 * new - old, 0.0) for new, old in zip((lam, mu, nu), start))
+                trial_dual = dual_value(*trial)
+                if trial_dual < dual:
+                    (lam, mu, nu), dual = trial, trial_dual
+            bound = min(bound, dual)
+            if previous - dual <= self.tol * abs(dual):
+                break
+
+        cost = lam[:, None] + mu[None, :] + nu
+        allocations = self._make_feasible(cost, prices, base, throughput, eta=1e-6 * price_cap)
+        revenues = self.demand.expected_revenue(prices, allocations, base=base)
+
+        total = float(revenues.sum())
+        return MultiSKUResult(
+            allocations=allocations,
+            revenues=revenues,
+            total_revenue=total,
+            dual_bound=float(bound),
+            sku_prices=lam,
+            period_prices=mu,
+            capacity_price=float(nu),
+            sweeps=sweeps,
+        )
+
+    def _make_feasible(self, cost: np.ndarray, prices: np.ndarray, base: np.ndarray, throughput,
+                       eta: float) -> np.ndarray:
+        # ô hoà (c ≈ p): mọi x trong [0, (a - bp)(1 - Δ)] đều tối đa hoá hàm Lagrange (doanh thu tuyến tính ở đó)
+        # => firm = x khi bỏ các ô hoà, rồi lấp ô hoà theo phần trống của hàng / cột / tổng
+        # (như Offline 1 SKU chuẩn hoá về Q tại chỗ nhảy bậc); mọi bước chỉ co => khả thi
+        def shrink(totals, limits):
+            return np.where(totals > limits, limits / np.where(totals > 0, totals, 1.0), 1.0)
+
+        def room(used, extra, limits):
+            return np.clip((limits - used) / np.where(extra > 0, extra, 1.0), 0.0, 1.0)
+
+        firm = self._allocations(cost + eta, prices, base)
+        tie = np.maximum(self._allocations(cost - eta, prices, base) - firm, 0.0)
+
+        firm = firm * shrink(firm.sum(axis=1), self.Q)[:, None]
+        tie = tie * room(firm.sum(axis=1), tie.sum(axis=1), self.Q)[:, None]
+        if throughput is not None:
+            firm = firm * shrink(firm.sum(axis=0), throughput)[None, :]
+            tie = tie * room(firm.sum(axis=0), tie.sum(axis=0), throughput)[None, :]
+        if self.capacity is not None:
+            firm = firm * float(shrink(firm.sum(), self.capacity))
+            tie = tie * float(room(firm.sum(), tie.sum(), self.capacity))
+        return firm + tie
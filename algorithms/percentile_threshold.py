@@ -0,0 +1,157 @@
+## base line 5: chỉ bán khi giá hiện tại >= phân vị q (mặc định 75%) của các giá đã thấy (giá kỳ này chưa tính vào)
+## phân vị ước lượng dần bằng P² (Jain & Chlamtac 1985): 5 marker, mỗi giá mới O(1), bộ nhớ O(1)
+## => không sort lại lịch sử mỗi kỳ; P2Quantile vector hoá theo kịch bản (mọi hàng cùng số quan sát)
+## < 5 giá: phân vị chính xác trên mấy giá đã có; kỳ 1 -> m + q(M - m) (phân vị của U[m, M])
+
+import numpy as np
+from .base import Algorithm
+
+
+class P2Quantile:
+    """Streaming P² estimate of the q-quantile, one independent estimator per row."""
+
+    def __init__(self, q: float, size: int):
+        self.q = q
+        self.count = 0
+        self.heights = np.zeros((size, 5))
+        self.positions = np.tile(np.arange(1.0, 6.0), (size, 1))
+        self.desired = np.array([1.0, 1 + 2 * q, 1 + 4 * q, 3 + 2 * q, 5.0])
+        self.increments = np.array([0.0, q / 2, q, (1 + q) / 2, 1.0])
+
+    def value(self) -> np.ndarray:
+        if self.count >= 5:
+            return self.heights[:, 2].copy()
+        return np.quantile(self.heights[:, :self.count], self.q, axis=1)
+
+    def update(self, x):
+        x = np.asarray(x, dtype=float)
+        if self.count < 5:
+            self.heights[:, self.count] = x
+            self.count += 1
+            if self.count == 5:
+                self.heights.sort(axis=1)
+            return
+        self.count += 1
+
+        h = self.heights
+        h[:, 0] = np.minimum(h[:, 0], x)
+        h[:, 4] = np.maximum(h[:, 4], x)
+        # marker k+1..4 dời lên 1 với k = ô chứa x
+        cell = np.clip((x[:, None] >= h[:, 1:4]).sum(axis=1), 0, 3)
+        self.positions += np.arange(5)[None, :] > cell[:, None]
+        self.desired = self.desired + self.increments
+
+        n = self.positions
+        for i in (1, 2, 3):
+            d = self.desired[i] - n[:, i]
+            move = ((d >= 1) & (n[:, i + 1] - n[:, i] > 1)) | ((d <= -1) & (n[:, i - 1] - n[:, i] < -1))
+            if not np.any(move):
+                continue
+            step = np.where(d >= 0, 1.0, -1.0)
+
+            # parabolic; ra ngoài (h[i-1], h[i+1]) thì nội suy tuyến tính
+            parabolic = h[:, i] + step / (n[:, i + 1] - n[:, i - 1]) * (
+                (n[:, i] - n[:, i - 1] + step) * (h[:, i + 1] - h[:, i]) / (n[:, i + 1] - n[:, i])
+                + (n[:, i + 1] - n[:, i] - step) * (h[:, i] - h[:, i - 1]) / (n[:, i] - n[:, i - 1])
+            )
+            neighbour = np.where(step > 0, i + 1, i - 1)
+            rows = np.arange(len(h))
+            linear = h[:, i] + step * (h[rows, neighbour] - h[:, i]) / (n[rows, neighbour] - n[:, i])
+            inside = (h[:, i - 1] < parabolic) & (parabolic < h[:, i + 1])
+
+            h[:, i] = np.where(move, np.where(inside, parabolic, linear), h[:, i])
+            n[:, i] = np.where(move, n[:, i] + step, n[:, i])
+
+    def thresholds(self, xs) -> np.ndarray:
+        """Single-row estimator: feed `xs` in order, return the estimate seen before each one."""
+        # cùng thuật toán với update() nhưng thuần Python float: 1 chuỗi dài (run_long) thì numpy/kỳ quá chậm
+        xs = np.asarray(xs, dtype=float).tolist()
+        out = np.empty(len(xs))
+        start = 0
+        while start < len(xs) and self.count < 5:
+            out[start] = self.value()[0] if self.count else np.nan
+            self.update(np.array([xs[start]]))
+            start += 1
+        if start == len(xs):
+            return out
+
+        h = self.heights[0].tolist()
+        n = self.positions[0].tolist()
+        desired = self.desired.tolist()
+        increments = self.increments.tolist()
+        for k in range(start, len(xs)):
+            x = xs[k]
+            out[k] = h[2]
+            if x < h[0]:
+                h[0] = x
+            elif x > h[4]:
+                h[4] = x
+            cell = (x >= h[1]) + (x >= h[2]) + (x >= h[3])
+            for j in range(cell + 1, 5):
+                n[j] += 1
+            for j in range(5):
+                desired[j] += increments[j]
+
+            for i in (1, 2, 3):
+                d = desired[i] - n[i]
+                if not ((d >= 1 and n[i + 1] - n[i] > 1) or (d <= -1 and n[i - 1] - n[i] < -1)):
+                    continue
+                step = 1.0 if d >= 0 else -1.0
+                parabolic = h[i] + step / (n[i + 1] - n[i - 1]) * (
+                    (n[i] - n[i - 1] + step) * (h[i + 1] - h[i]) / (n[i + 1] - n[i])
+                    + (n[i + 1] - n[i] - step) * (h[i] - h[i - 1]) / (n[i] - n[i - 1])
+                )
+                if h[i - 1] < parabolic < h[i + 1]:
+                    h[i] = parabolic
+                else:
+                    j = i + int(step)
+                    h[i] = h[i] + step * (h[j] - h[i]) / (n[j] - n[i])
+                n[i] += step
+
+        self.heights[0] = h
+        self.positions[0] = n
+        self.desired = np.array(desired)
+        self.count += len(xs) - start
+        return out
+
+
+class PercentileThreshold(Algorithm):
+    batch_capable = True
+
+    def __init__(self, Q, m, M, demand, percentile: float = 0.75):
+        super().__init__(Q, m, M, demand)
+        self.percentile = percentile
+        self._estimator = P2Quantile(percentile, 0)
+
+    def name(self) -> str:
+        return f"{round(self.percentile * 100)}th-Percentile"
+
+    def _prior(self) -> float:
+        return self.m + self.percentile * (self.M - self.m)
+
+    def decide_batch(self, t: int, n: int, prices, inventory, cumulative) -> np.ndarray:
+        prices, inventory = np.broadcast_arrays(np.asarray(prices, dtype=float), np.asarray(inventory, dtype=float))
+        prices = np.atleast_1d(prices)
+        if t == 1 or len(self._estimator.heights) != len(prices):
+            self._estimator = P2Quantile(self.percentile, len(prices))
+
+        threshold = self._estimator.value() if self._estimator.count else np.full(len(prices), self._prior())
+        self._estimator.update(prices)
+
+        retrieval = np.where(prices < threshold, 0.0, self.demand.expected_array(prices))
+        return np.clip(retrieval, 0.0, np.maximum(inventory, 0.0)).reshape(inventory.shape)
+
+    def decide_chunk(self, t0: int, n: int, prices, inventory, cumulative) -> np.ndarray:
+        # 1 kịch bản: ngưỡng chỉ phụ thuộc giá => tính cả đoạn rồi cắt theo tồn kho 1 lần
+        prices = np.asarray(prices, dtype=float)
+        if t0 == 1 or len(self._estimator.heights) != 1:
+            self._estimator = P2Quantile(self.percentile, 1)
+
+        threshold = self._estimator.thresholds(prices)
+        threshold = np.where(np.isnan(threshold), self._prior(), threshold)
+        desired = np.where(prices < threshold, 0.0, self.demand.expected_array(prices))
+        return self._clip_to_inventory(desired, cumulative)
+
+    def decide(self, t: int, n: int, price: float, inventory: float, cumulative: float) -> float:
+        # state giữ giữa các lần gọi, reset ở t == 1
+        return float(self.decide_chunk(t, n, [price], inventory, cumulative)[0])
@@ -5,8 +5,25 @@ from .base import Algorithm
 
 
 class RandomPolicy(Algorithm):
+    batch_capable = True
+
     def name(self) -> str:
         return "Random"
 
     def decide(self, t: int, n: int, price: float, inventory: float, cumulative: float) -> float:
-        return np.random.uniform(0, 0.3) * inventory
\ No newline at end of file
+        return np.random.uniform(0, 0.3) * inventory
+
+    def decide_chunk(self, t0: int, n: int, prices, inventory, cumulative) -> np.ndarray:
+        # r_t = u_t * I_t, I_t = I_0 * Π_{s<t} (1 - u_s): rút u 1 lần cho cả đoạn
+        prices = np.asarray(prices, dtype=float)
+        fractions = np.random.uniform(0, 0.3, prices.shape)
+        start = np.broadcast_to(np.asarray(inventory, dtype=float), prices.shape[:-1])
+        kept = np.cumprod(1 - fractions, axis=-1)
+        remaining = np.expand_dims(start, -1) * np.concatenate(
+            [np.ones(prices.shape[:-1] + (1,)), kept[..., :-1]], axis=-1
+        )
+        return fractions * remaining
+
+    def plan(self, prices: np.ndarray) -> np.ndarray:
+        prices = np.atleast_2d(np.asarray(prices, dtype=float))
+        return self.decide_chunk(1, prices.shape[1], prices, float(self.Q), 0.0)
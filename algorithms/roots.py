@@ -0,0 +1,73 @@
+## giải nghiệm vector hoá: mỗi phần tử của mảng là 1 phương trình riêng
+## dùng cho các hàm g(x) giảm dần trên [lo, hi] (MR - giá sàn trong Stage 2)
+
+import numpy as np
+
+
+def bisect_decreasing(func, lo, hi, xtol: float = 1e-9, maxiter: int = 100) -> np.ndarray:
+    """Element-wise root of a non-increasing func on [lo, hi] (assumes func(lo) >= 0 >= func(hi))."""
+    lo = np.array(lo, dtype=float)
+    hi = np.array(hi, dtype=float)
+    lo, hi = np.broadcast_arrays(lo, hi)
+    lo, hi = lo.copy(), hi.copy()
+
+    for _ in range(maxiter):
+        mid = 0.5 * (lo + hi)
+        positive = func(mid) > 0
+        lo = np.where(positive, mid, lo)
+        hi = np.where(positive, hi, mid)
+        if np.all(hi - lo <= xtol):
+            break
+
+    return 0.5 * (lo + hi)
+
+
+def newton_decreasing(func, dfunc, lo, hi, xtol: float = 1e-9, maxiter: int = 50) -> np.ndarray:
+    """Safeguarded Newton (rtsafe) for a non-increasing func; falls back to bisection outside the bracket."""
+    lo = np.array(lo, dtype=float)
+    hi = np.array(hi, dtype=float)
+    lo, hi = np.broadcast_arrays(lo, hi)
+    lo, hi = lo.copy(), hi.copy()
+    x = 0.5 * (lo + hi)
+
+    for _ in range(maxiter):
+        g = func(x)
+        dg = dfunc(x)
+
+        positive = g > 0
+        lo = np.where(positive, x, lo)
+        hi = np.where(positive, hi, x)
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            x_new = x - g / dg
+        inside = (dg < 0) & (x_new > lo) & (x_new < hi)
+        x_new = np.where(inside, x_new, 0.5 * (lo + hi))
+
+        done = np.abs(x_new - x) <= xtol
+        x = x_new
+        if np.all(done):
+            break
+
+    return x
+
+
+def newton_decreasing_scalar(func, dfunc, lo: float, hi: float, xtol: float = 1e-9, maxiter: int = 50) -> float:
+    """Pure-Python newton_decreasing() for one equation (no numpy overhead per step)."""
+    x = 0.5 * (lo + hi)
+    for _ in range(maxiter):
+        g = func(x)
+        if g > 0:
+            lo = x
+        else:
+            hi = x
+
+        dg = dfunc(x)
+        x_new = x - g / dg if dg < 0 else lo - 1.0
+        if not (lo < x_new < hi):
+            x_new = 0.5 * (lo + hi)
+
+        if abs(x_new - x) <= xtol:
+            return x_new
+        x = x_new
+
+    return x
@@ -1,9 +1,12 @@
 ##base line 2
 
+import numpy as np
 from .base import Algorithm
 
 
 class FixedThreshold(Algorithm):
+    batch_capable = True
+
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self.price_threshold = (self.m + self.M) / 2
@@ -15,4 +18,12 @@ class FixedThreshold(Algorithm):
         if price < self.price_threshold:
             return 0.0
         exp_demand = self.demand.expected(price)
-        return min(exp_demand, inventory)
\ No newline at end of file
+        return min(exp_demand, inventory)
+
+    def decide_chunk(self, t0: int, n: int, prices, inventory, cumulative) -> np.ndarray:
+        prices = np.asarray(prices, dtype=float)
+        return self._clip_to_inventory(np.where(prices < self.price_threshold, 0.0, self.demand.expected_array(prices)), cumulative)
+
+    def plan(self, prices: np.ndarray) -> np.ndarray:
+        prices = np.atleast_2d(np.asarray(prices, dtype=float))
+        return self.decide_chunk(1, prices.shape[1], prices, float(self.Q), 0.0)
@@ -0,0 +1 @@
+#đừng ghi gì vào file này
\ No newline at end of file
@@ -0,0 +1,263 @@
+## benchmark bộ nhớ cho các đường chạy lớn: Algorithm.run, Offline.run, run_batch, export PDF, 3 hàm vẽ
+## mỗi (case, quy mô) chạy trong 1 process con riêng (RSS / cache matplotlib không lẫn giữa các case):
+##   peak     = đỉnh tracemalloc trong lúc chạy (numpy báo cấp phát cho tracemalloc => tính cả mảng)
+##   retained = bộ nhớ còn giữ sau gc khi kết quả vẫn được tham chiếu (list theo kỳ, revenues, figure quên đóng)
+##   rss      = đỉnh RSS tăng thêm so với trước khi chạy (chỉ để tham khảo, không so ngân sách)
+## khớp đường tăng trưởng bytes = c + slope · quy mô (bình phương tối thiểu) và số mũ log-log
+##   slope = bytes mỗi kỳ / mỗi kịch bản; vượt ngân sách trong memory_budgets.json quá tolerance -> exit 1
+## chạy từ thư mục gốc repo:
+##   python -m benchmarks.memory_suite                  # so với ngân sách
+##   python -m benchmarks.memory_suite --cases run_batch offline_run
+##   python -m benchmarks.memory_suite --update         # ghi lại ngân sách = đo được x headroom
+
+import argparse
+import gc
+import json
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+import numpy as np
+
+BUDGETS = Path(__file__).with_name("memory_budgets.json")
+
+
+def _setup(n: int = None, num_scenarios: int = None):
+    from algorithms.base import DemandModel
+    from fixtures.config_loader import ConfigLoader
+    from runner import build_algorithms
+
+    config = ConfigLoader().load_default_config()
+    if n is not None:
+        config.n = n
+    if num_scenarios is not None:
+        config.num_scenarios = num_scenarios
+    demand = DemandModel(config.a, config.b, config.delta,
+                         distribution=getattr(config, "demand_dist", "uniform"),
+                         sigma=getattr(config, "sigma", 0.15))
+    np.random.seed(0)
+    prices = np.random.uniform(config.m, config.M, config.n).tolist()
+    return config, demand, build_algorithms(config, demand), prices
+
+
+def _by_name(algorithms, name):
+    return next(alg for alg in algorithms if alg.name() == name)
+
+
+def _single(n: int):
+    # kết quả 1 lượt (mọi thuật toán) + trace theo kỳ, như stage "single" của main.py
+    from simulator import MultiPolicySimulator
+    from tracing import RingBufferSink
+
+    config, demand, algorithms, prices = _setup(n=n)
+    buffers = {alg.name(): RingBufferSink() for alg in algorithms}
+    results = MultiPolicySimulator(algorithms, demand).run(prices, buffers)
+    return config, prices, results, {name: sink.rows() for name, sink in buffers.items()}
+
+
+## mỗi case: quy mô -> hàm không tham số chạy phần cần đo và trả về kết quả (được giữ lại khi đo retained)
+## phần chuẩn bị (config, giá, kết quả đầu vào cho hàm vẽ) nằm ngoài vùng đo
+
+def case_algorithm_run(n: int):
+    _, _, algorithms, prices = _setup(n=n)
+    alg = algorithms[0]
+    return lambda: alg.run(prices)
+
+
+def case_offline_run(n: int):
+    _, _, algorithms, prices = _setup(n=n)
+    offline = _by_name(algorithms, "Offline")
+    return lambda: offline.run(prices)
+
+
+def case_run_batch(num_scenarios: int):
+    from runner import SimulationRunner
+
+    config, _, algorithms, _ = _setup(num_scenarios=num_scenarios)
+    runner = SimulationRunner(config)
+    return lambda: runner.run_batch(algorithms)
+
+
+def case_export_pdf(n: int, directory: str):
+    from terminal_to_pdf.export_pdf import export_results_to_pdf
+
+    _, _, results, traces = _single(n)
+    return lambda: export_results_to_pdf(results, f"{directory}/results.pdf", traces=traces)
+
+
+def case_plot_formula(n: int, directory: str):
+    from visualization.formula_proof import plot_formula_validation
+
+    config, prices, results, _ = _single(n)
+    return lambda: plot_formula_validation(results, prices, config, f"{directory}/01_formula_proof.png")
+
+
+def case_plot_comparison(num_scenarios: int, directory: str):
+    from models import BatchResult
+    from visualization.comparison import plot_algorithm_comparison
+
+    _, _, algorithms, _ = _setup()
+    rng = np.random.default_rng(0)
+    batch = {alg.name(): BatchResult(alg.name(), rng.normal(50_000, 3_000, num_scenarios).tolist())
+             for alg in algorithms}
+    return lambda: plot_algorithm_comparison(batch, f"{directory}/02_comparison.png")
+
+
+def case_plot_detailed(n: int, directory: str):
+    from visualization.detailed_analysis import plot_detailed_analysis
+
+    _, prices, results, _ = _single(n)
+    return lambda: plot_detailed_analysis(results, prices, f"{directory}/03_detailed_analysis.png")
+
+
+# tên -> (hàm, đơn vị quy mô, các quy mô đo, hàm có ghi file)
+# quy mô nhỏ cho matplotlib / reportlab: dưới tracemalloc chúng chậm đi nhiều lần
+CASES = {
+    "algorithm_run": (case_algorithm_run, "period", (1_000, 4_000, 16_000), False),
+    "offline_run": (case_offline_run, "period", (1_000, 4_000, 16_000), False),
+    "run_batch": (case_run_batch, "scenario", (100, 400, 1_600), False),
+    "export_pdf": (case_export_pdf, "period", (20, 40, 80), True),
+    "plot_formula": (case_plot_formula, "period", (50, 100, 200), True),
+    "plot_comparison": (case_plot_comparison, "scenario", (1_000, 4_000, 16_000), True),
+    "plot_detailed": (case_plot_detailed, "period", (50, 100, 200), True),
+}
+
+
+def _rss_bytes() -> int:
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * resource.getpagesize()
+
+
+def measure(case: str, scale: int) -> dict:
+    """Peak / retained tracemalloc bytes and RSS growth of one case at one scale (in this process)."""
+    func, _, _, writes = CASES[case]
+    with tempfile.TemporaryDirectory() as directory:
+        work = func(scale, directory) if writes else func(scale)
+        gc.collect()
+        rss_before = _rss_bytes()
+        tracemalloc.start()
+        baseline = tracemalloc.get_traced_memory()[0]
+        start = time.perf_counter()
+        kept = work()
+        elapsed = time.perf_counter() - start
+        peak = tracemalloc.get_traced_memory()[1]
+        gc.collect()
+        retained = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        # ru_maxrss: KiB trên Linux
+        rss = max(0, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024 - rss_before)
+        del kept
+    return {"scale": scale, "peak": peak - baseline, "retained": max(0, retained - baseline),
+            "rss": rss, "seconds": elapsed}
+
+
+def _measure_in_child(case: str, scale: int) -> dict:
+    completed = subprocess.run([sys.executable, "-m", "benchmarks.memory_suite", "--child", case, str(scale)],
+                               capture_output=True, text=True)
+    if completed.returncode != 0:
+        raise RuntimeError(completed.stderr.strip().splitlines()[-1] if completed.stderr.strip()
+                           else f"exit code {completed.returncode}")
+    # dòng cuối là JSON (các hàm được đo có thể in log)
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def fit_growth(scales, values) -> dict:
+    """bytes ≈ intercept + slope · scale, plus the log-log exponent (≈ 1 linear, > 1 superlinear)."""
+    scales = np.asarray(scales, dtype=float)
+    values = np.asarray(values, dtype=float)
+    slope, intercept = np.polyfit(scales, values, 1)
+    residual = values - (intercept + slope * scales)
+    total = np.sum((values - values.mean()) ** 2)
+    r2 = 1.0 - np.sum(residual ** 2) / total if total > 0 else 1.0
+    # số mũ trên phần tăng thêm so với điểm nhỏ nhất (bỏ chi phí cố định)
+    growth = values - values[0]
+    exponent = float(np.polyfit(np.log(scales[1:] - scales[0]), np.log(np.maximum(growth[1:], 1.0)), 1)[0]) \
+        if len(scales) > 2 and np.all(growth[1:] > 0) else float("nan")
+    return {"slope": float(max(slope, 0.0)), "intercept": float(intercept), "r2": float(r2),
+            "exponent": exponent}
+
+
+def _size(value: float) -> str:
+    for unit in ("B", "KiB", "MiB", "GiB"):
+        if abs(value) < 1024 or unit == "GiB":
+            return f"{value:,.1f} {unit}"
+        value /= 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Memory footprint regression suite")
+    parser.add_argument("--cases", nargs="+", choices=list(CASES), default=list(CASES))
+    parser.add_argument("--budgets", type=str, default=str(BUDGETS), help="Budget file (bytes per unit)")
+    parser.add_argument("--update", action="store_true", help="Write measured slopes x headroom as the budgets")
+    parser.add_argument("--headroom", type=float, default=1.25, help="Budget = measured slope x headroom (--update)")
+    parser.add_argument("--floor", type=float, default=256.0,
+                        help="Smallest budget in bytes per unit for the PDF / chart cases (--update)")
+    parser.add_argument("--child", nargs=2, metavar=("CASE", "SCALE"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        case, scale = args.child
+        print(json.dumps(measure(case, int(scale))))
+        return 0
+
+    path = Path(args.budgets)
+    budgets = json.loads(path.read_text()) if path.exists() else {"tolerance": 0.1, "cases": {}}
+    tolerance = budgets.get("tolerance", 0.1)
+    failures = []
+
+    print(f"{'Case':<16} {'Unit':<9} {'Peak/unit':>12} {'Budget':>12} {'Kept/unit':>12} {'Budget':>12} "
+          f"{'Exp':>5} {'R²':>6} {'RSS max':>11} {'Time':>7}")
+    print("-" * 112)
+    for case in args.cases:
+        _, unit, scales, renders = CASES[case]
+        # matplotlib / reportlab: cache font, glyph, ... làm slope dao động 0..~60 B/đơn vị giữa các lần chạy
+        # giống hệt => ngân sách tối thiểu `floor`; các case còn lại đo ổn định, không cần sàn
+        floor = args.floor if renders else 0.0
+        try:
+            points = [_measure_in_child(case, scale) for scale in scales]
+        except RuntimeError as e:
+            print(f"{case:<16} {unit:<9} ERROR: {e}")
+            failures.append(f"{case}: {e}")
+            continue
+
+        peak = fit_growth(scales, [p["peak"] for p in points])
+        kept = fit_growth(scales, [p["retained"] for p in points])
+        budget = budgets["cases"].get(case, {})
+        print(f"{case:<16} {unit:<9} {_size(peak['slope']):>12} "
+              f"{_size(budget['peak_per_unit']) if 'peak_per_unit' in budget else '-':>12} "
+              f"{_size(kept['slope']):>12} "
+              f"{_size(budget['retained_per_unit']) if 'retained_per_unit' in budget else '-':>12} "
+              f"{peak['exponent']:>5.2f} {peak['r2']:>6.3f} {_size(max(p['rss'] for p in points)):>11} "
+              f"{sum(p['seconds'] for p in points):>6.1f}s")
+
+        if args.update:
+            budgets["cases"][case] = {"unit": unit, "scales": list(scales),
+                                      "peak_per_unit": round(max(peak["slope"] * args.headroom, floor), 1),
+                                      "retained_per_unit": round(max(kept["slope"] * args.headroom, floor), 1)}
+            continue
+        for key, fit in (("peak_per_unit", peak), ("retained_per_unit", kept)):
+            if key in budget and fit["slope"] > budget[key] * (1 + tolerance):
+                failures.append(f"{case}: {key.replace('_', ' ')} {_size(fit['slope'])} "
+                                f"> budget {_size(budget[key])} (+{tolerance:.0%})")
+
+    if args.update:
+        budgets["tolerance"] = tolerance
+        path.write_text(json.dumps(budgets, indent=2) + "\n")
+        print(f"\nLog: budgets written to {path}")
+        return 0
+
+    if failures:
+        print("\nLog: MEMORY REGRESSION")
+        for failure in failures:
+            print(f"  - {failure}")
+        return 1
+    print("\nLog: all cases within budget")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
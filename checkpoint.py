@@ -0,0 +1,73 @@
+## checkpoint cho run_batch: tổng hợp từng phần (BatchSummary: count / mean / M2 / sketch), số kịch bản / khối
+## đã xong và trạng thái np.random => chạy tiếp (--resume) ra đúng kết quả như chạy 1 mạch
+## ghi ra file tạm rồi os.replace => bị kill giữa lúc ghi vẫn còn checkpoint cũ nguyên vẹn
+## doanh thu từng kịch bản (cho bootstrap / boxplot) ghi nối đuôi vào file .revenues, mỗi khối đúng 1 lần
+##   => tổng I/O ~ O(N) thay vì pickle lại cả list mỗi lần lưu; checkpoint nhớ số byte đã chốt,
+##   phần ghi sau lần lưu cuối (bị kill giữa chừng) bị cắt bỏ khi resume
+
+import hashlib
+import os
+import pickle
+from pathlib import Path
+from typing import Dict, Any, List, Optional
+
+import numpy as np
+
+
+def run_key(*parts) -> str:
+    """Fingerprint of everything that decides the batch results (config, algorithms, chunking)."""
+    return hashlib.sha256(repr(parts).encode()).hexdigest()
+
+
+class BatchCheckpoint:
+    def __init__(self, path):
+        self.path = Path(path)
+        self.revenue_path = self.path.with_name(self.path.name + ".revenues")
+
+    def exists(self) -> bool:
+        return self.path.exists()
+
+    def load(self, key: str) -> Optional[Dict[str, Any]]:
+        if not self.path.exists():
+            return None
+        with open(self.path, 'rb') as f:
+            state = pickle.load(f)
+        if state.get("key") != key:
+            raise ValueError(f"Checkpoint {self.path} was written by a different run (config or algorithms changed)")
+        return state
+
+    def save(self, key: str, **state):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_name(self.path.name + ".tmp")
+        with open(tmp_path, 'wb') as f:
+            pickle.dump({"key": key, **state}, f, protocol=pickle.HIGHEST_PROTOCOL)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+
+    def append_revenues(self, names: List[str], revenues: Dict[str, np.ndarray]) -> int:
+        """Append one (algorithms, scenarios) float64 block; returns the file size to commit in save()."""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.revenue_path, 'ab') as f:
+            np.save(f, np.array([revenues[name] for name in names], dtype=np.float64))
+            f.flush()
+            os.fsync(f.fileno())
+            return f.tell()
+
+    def load_revenues(self, names: List[str], size: int) -> Dict[str, List[np.ndarray]]:
+        """Revenues (one float64 array per saved block) committed up to byte `size`; anything after it is dropped."""
+        revenues = {name: [] for name in names}
+        if size == 0:
+            self.revenue_path.unlink(missing_ok=True)
+            return revenues
+        with open(self.revenue_path, 'r+b') as f:
+            f.truncate(size)
+            while f.tell() < size:
+                block = np.load(f)
+                for name, row in zip(names, block):
+                    revenues[name].append(row)
+        return revenues
+
+    def clear(self):
+        self.path.unlink(missing_ok=True)
+        self.revenue_path.unlink(missing_ok=True)
@@ -3,6 +3,8 @@ from pathlib import Path
 from typing import Dict, Any
 from dataclasses import dataclass
 
+from fixtures.scenario_catalog import open_catalog
+
 
 @dataclass
 class SimulationConfig:
@@ -18,6 +20,8 @@ class SimulationConfig:
 
     demand_dist: str = "uniform"
     sigma: float = 0.15
+    # Adaptive-Myopic bắt đầu từ đường cầu lệch: a·(1 - prior_error), b·(1 + prior_error)
+    prior_error: float = 0.3
 
     @property
     def theta(self) -> float:
@@ -31,8 +35,14 @@ class SimulationConfig:
 
 
 class ConfigLoader:
-    def __init__(self, data_dir: str = "data"):
+    def __init__(self, data_dir: str = "data", catalog: str = "test_scenarios.json"):
         self.data_dir = Path(data_dir)
+        # test_scenarios.json (mặc định), hoặc .jsonl / .sqlite cho catalog lớn
+        self.catalog_file = self.data_dir / catalog
+
+    @property
+    def catalog(self):
+        return open_catalog(self.catalog_file)
 
     def load_default_config(self) -> SimulationConfig:
         config_file = self.data_dir / "default_config.json"
@@ -44,29 +54,16 @@ class ConfigLoader:
         # Log: Fallback an toàn
         sim_params.setdefault("demand_dist", "uniform")
         sim_params.setdefault("sigma", 0.15)
+        sim_params.setdefault("prior_error", 0.3)
 
         return SimulationConfig(**sim_params)
 
     def load_scenario(self, scenario_name: str) -> SimulationConfig:
-        scenarios_file = self.data_dir / "test_scenarios.json"
-        with open(scenarios_file, 'r') as f:
-            data = json.load(f)
-
-        for scenario in data["scenarios"]:
-            if scenario["name"] == scenario_name:
-                return SimulationConfig(**scenario["params"])
-
-        raise ValueError(f"Scenario not found: {scenario_name}")
+        scenario = self.catalog.scenario(scenario_name)
+        return SimulationConfig(**scenario["params"])
 
     def load_fixed_prices(self, sequence_name: str) -> list[float]:
-        scenarios_file = self.data_dir / "test_scenarios.json"
-        with open(scenarios_file, 'r') as f:
-            data = json.load(f)
-
-        if sequence_name not in data["fixed_price_sequences"]:
-            raise ValueError(f"Price sequence not found: {sequence_name}")
-
-        return data["fixed_price_sequences"][sequence_name]
+        return self.catalog.price_sequence(sequence_name)
 
     def load_stores(self) -> list[Dict[str, Any]]:
         stores_file = self.data_dir / "vietnam_stores.json"
@@ -81,7 +78,4 @@ class ConfigLoader:
         return data["test_cases"]
 
     def get_available_scenarios(self) -> list[str]:
-        scenarios_file = self.data_dir / "test_scenarios.json"
-        with open(scenarios_file, 'r') as f:
-            data = json.load(f)
-        return [s["name"] for s in data["scenarios"]]
\ No newline at end of file
+        return self.catalog.scenario_names()
@@ -1,11 +1,14 @@
 from dataclasses import dataclass
 from typing import List
 
+import numpy as np
+
 
 @dataclass
 class ValidationResult:
     is_valid: bool
     errors: List[str]
+    num_invalid: int = 0
 
 
 class DataValidator:
@@ -34,6 +37,9 @@ class DataValidator:
         if not (0 <= config.delta < 1):
             errors.append("delta must be in [0, 1)")
 
+        if not 0 <= getattr(config, "prior_error", 0.3) < 1:
+            errors.append("prior_error must be in [0, 1)")
+
         if config.h < 0:
             errors.append("h must be non-negative")
 
@@ -41,10 +47,25 @@ class DataValidator:
 
     @staticmethod
     def validate_prices(prices: List[float], m: float, M: float) -> ValidationResult:
-        errors = []
+        _, result = DataValidator.validate_price_chunk(prices, m, M, clip=False, max_errors=None)
+        return result
 
-        for i, price in enumerate(prices):
-            if not (m <= price <= M):
-                errors.append(f"Price at period {i} ({price}) out of range [{m}, {M}]")
-
-        return ValidationResult(len(errors) == 0, errors)
\ No newline at end of file
+    @staticmethod
+    def validate_price_chunk(prices, m: float, M: float, clip: bool = True, offset: int = 0,
+                             max_errors: int = 10):
+        """Vectorized range check of a price chunk; with clip=True also returns it clipped to [m, M]."""
+        prices = np.asarray(prices, dtype=float)
+        bad = np.flatnonzero(~((prices >= m) & (prices <= M)))  # NaN cũng bị tính là sai
+
+        errors = [
+            f"Price at period {offset + i} ({prices[i]}) out of range [{m}, {M}]"
+            for i in (bad if max_errors is None else bad[:max_errors]).tolist()
+        ]
+        if max_errors is not None and len(bad) > max_errors:
+            errors.append(f"... and {len(bad) - max_errors} more prices out of range")
+
+        if clip and len(bad):
+            # NaN -> m (giá sàn), còn lại kẹp về [m, M]
+            prices = np.clip(np.nan_to_num(prices, nan=m), m, M)
+
+        return prices, ValidationResult(len(bad) == 0, errors, int(len(bad)))
@@ -0,0 +1,101 @@
+## đọc lịch sử giá dài (tick / ngày) theo từng đoạn, không dựng cả list trong bộ nhớ
+## .npy     : memmap, 1 chiều = 1 chuỗi giá; 2 chiều = (kịch bản, n) -> từng khối hàng cho run_batch
+## .csv     : pandas read_csv(chunksize)
+## .parquet : pyarrow iter_batches (cần cài pyarrow)
+
+from pathlib import Path
+
+import numpy as np
+
+from fixtures.data_validator import DataValidator
+
+
+def _parquet_file(path: Path):
+    try:
+        import pyarrow.parquet as pq
+    except ImportError as e:
+        raise ImportError("Reading .parquet price files requires pyarrow (pip install pyarrow)") from e
+    return pq.ParquetFile(str(path))
+
+
+def count_prices(path, column: str = None) -> int:
+    """Number of prices (rows of scenarios for a 2-D .npy) without loading the file."""
+    path = Path(path)
+    if path.suffix == ".npy":
+        return np.load(path, mmap_mode="r").shape[0]
+    if path.suffix == ".parquet":
+        return _parquet_file(path).metadata.num_rows
+    if path.suffix == ".csv":
+        # đếm bằng đúng reader của iter_price_file: dòng trống, xuống dòng trong ngoặc kép, cột -> khớp số giá sẽ đọc
+        return sum(len(chunk) for chunk in iter_price_file(path, column=column))
+    raise ValueError(f"Unsupported price file: {path.suffix}")
+
+
+def iter_price_file(path, chunk_size: int = 1_000_000, column: str = None):
+    path = Path(path)
+
+    if path.suffix == ".npy":
+        data = np.load(path, mmap_mode="r")
+        for start in range(0, data.shape[0], chunk_size):
+            yield np.asarray(data[start:start + chunk_size], dtype=float)
+
+    elif path.suffix == ".csv":
+        import pandas as pd
+        reader = pd.read_csv(path, usecols=[column] if column else None, chunksize=chunk_size,
+                             dtype=float, engine="c")
+        for frame in reader:
+            series = frame[column] if column else frame.iloc[:, -1]
+            yield series.to_numpy(dtype=float)
+
+    elif path.suffix == ".parquet":
+        parquet = _parquet_file(path)
+        columns = [column] if column else [parquet.schema_arrow.names[-1]]
+        for batch in parquet.iter_batches(batch_size=chunk_size, columns=columns):
+            yield batch.column(0).to_numpy(zero_copy_only=False).astype(float)
+
+    else:
+        raise ValueError(f"Unsupported price file: {path.suffix}")
+
+
+class PriceStream:
+    """Validated, clipped price chunks from a file; iterate it straight into run_long / run_batch."""
+
+    def __init__(self, path, m: float, M: float, chunk_size: int = 1_000_000,
+                 column: str = None, clip: bool = True):
+        self.path = Path(path)
+        self.m = m
+        self.M = M
+        self.chunk_size = chunk_size
+        self.column = column
+        self.clip = clip
+
+        self.n = count_prices(self.path, column)
+        # .npy 2 chiều: mỗi hàng là 1 kịch bản gồm `periods` kỳ
+        self.periods = None
+        if self.path.suffix == ".npy":
+            shape = np.load(self.path, mmap_mode="r").shape
+            if len(shape) == 2:
+                self.periods = shape[1]
+        self.num_clipped = 0
+        self.errors = []
+
+    def __len__(self) -> int:
+        return self.n
+
+    def __iter__(self):
+        self.num_clipped = 0
+        self.errors = []
+        offset = 0
+
+        for chunk in iter_price_file(self.path, self.chunk_size, self.column):
+            chunk, validation = DataValidator.validate_price_chunk(
+                chunk, self.m, self.M, clip=self.clip, offset=offset
+            )
+            if not validation.is_valid:
+                if not self.clip:
+                    raise ValueError(validation.errors[0])
+                self.num_clipped += validation.num_invalid
+                self.errors.extend(validation.errors[:max(0, 10 - len(self.errors))])
+
+            offset += len(chunk)
+            yield chunk
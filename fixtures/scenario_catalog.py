@@ -0,0 +1,181 @@
+## catalog kịch bản + chuỗi giá cố định, 3 định dạng:
+##   .json   : file test_scenarios.json như cũ, parse 1 lần + index theo tên
+##   .jsonl  : mỗi dòng 1 bản ghi, chỉ quét tên + offset, đọc bản ghi khi cần (lazy)
+##   .sqlite : bảng scenarios / price_sequences, truy vấn theo khoá chính
+## open_catalog() cache theo đường dẫn, tự mở lại khi mtime của file đổi
+
+import json
+import re
+import sqlite3
+from pathlib import Path
+from typing import Dict, Any, List
+
+
+class JsonScenarioCatalog:
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        with open(self.path, 'r') as f:
+            data = json.load(f)
+
+        self._scenarios = {s["name"]: s for s in data.get("scenarios", [])}
+        self._sequences = data.get("fixed_price_sequences", {})
+
+    def scenario(self, name: str) -> Dict[str, Any]:
+        if name not in self._scenarios:
+            raise ValueError(f"Scenario not found: {name}")
+        return self._scenarios[name]
+
+    def price_sequence(self, name: str) -> List[float]:
+        if name not in self._sequences:
+            raise ValueError(f"Price sequence not found: {name}")
+        return list(self._sequences[name])
+
+    def scenario_names(self) -> List[str]:
+        return list(self._scenarios)
+
+    def sequence_names(self) -> List[str]:
+        return list(self._sequences)
+
+
+class JsonlScenarioCatalog:
+    """One record per line: {"kind": "scenario"|"prices", "name": ..., ...}."""
+
+    # "kind" và "name" luôn đứng đầu dòng (write_catalog ghi đúng thứ tự này) -> khỏi json.loads khi index
+    _HEAD = re.compile(rb'^\{"kind":\s*"(\w+)",\s*"name":\s*("(?:[^"\\]|\\.)*")')
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._offsets = {"scenario": {}, "prices": {}}
+
+        with open(self.path, 'rb') as f:
+            offset = 0
+            for line in f:
+                match = self._HEAD.match(line)
+                if match:
+                    kind, name = match.group(1).decode(), json.loads(match.group(2))
+                elif line.strip():
+                    record = json.loads(line)
+                    kind, name = record["kind"], record["name"]
+                else:
+                    offset += len(line)
+                    continue
+                self._offsets[kind][name] = offset
+                offset += len(line)
+
+    def _read(self, kind: str, name: str) -> Dict[str, Any]:
+        with open(self.path, 'rb') as f:
+            f.seek(self._offsets[kind][name])
+            return json.loads(f.readline())
+
+    def scenario(self, name: str) -> Dict[str, Any]:
+        if name not in self._offsets["scenario"]:
+            raise ValueError(f"Scenario not found: {name}")
+        return self._read("scenario", name)
+
+    def price_sequence(self, name: str) -> List[float]:
+        if name not in self._offsets["prices"]:
+            raise ValueError(f"Price sequence not found: {name}")
+        return self._read("prices", name)["prices"]
+
+    def scenario_names(self) -> List[str]:
+        return list(self._offsets["scenario"])
+
+    def sequence_names(self) -> List[str]:
+        return list(self._offsets["prices"])
+
+
+class SqliteScenarioCatalog:
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+
+    def scenario(self, name: str) -> Dict[str, Any]:
+        row = self._conn.execute(
+            "SELECT description, params FROM scenarios WHERE name = ?", (name,)
+        ).fetchone()
+        if row is None:
+            raise ValueError(f"Scenario not found: {name}")
+        return {"name": name, "description": row[0], "params": json.loads(row[1])}
+
+    def price_sequence(self, name: str) -> List[float]:
+        row = self._conn.execute(
+            "SELECT prices FROM price_sequences WHERE name = ?", (name,)
+        ).fetchone()
+        if row is None:
+            raise ValueError(f"Price sequence not found: {name}")
+        return json.loads(row[0])
+
+    def scenario_names(self) -> List[str]:
+        return [r[0] for r in self._conn.execute("SELECT name FROM scenarios ORDER BY rowid")]
+
+    def sequence_names(self) -> List[str]:
+        return [r[0] for r in self._conn.execute("SELECT name FROM price_sequences ORDER BY rowid")]
+
+    def close(self):
+        self._conn.close()
+
+
+_BACKENDS = {
+    ".json": JsonScenarioCatalog,
+    ".jsonl": JsonlScenarioCatalog,
+    ".sqlite": SqliteScenarioCatalog,
+    ".db": SqliteScenarioCatalog,
+}
+
+# path -> (mtime_ns, catalog)
+_open_catalogs = {}
+
+
+def open_catalog(path):
+    path = Path(path)
+    if path.suffix not in _BACKENDS:
+        raise ValueError(f"Unsupported catalog format: {path.suffix}")
+
+    mtime = path.stat().st_mtime_ns
+    cached = _open_catalogs.get(path.resolve())
+    if cached is not None and cached[0] == mtime:
+        return cached[1]
+
+    catalog = _BACKENDS[path.suffix](path)
+    _open_catalogs[path.resolve()] = (mtime, catalog)
+    return catalog
+
+
+def write_catalog(source, destination):
+    """Convert any catalog (e.g. test_scenarios.json) into .json / .jsonl / .sqlite."""
+    source = open_catalog(source)
+    destination = Path(destination)
+    scenarios = [source.scenario(name) for name in source.scenario_names()]
+    sequences = {name: source.price_sequence(name) for name in source.sequence_names()}
+
+    if destination.suffix == ".json":
+        with open(destination, 'w') as f:
+            json.dump({"scenarios": scenarios, "fixed_price_sequences": sequences}, f, indent=2)
+
+    elif destination.suffix == ".jsonl":
+        with open(destination, 'w') as f:
+            for s in scenarios:
+                record = {"kind": "scenario", "name": s["name"],
+                          "description": s.get("description", ""), "params": s["params"]}
+                f.write(json.dumps(record) + "\n")
+            for name, prices in sequences.items():
+                f.write(json.dumps({"kind": "prices", "name": name, "prices": prices}) + "\n")
+
+    elif destination.suffix in (".sqlite", ".db"):
+        destination.unlink(missing_ok=True)
+        conn = sqlite3.connect(str(destination))
+        conn.execute("CREATE TABLE scenarios (name TEXT PRIMARY KEY, description TEXT, params TEXT)")
+        conn.execute("CREATE TABLE price_sequences (name TEXT PRIMARY KEY, prices TEXT)")
+        conn.executemany(
+            "INSERT INTO scenarios VALUES (?, ?, ?)",
+            [(s["name"], s.get("description", ""), json.dumps(s["params"])) for s in scenarios],
+        )
+        conn.executemany(
+            "INSERT INTO price_sequences VALUES (?, ?)",
+            [(name, json.dumps(prices)) for name, prices in sequences.items()],
+        )
+        conn.commit()
+        conn.close()
+
+    else:
+        raise ValueError(f"Unsupported catalog format: {destination.suffix}")
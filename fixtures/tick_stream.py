@@ -0,0 +1,153 @@
+## gom tick giá (thời điểm bất kỳ, tần suất cao) thành 1 giá mỗi kỳ cho các thuật toán
+## kỳ p = floor((ts - origin) / period); giá kỳ: last (tick muộn nhất theo ts), vwap (Σ p·q / Σ q) hoặc mean
+## tick tới trễ / sai thứ tự vẫn nhận nếu còn trong watermark:
+##   kỳ p đóng khi max ts đã thấy - watermark >= hết kỳ p; tick của kỳ đã đóng -> bỏ, đếm num_late
+## bộ nhớ: chỉ giữ các kỳ chưa đóng (~ watermark / period + 2 kỳ), mỗi kỳ 6 số
+## push_many vector hoá (sắp theo (kỳ, ts) + reduceat), tick đã theo thứ tự thì bỏ qua bước sắp
+##   => vài triệu tick / giây / process; kỳ không có tick lấy lại giá kỳ trước
+## đọc file tick: .csv (pandas chunksize) / .parquet (pyarrow), cột thời gian là số giây hoặc chuỗi ngày giờ
+
+from pathlib import Path
+
+import numpy as np
+
+from fixtures.price_stream import _parquet_file
+
+AGGREGATIONS = ("last", "vwap", "mean")
+
+
+class TickAggregator:
+    def __init__(self, period: float, how: str = "last", watermark: float = 0.0, origin: float = None):
+        if how not in AGGREGATIONS:
+            raise ValueError(f"Unknown tick aggregation: {how} (use one of {', '.join(AGGREGATIONS)})")
+        if period <= 0 or watermark < 0:
+            raise ValueError("period must be > 0 and watermark >= 0")
+        self.period = float(period)
+        self.how = how
+        self.watermark = float(watermark)
+        # mốc đầu kỳ 0; None => đầu kỳ chứa tick đầu tiên
+        self.origin = origin
+
+        self.max_ts = -np.inf
+        self.next_period = None  # kỳ nhỏ nhất chưa đóng
+        self.last_price = None
+        # kỳ chưa đóng -> [số tick, Σp, Σq, Σp·q, ts của tick cuối, giá tick cuối]
+        self._open = {}
+
+        self.num_ticks = 0
+        self.num_late = 0
+        self.num_periods = 0
+
+    def _index(self, ts):
+        return np.floor((ts - self.origin) / self.period).astype(np.int64)
+
+    def _closed_until(self, max_ts) -> np.ndarray:
+        # kỳ < giá trị này đã đóng (theo max ts đã thấy tới lúc đó)
+        max_ts = np.asarray(max_ts, dtype=float)
+        seen = np.isfinite(max_ts)
+        closed = self._index(np.where(seen, max_ts, self.origin) - self.watermark)
+        return np.where(seen, np.maximum(closed, self.next_period), self.next_period)
+
+    def push(self, ts: float, price: float, qty: float = 1.0) -> np.ndarray:
+        return self.push_many(np.array([ts]), np.array([price]), np.array([qty]))
+
+    def push_many(self, ts, prices, qty=None) -> np.ndarray:
+        """Add ticks (any order); returns the prices of the periods closed by them, oldest first."""
+        ts = np.asarray(ts, dtype=float)
+        prices = np.asarray(prices, dtype=float)
+        qty = np.ones_like(prices) if qty is None else np.asarray(qty, dtype=float)
+        if ts.size == 0:
+            return np.empty(0)
+
+        if self.origin is None:
+            self.origin = np.floor(ts[0] / self.period) * self.period
+        if self.next_period is None:
+            self.next_period = int(self._index(ts[0] - self.watermark))
+        self.num_ticks += ts.size
+
+        # trễ hay không tính như khi nhận lần lượt từng tick: theo max ts trước tick đó
+        seen = np.maximum.accumulate(np.concatenate([[self.max_ts], ts[:-1]]))
+        self.max_ts = max(float(seen[-1]), float(ts[-1]))
+        index = self._index(ts)
+        on_time = index >= self._closed_until(seen)
+        if not on_time.all():
+            self.num_late += int(np.count_nonzero(~on_time))
+            ts, prices, qty, index = ts[on_time], prices[on_time], qty[on_time], index[on_time]
+        if ts.size:
+            self._merge(ts, prices, qty, index)
+        return self._emit(int(self._closed_until(self.max_ts)))
+
+    def _merge(self, ts, prices, qty, index):
+        in_order = ts.size < 2 or bool(np.all(np.diff(ts) >= 0))
+        if not in_order:
+            order = np.lexsort((ts, index))
+            ts, prices, qty, index = ts[order], prices[order], qty[order], index[order]
+
+        starts = np.flatnonzero(np.concatenate([[True], index[1:] != index[:-1]]))
+        ends = np.concatenate([starts[1:], [index.size]]) - 1
+        counts = np.diff(np.concatenate([starts, [index.size]]))
+        sums = [np.add.reduceat(values, starts) for values in (prices, qty, prices * qty)]
+
+        for k, period in enumerate(index[starts].tolist()):
+            bucket = self._open.get(period)
+            row = [counts[k], sums[0][k], sums[1][k], sums[2][k], ts[ends[k]], prices[ends[k]]]
+            if bucket is None:
+                self._open[period] = row
+                continue
+            for j in range(4):
+                bucket[j] += row[j]
+            if row[4] >= bucket[4]:
+                bucket[4], bucket[5] = row[4], row[5]
+
+    def _price(self, bucket) -> float:
+        count, total, volume, weighted, _, last = bucket
+        if self.how == "last":
+            return float(last)
+        if self.how == "vwap" and volume > 0:
+            return float(weighted / volume)
+        return float(total / count)
+
+    def _emit(self, until: int) -> np.ndarray:
+        closed = []
+        for period in range(self.next_period, until):
+            bucket = self._open.pop(period, None)
+            if bucket is not None:
+                self.last_price = self._price(bucket)
+            if self.last_price is not None:  # chưa có tick nào => chưa bắt đầu phát kỳ
+                closed.append(self.last_price)
+        self.next_period = max(self.next_period, until)
+        self.num_periods += len(closed)
+        return np.array(closed)
+
+    def flush(self) -> np.ndarray:
+        """Close every open period (end of the feed)."""
+        if not self._open:
+            return np.empty(0)
+        return self._emit(max(self._open) + 1)
+
+
+def iter_tick_file(path, chunk_size: int = 1_000_000, time_column: str = "timestamp",
+                   price_column: str = "price", volume_column: str = None):
+    """(timestamps in seconds, prices, volumes or None) chunks from a .csv / .parquet tick file."""
+    path = Path(path)
+    columns = [time_column, price_column] + ([volume_column] if volume_column else [])
+
+    if path.suffix == ".csv":
+        import pandas as pd
+        frames = pd.read_csv(path, usecols=columns, chunksize=chunk_size, engine="c")
+    elif path.suffix == ".parquet":
+        frames = (batch.to_pandas() for batch in
+                  _parquet_file(path).iter_batches(batch_size=chunk_size, columns=columns))
+    else:
+        raise ValueError(f"Unsupported tick file: {path.suffix}")
+
+    for frame in frames:
+        yield (_seconds(frame[time_column]), frame[price_column].to_numpy(dtype=float),
+               frame[volume_column].to_numpy(dtype=float) if volume_column else None)
+
+
+def _seconds(column) -> np.ndarray:
+    if column.dtype.kind in "iuf":
+        return column.to_numpy(dtype=float)
+    import pandas as pd
+    return pd.to_datetime(column).to_numpy(dtype="datetime64[ns]").astype(np.int64) / 1e9
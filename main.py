@@ -1,4 +1,6 @@
 import os
+import time
+import atexit
 import argparse
 import numpy as np
 from pathlib import Path
@@ -7,17 +9,24 @@ from config import OUTPUT_DIR
 from fixtures.config_loader import ConfigLoader
 from fixtures.scenario_generator import ScenarioGenerator
 from fixtures.data_validator import DataValidator
+from fixtures.price_stream import PriceStream
+from fixtures.tick_stream import AGGREGATIONS, TickAggregator, iter_tick_file
 
 from algorithms.base import DemandModel
-from algorithms.alg_ir import ALG_IR
-from algorithms.alg_ir_h import ALG_IR_H
-from algorithms.myopic import Myopic
-from algorithms.offline import Offline
-from algorithms.constant_rate import ConstantRate
-from algorithms.threshold import FixedThreshold
-from algorithms.random_policy import RandomPolicy
-
-from runner import SimulationRunner
+from algorithms.offline_cache import OfflineCache
+from algorithms.offline_multi_sku import MultiSKUOffline
+
+from runner import SimulationRunner, build_algorithms
+from sampling import SAMPLING_MODES, variance_report
+from risk import TailRiskEstimator
+from bootstrap import paired_bootstrap
+from simulator import MultiPolicySimulator, OnlineSession
+from pipeline import Pipeline
+from sharding import ShardSpec, run_shard_worker, merge_shards
+from checkpoint import BatchCheckpoint
+from tracing import FileTraceSink, RingBufferSink, SampledTraceSink, TeeTraceSink
+from algorithms.offline_incremental import RatioMonitorSink
+from adversarial import AdversarialSearch
 from visualization.formula_proof import plot_formula_validation
 from visualization.comparison import plot_algorithm_comparison
 from visualization.detailed_analysis import plot_detailed_analysis
@@ -26,16 +35,304 @@ from terminal_to_pdf.export_pdf import export_results_to_pdf
 
 
 
+def print_results_summary(batch_results, intervals=None, stream=print):
+    """batch_results: name -> BatchResult or BatchSummary (anything with .mean and .std).
+
+    intervals: name -> BootstrapResult (paired_bootstrap) to add 95% CI columns.
+    """
+    width = 60 if intervals is None else 118
+    stream("\n" + "=" * width)
+    stream("RESULTS SUMMARY")
+    stream("=" * width)
+
+    sorted_batch = sorted(batch_results.items(), key=lambda x: -x[1].mean)
+    offline_mean = batch_results["Offline"].mean
+
+    header = f"{'Algorithm':<20} {'Mean Revenue':>15} {'Std Dev':>12} {'CR':>8}"
+    if intervals is not None:
+        level = f"{next(iter(intervals.values())).confidence:.0%}"
+        header += f"   {'Mean ' + level + ' CI':>21} {'Std ' + level + ' CI':>17} {'CR ' + level + ' CI':>17}"
+    stream(header)
+    stream("-" * width)
+    for name, result in sorted_batch:
+        cr = result.mean / offline_mean
+        line = f"{name:<20} ${result.mean:>14,.0f} ${result.std:>11,.0f} {cr:>7.3f}"
+        if intervals is not None:
+            ci = intervals[name]
+            line += (f"   [{ci.mean_ci[0]:>9,.0f}, {ci.mean_ci[1]:>9,.0f}]"
+                     f" [{ci.std_ci[0]:>7,.0f}, {ci.std_ci[1]:>7,.0f}]"
+                     f" [{ci.ratio_ci[0]:>7.4f}, {ci.ratio_ci[1]:>7.4f}]")
+        stream(line)
+
+
+def print_variance_report(batch_results, group_size: int, mode: str, stream=print):
+    try:
+        report = variance_report(batch_results, group_size)
+    except ValueError as e:
+        stream(f"Log: no variance report: {e}")
+        return
+
+    stream("\n" + "=" * 60)
+    stream(f"VARIANCE REDUCTION ({mode} vs iid, same number of scenarios)")
+    stream("=" * 60)
+    stream(f"{'Algorithm':<20} {'SE Mean':>10} {'VR Mean':>9} {'SE CR':>9} {'VR CR':>8}")
+    stream("-" * 60)
+    for name, row in sorted(report.items(), key=lambda x: -x[1]["mean"]):
+        if name == "Offline":
+            stream(f"{name:<20} {row['mean_se']:>10,.1f} {row['mean_reduction']:>8.2f}x {'-':>9} {'-':>8}")
+        else:
+            stream(f"{name:<20} {row['mean_se']:>10,.1f} {row['mean_reduction']:>8.2f}x "
+                   f"{row['cr_se']:>9.4f} {row['cr_reduction']:>7.2f}x")
+
+
+def print_quantiles(summaries, levels=(0.05, 0.25, 0.5, 0.75, 0.95), stream=print):
+    # phân vị doanh thu từ sketch của BatchSummary (gộp shard => không còn list doanh thu đầy đủ)
+    width = 20 + 13 * len(levels)
+    stream("\n" + "=" * width)
+    stream("REVENUE QUANTILES (sketch)")
+    stream("=" * width)
+    stream(f"{'Algorithm':<20}" + "".join(f"{f'P{q * 100:g}':>13}" for q in levels))
+    stream("-" * width)
+    for name, summary in sorted(summaries.items(), key=lambda x: -x[1].mean):
+        stream(f"{name:<20}" + "".join(f" ${summary.quantile(q):>11,.0f}" for q in levels))
+
+
+def check_precision(runner, algorithms, num_scenarios: int, tolerance: float):
+    # so 1 mẫu kịch bản với float64; sai số vượt tolerance -> chạy batch bằng float64
+    check = runner.check_precision(algorithms, num_scenarios)
+    print(f"Log: {check.precision} accuracy check on {check.scenarios} scenarios: "
+          f"max relative revenue error {check.max_revenue_error:.2e}, max CR error {check.max_ratio_error:.2e}")
+    if max(check.max_revenue_error, check.max_ratio_error) > tolerance:
+        worst = max(check.revenue_error, key=check.revenue_error.get)
+        print(f"Log: error above {tolerance:.0e} (worst: {worst}), falling back to float64")
+        runner.precision = "float64"
+
+
+def run_ticks(args, config, algorithms, demand):
+    # tick -> kỳ (TickAggregator) -> bước quyết định của mọi thuật toán (OnlineSession) ngay khi kỳ đóng
+    print(f"\nLog: TICK MODE: {args.ticks}, {args.tick_period:g}s periods ({args.tick_price}), "
+          f"watermark {args.watermark:g}s, n={config.n}")
+    aggregator = TickAggregator(args.tick_period, args.tick_price, args.watermark)
+    session = OnlineSession(algorithms, demand, config.n, h=config.h)
+
+    start = time.perf_counter()
+    for timestamps, prices, volumes in iter_tick_file(args.ticks, args.chunk_size, volume_column=args.tick_volume):
+        session.step_many(np.clip(aggregator.push_many(timestamps, prices, volumes), config.m, config.M))
+        if session.done:
+            break
+    if not session.done:
+        session.step_many(np.clip(aggregator.flush(), config.m, config.M))
+    elapsed = time.perf_counter() - start
+
+    print(f"Log: {aggregator.num_ticks:,} ticks in {elapsed:.1f}s ({aggregator.num_ticks / max(elapsed, 1e-9):,.0f}/s), "
+          f"{aggregator.num_late:,} late dropped, {session.t} periods decided")
+    print(f"{'Algorithm':<20} {'Total Revenue':>18} {'Retrieved':>14} {'Final Inv':>12}")
+    print("-" * 66)
+    for name, result in session.results().items():
+        print(f"{name:<20} ${result.total_revenue:>17,.0f} {sum(result.retrievals):>14,.1f} "
+              f"{result.inventory[-1]:>12,.1f}")
+
+
+def run_multi_sku(config, demand, loader, num_skus: int, store_code: str, capacity: float = None):
+    # SKU ngẫu nhiên quanh config (Q, a, b x U[0.5, 1.5]), giá riêng từng SKU, chung năng lực kho
+    store = next((s for s in loader.load_stores() if s["code"] == store_code), None)
+    if store is None:
+        print(f"Log: unknown store {store_code}")
+        return
+    throughput = store["max_capacity"]
+    spread = lambda value: value * np.random.uniform(0.5, 1.5, num_skus)
+    Q, a, b = spread(config.Q), spread(config.a), spread(config.b)
+    prices = np.random.uniform(config.m, config.M, (num_skus, config.n))
+
+    print(f"\nLog: MULTI-SKU OFFLINE: {num_skus} SKUs x {config.n} periods, {store['name']} "
+          f"({throughput:,} units / period" + (f", {capacity:,.0f} per season)" if capacity else ")"))
+    start = time.perf_counter()
+    coupled = MultiSKUOffline(Q, a, b, demand, throughput=throughput, capacity=capacity).solve(prices)
+    elapsed = time.perf_counter() - start
+    separate = MultiSKUOffline(Q, a, b, demand).solve(prices)
+
+    print(f"{'':<28} {'Revenue':>16} {'Retrieved':>12} {'Gap':>9}")
+    print("-" * 68)
+    for label, result in (("Separate (no shared cap)", separate), ("Coupled", coupled)):
+        print(f"{label:<28} ${result.total_revenue:>15,.0f} {result.allocations.sum():>12,.0f} {result.gap:>8.2e}")
+    print(f"Log: coupled solve {elapsed:.2f}s, {coupled.sweeps} sweeps; capacity costs "
+          f"{1 - coupled.total_revenue / separate.total_revenue:.1%} of the separate revenue")
+    busiest = np.argsort(-coupled.period_prices)[:5]
+    print("Log: highest capacity shadow prices: " +
+          ", ".join(f"t={t + 1}: {coupled.period_prices[t]:.1f}" for t in busiest))
+
+
+## các stage của lượt chạy mặc định (pipeline.py): hàm cấp module => mã nguồn của chúng nằm trong cache key
+## np.random dùng chung: prices -> single -> batch nối nhau bằng trạng thái RNG (kết quả như chạy tuần tự),
+## các stage còn lại (vẽ, PDF, bootstrap, summary) không rút số ngẫu nhiên nên chạy song song được
+
+def stage_prices(seed, config, fixed=None, runner=None):
+    np.random.seed(seed)
+    prices = list(fixed) if fixed is not None else runner.generate_prices()
+    return {"prices": prices, "rng": np.random.get_state()}
+
+
+def stage_single(generated, settings, fixed, monitor_every=None, config=None, algorithms=None, demand=None):
+    np.random.set_state(generated["rng"])
+    prices = generated["prices"]
+    # --monitor-ratio: CR của từng thuật toán online so với Offline hindsight, cập nhật theo kỳ
+    monitors = {}
+    if monitor_every:
+        monitors = {alg.name(): RatioMonitorSink(config.Q, demand, every=monitor_every)
+                    for alg in algorithms if alg.name() != "Offline"}
+
+    if fixed:
+        results = {alg.name(): alg.run(prices, sink=monitors.get(alg.name())) for alg in algorithms}
+        traces = None
+    else:
+        buffers = {alg.name(): RingBufferSink() for alg in algorithms}
+        sinks = {name: TeeTraceSink(sink, monitors[name]) if name in monitors else sink
+                 for name, sink in buffers.items()}
+        results = MultiPolicySimulator(algorithms, demand).run(prices, sinks)
+        traces = {name: sink.rows() for name, sink in buffers.items()}
+    return {"results": results, "traces": traces, "rng": np.random.get_state()}
+
+
+def stage_pdf(single, path):
+    export_results_to_pdf(single["results"], path, traces=single["traces"])
+    return path
+
+
+def stage_batch(single, settings, precision_check, precision_tolerance, checkpoint_every, resume,
+                runner=None, algorithms=None, price_stream=None, checkpoint=None, trace=None):
+    np.random.set_state(single["rng"])
+    if settings["precision"] != "float64" and precision_check > 0:
+        check_precision(runner, algorithms, precision_check, precision_tolerance)
+    results = runner.run_batch(algorithms, price_blocks=price_stream, checkpoint=checkpoint,
+                               checkpoint_every=checkpoint_every, resume=resume, trace=trace)
+    if trace is not None:
+        trace.close()
+    return results
+
+
+def stage_bootstrap(batch, replicates, seed):
+    if replicates <= 0:
+        return None
+    return paired_bootstrap(batch, replicates=replicates, seed=seed)
+
+
+def stage_formula_plot(generated, single, config, path):
+    plot_formula_validation(single["results"], generated["prices"], config, path)
+    return path
+
+
+def stage_comparison_plot(batch, intervals, path):
+    plot_algorithm_comparison(batch, path, intervals=intervals)
+    return path
+
+
+def stage_detailed_plot(generated, single, path):
+    plot_detailed_analysis(single["results"], generated["prices"], path)
+    return path
+
+
+def stage_summary(batch, intervals, variance=None):
+    # gom thành chuỗi, main in sau khi pipeline xong (stage khác còn đang in log)
+    lines = []
+    print_results_summary(batch, intervals, stream=lines.append)
+    if variance is not None:
+        print_variance_report(batch, *variance, stream=lines.append)
+    return "\n".join(lines)
+
+
 def main():
 
     parser = argparse.ArgumentParser(description="Inventory Retrieval Simulation")
     parser.add_argument("--config", type=str, default=None, help="Config file or scenario name")
     parser.add_argument("--prices", type=str, default=None, help="Fixed price sequence name")
+    parser.add_argument("--catalog", type=str, default="test_scenarios.json",
+                        help="Scenario catalog in data/ (.json, .jsonl or .sqlite)")
     parser.add_argument("--list-scenarios", action="store_true", help="List available scenarios")
     parser.add_argument("--seed", type=int, default=42, help="Random seed")
 
     parser.add_argument("--verbose", action="store_true", help="Print detailed period info")
-
+    parser.add_argument("--long-horizon", action="store_true",
+                        help="Run one chunked scenario of n periods (e.g. --n 1000000) and print totals")
+    parser.add_argument("--chunk-size", type=int, default=65536, help="Periods per chunk in --long-horizon")
+    parser.add_argument("--price-file", type=str, default=None,
+                        help="Historical prices (.csv/.parquet/.npy) streamed in chunks; "
+                             "1-D series for --long-horizon, 2-D .npy (scenarios x n) for the batch run")
+    parser.add_argument("--price-column", type=str, default=None, help="Column to read from a CSV/Parquet price file")
+    parser.add_argument("--ticks", type=str, default=None,
+                        help="Timestamped tick file (.csv / .parquet) aggregated into periods and decided online")
+    parser.add_argument("--tick-period", type=float, default=60.0, help="Seconds per period for --ticks")
+    parser.add_argument("--tick-price", choices=AGGREGATIONS, default="last",
+                        help="Period price from its ticks: last, vwap or mean")
+    parser.add_argument("--watermark", type=float, default=0.0,
+                        help="Seconds a late / out-of-order tick is still accepted for --ticks")
+    parser.add_argument("--tick-volume", type=str, default=None, help="Volume column for --tick-price vwap")
+    parser.add_argument("--analytic-demand", action="store_true",
+                        help="Score batch runs by expected revenue over δ instead of one sampled draw")
+    parser.add_argument("--trace", type=str, default=None,
+                        help="Write per-period rows of the batch run to a .jsonl or .csv file")
+    parser.add_argument("--trace-every", type=int, default=1, help="Trace only every Nth scenario with --trace")
+    parser.add_argument("--monitor-ratio", type=int, default=None,
+                        help="In the single run, print each algorithm's CR vs the hindsight Offline every N periods "
+                             "(a report can cost O(periods so far): grow N with n, e.g. n // 100)")
+    parser.add_argument("--checkpoint", type=str, default=None,
+                        help="Save batch progress to this file after every --checkpoint-every scenarios")
+    parser.add_argument("--checkpoint-every", type=int, default=1000, help="Scenarios per checkpoint")
+    parser.add_argument("--resume", action="store_true",
+                        help="Continue the batch run from --checkpoint (default output/batch_checkpoint.pkl)")
+    parser.add_argument("--shard", type=str, default=None,
+                        help="Run only shard i/N of the batch (e.g. 2/4) and write its aggregates to --shard-dir")
+    parser.add_argument("--shard-dir", type=str, default="output/shards", help="Directory for shard aggregates")
+    parser.add_argument("--shard-block", type=int, default=1000,
+                        help="Scenarios per seeded block; shards are whole blocks")
+    parser.add_argument("--merge-shards", type=str, default=None,
+                        help="Merge the shard aggregates in this directory and print the summary")
+    parser.add_argument("--worst-case", type=str, default=None, choices=["ALG-IR", "ALG-IR-H"],
+                        help="Search price sequences in [m, M] that minimize this algorithm's CR vs Offline")
+    parser.add_argument("--generations", type=int, default=200, help="Generations for --worst-case")
+    parser.add_argument("--population", type=int, default=256, help="Price sequences per generation for --worst-case")
+    parser.add_argument("--workers", type=int, default=1, help="Worker processes for --worst-case")
+    parser.add_argument("--offline-cache", type=str, nargs="?", const="", default=None,
+                        help="Memoize Offline solves by price sequence; give a .pkl path to keep them across runs")
+    parser.add_argument("--dp-inventory-points", type=int, default=1001,
+                        help="Inventory grid points for the DP-Optimal value function")
+    parser.add_argument("--dp-price-points", type=int, default=64,
+                        help="Price quadrature points for the DP-Optimal value function")
+    parser.add_argument("--alg-ir-table", type=str, default=None,
+                        help="Use a precomputed ALG-IR decision table (.npz, built if missing)")
+
+    parser.add_argument("--sampling", choices=SAMPLING_MODES, default="iid",
+                        help="Batch price scenarios: iid, antithetic pairs, scrambled Sobol / Halton, Latin hypercube")
+    parser.add_argument("--sampling-points", type=int, default=64,
+                        help="Scenarios per independent Sobol / Halton / LHS set (power of 2 for Sobol)")
+    parser.add_argument("--precision", choices=["float64", "float32"], default="float64",
+                        help="Float type of the batch price / demand / revenue matrices (float32 halves memory)")
+    parser.add_argument("--precision-check", type=int, default=256,
+                        help="Scenarios re-run in float64 to measure the --precision float32 error (0 = off)")
+    parser.add_argument("--precision-tolerance", type=float, default=1e-3,
+                        help="Max relative revenue / CR error before falling back to float64")
+
+    parser.add_argument("--bootstrap", type=int, default=1000,
+                        help="Paired bootstrap replicates for the 95%% CIs in the summary and charts (0 = off)")
+    parser.add_argument("--tail-risk", type=float, default=None, metavar="ALPHA",
+                        help="Importance-sampled VaR / CVaR of the worst ALPHA share of seasons (e.g. 0.01)")
+    parser.add_argument("--tail-scenarios", type=int, default=4000, help="Scenarios for --tail-risk")
+    parser.add_argument("--tail-pilot", type=int, default=2000,
+                        help="Scenarios per cross-entropy iteration when tuning the --tail-risk tilt")
+    parser.add_argument("--tail-reference", type=str, default="ALG-IR",
+                        help="Algorithm whose revenue tail the --tail-risk tilt is tuned on")
+
+    parser.add_argument("--multi-sku", type=int, default=None, metavar="SKUS",
+                        help="Hindsight benchmark for SKUS products sharing one warehouse (coupled dual solve)")
+    parser.add_argument("--store", type=str, default="WH-HCM-001",
+                        help="Warehouse code in vietnam_stores.json; its max_capacity caps retrievals per period")
+    parser.add_argument("--sku-capacity", type=float, default=None,
+                        help="Optional cap on total retrievals over the season for --multi-sku")
+
+    parser.add_argument("--pipeline-workers", type=int, default=2,
+                        help="Threads running independent stages (plots / PDF while the batch simulates)")
+    parser.add_argument("--cache-dir", type=str, default=f"{OUTPUT_DIR}/.cache",
+                        help="Per-stage result cache for the default run")
+    parser.add_argument("--no-cache", action="store_true", help="Recompute every stage")
     parser.add_argument("--Q", type=int, help="Override Q")
     parser.add_argument("--m", type=float, help="Override m")
     parser.add_argument("--M", type=float, help="Override M")
@@ -44,7 +341,14 @@ def main():
 
     args = parser.parse_args()
 
-    loader = ConfigLoader()
+    if args.merge_shards:
+        merged = merge_shards(args.merge_shards)
+        print(f"Log: merged {next(iter(merged.values())).count} scenarios from {args.merge_shards}")
+        print_results_summary(merged)
+        print_quantiles(merged)
+        return
+
+    loader = ConfigLoader(catalog=args.catalog)
 
     if args.list_scenarios:
         print("Available scenarios:")
@@ -70,6 +374,19 @@ def main():
     if args.scenarios:
         config.num_scenarios = args.scenarios
 
+    price_stream = None
+    if args.price_file:
+        price_stream = PriceStream(args.price_file, config.m, config.M,
+                                   chunk_size=args.chunk_size, column=args.price_column)
+        if price_stream.periods is not None:
+            config.n = price_stream.periods
+            config.num_scenarios = len(price_stream)
+        elif args.long_horizon:
+            config.n = len(price_stream)
+        else:
+            print("Log: 1-D price files are only supported with --long-horizon")
+            return
+
     validator = DataValidator()
     validation = validator.validate_config(config)
     if not validation.is_valid:
@@ -99,67 +416,169 @@ def main():
 
     print(f"Log: DEMAND DISTRIBUTION MODE: {demand.distribution.upper()}")
 
-    algorithms = [
-        ALG_IR(config.Q, config.m, config.M, demand),
-        ALG_IR_H(config.Q, config.m, config.M, demand, config.h),
-        Myopic(config.Q, config.m, config.M, demand),
-        Offline(config.Q, config.m, config.M, demand),
-        ConstantRate(config.Q, config.m, config.M, demand),
-        FixedThreshold(config.Q, config.m, config.M, demand),
-        RandomPolicy(config.Q, config.m, config.M, demand)
-    ]
+    if args.multi_sku:
+        run_multi_sku(config, demand, loader, args.multi_sku, args.store, args.sku_capacity)
+        return
+
+    offline_cache = None
+    if args.offline_cache is not None:
+        offline_cache = OfflineCache(path=args.offline_cache or None)
+        if len(offline_cache):
+            print(f"Log: Offline cache: {len(offline_cache)} entries loaded from {args.offline_cache}")
+
+        def _close_offline_cache():
+            offline_cache.save()
+            print(f"Log: Offline cache: {offline_cache.stats()}")
+        atexit.register(_close_offline_cache)
+
+    algorithms = build_algorithms(config, demand, alg_ir_table=args.alg_ir_table, offline_cache=offline_cache,
+                                  dp_inventory_points=args.dp_inventory_points,
+                                  dp_price_points=args.dp_price_points)
+    if args.alg_ir_table:
+        print(f"Log: ALG-IR decision table: {args.alg_ir_table} "
+              f"(max |error| = {algorithms[0].table.error_bound:.4f} units)")
+
+    runner = SimulationRunner(config, analytic_demand=args.analytic_demand, sampling=args.sampling,
+                              sampling_points=args.sampling_points, precision=args.precision)
+
+    if args.shard:
+        spec = ShardSpec.parse(args.shard, config.num_scenarios, args.seed, args.shard_block)
+        print(f"\nLog: SHARD {args.shard}: scenarios [{spec.start}, {spec.stop})")
+        path = run_shard_worker(config, algorithms, spec, args.shard_dir, analytic_demand=args.analytic_demand)
+        print(f"Log: shard aggregates written to {path}")
+        return
+
+    if args.worst_case:
+        target = next(alg for alg in algorithms if alg.name() == args.worst_case)
+        offline = next(alg for alg in algorithms if alg.name() == "Offline")
+        print(f"\nLog: WORST-CASE SEARCH: {target.name()}, population={args.population}, "
+              f"generations={args.generations}, workers={args.workers}")
+        search = AdversarialSearch(target, offline, config.n, population=args.population,
+                                   generations=args.generations, workers=args.workers, seed=args.seed)
+        worst = search.run(progress=True)
+
+        print(f"Log: {worst.evaluations:,} price sequences evaluated")
+        print(f"Theoretical bound 1/(1+ln θ) = {worst.bound:.4f}")
+        for rank, (ratio, prices) in enumerate(zip(worst.ratios, worst.prices), 1):
+            print(f"#{rank} CR = {ratio:.4f} (bound gap {ratio - worst.bound:+.4f})")
+            print("   prices: " + " ".join(f"{p:.1f}" for p in prices))
+        return
+
+    if args.tail_risk:
+        print(f"\nLog: TAIL RISK: α={args.tail_risk}, reference={args.tail_reference}, "
+              f"{args.tail_scenarios} scenarios")
+        estimator = TailRiskEstimator(algorithms, config, demand, alpha=args.tail_risk,
+                                      reference=args.tail_reference, analytic_demand=args.analytic_demand,
+                                      pilot=args.tail_pilot)
+        estimator.calibrate(progress=True)
+        tail_results = estimator.run(args.tail_scenarios)
+
+        first = next(iter(tail_results.values()))
+        print(f"Log: ESS {first.ess:,.0f}/{first.scenarios}")
+        print(f"{'Algorithm':<20} {'VaR':>10} {'95% CI':>19} {'CVaR':>10} {'95% CI':>19} {'Tail':>6} {'VR':>7}")
+        print("-" * 96)
+        for name, result in sorted(tail_results.items(), key=lambda x: -x[1].cvar):
+            print(f"{name:<20} {result.var:>10,.0f} [{result.var_ci[0]:>8,.0f}, {result.var_ci[1]:>8,.0f}] "
+                  f"{result.cvar:>10,.0f} [{result.cvar_ci[0]:>8,.0f}, {result.cvar_ci[1]:>8,.0f}] "
+                  f"{result.tail_samples:>6} {result.variance_reduction:>6.1f}x")
+        return
 
-    runner = SimulationRunner(config)
+    if args.ticks:
+        run_ticks(args, config, algorithms, demand)
+        return
+
+    if args.long_horizon:
+        print(f"\nLog: LONG-HORIZON MODE: n={config.n}, chunk={args.chunk_size}")
+        long_results = runner.run_long(algorithms, chunk_size=args.chunk_size, price_stream=price_stream)
+        if price_stream is not None and price_stream.num_clipped:
+            print(f"Log: {price_stream.num_clipped} prices outside [{config.m}, {config.M}] were clipped")
+
+        print(f"{'Algorithm':<20} {'Total Revenue':>18} {'Holding Cost':>16} {'Retrieved':>14} {'Final Inv':>12}")
+        print("-" * 84)
+        for name, result in long_results.items():
+            print(f"{name:<20} ${result.total_revenue:>17,.0f} ${result.total_holding_cost:>15,.0f} "
+                  f"{result.total_retrieved:>14,.1f} {result.final_inventory:>12,.1f}")
+        return
 
     if args.verbose:
         print("\n" + "=" * 80)
         print("Log: VERBOSE MODE ACTIVATED")
         print("=" * 80)
 
-        verbose_results = {}
-
-        for alg in algorithms:
-            data = runner.run_verbose_single(alg)
-            verbose_results[alg.name()] = data
+        verbose_results, verbose_traces = runner.run_verbose(algorithms)
 
         #  XUẤT PDF TỪ VERBOSE
-        export_results_to_pdf(verbose_results, f"{OUTPUT_DIR}/verbose_results.pdf")
+        export_results_to_pdf(verbose_results, f"{OUTPUT_DIR}/verbose_results.pdf", traces=verbose_traces)
         print("Log: VERBOSE PDF EXPORTED")
 
         return
 
-    print("\n[1/3] Running single simulation...")
-    if args.prices:
+    # lượt chạy mặc định: DAG các stage, chạy chồng nhau trên pool thread, kết quả từng stage cache theo nội dung
+    fixed = loader.load_fixed_prices(args.prices) if args.prices else None
+    if fixed is not None:
         print(f"Using fixed price sequence: {args.prices}")
-        prices = loader.load_fixed_prices(args.prices)
-        single_results = {}
-        for alg in algorithms:
-            result = alg.run(prices)
-            single_results[alg.name()] = result
-    else:
-        single_results, prices = runner.run_single(algorithms)
-        export_results_to_pdf(single_results, f"{OUTPUT_DIR}/results.pdf")
-
-    print("\n[2/3] Running batch simulation...")
-    batch_results = runner.run_batch(algorithms)
-
-    print("\n[3/3] Generating visualizations...")
-    plot_formula_validation(single_results, prices, config, f"{OUTPUT_DIR}/01_formula_proof.png")
-    plot_algorithm_comparison(batch_results, f"{OUTPUT_DIR}/02_comparison.png")
-    plot_detailed_analysis(single_results, prices, f"{OUTPUT_DIR}/03_detailed_analysis.png")
-
-    print("\n" + "=" * 60)
-    print("RESULTS SUMMARY")
-    print("=" * 60)
-
-    sorted_batch = sorted(batch_results.items(), key=lambda x: -x[1].mean)
-    offline_mean = batch_results["Offline"].mean
-
-    print(f"{'Algorithm':<20} {'Mean Revenue':>15} {'Std Dev':>12} {'CR':>8}")
-    print("-" * 60)
-    for name, result in sorted_batch:
-        cr = result.mean / offline_mean
-        print(f"{name:<20} ${result.mean:>14,.0f} ${result.std:>11,.0f} {cr:>7.3f}")
+    # mọi thứ quyết định kết quả mô phỏng (ngoài config / seed / mã nguồn)
+    settings = {name: getattr(args, name) for name in
+                ("alg_ir_table", "dp_inventory_points", "dp_price_points", "analytic_demand",
+                 "sampling", "sampling_points", "precision")}
+    simulation_code = ["runner.py", "simulator.py", "models.py", "tracing.py", "algorithms"]
+
+    checkpoint = None
+    if args.checkpoint or args.resume:
+        checkpoint = BatchCheckpoint(args.checkpoint or f"{OUTPUT_DIR}/batch_checkpoint.pkl")
+    trace = None
+    if args.trace:
+        trace = FileTraceSink(args.trace)
+        if args.trace_every > 1:
+            trace = SampledTraceSink(trace, args.trace_every)
+    variance = None
+    if args.sampling != "iid" and price_stream is None:
+        variance = (runner.sampler.group_size, args.sampling)
+
+    pipeline = Pipeline(cache_dir=None if args.no_cache else args.cache_dir, workers=args.pipeline_workers)
+    pipeline.add("prices", stage_prices, params=dict(seed=args.seed, config=config, fixed=fixed),
+                 context=dict(runner=runner), code=["runner.py", "sampling.py"])
+    # monitor in CR theo kỳ => không lấy từ cache
+    pipeline.add("single", stage_single, ["prices"],
+                 params=dict(settings=settings, fixed=fixed is not None, monitor_every=args.monitor_ratio),
+                 context=dict(config=config, algorithms=algorithms, demand=demand),
+                 code=simulation_code, cache=not args.monitor_ratio)
+    if fixed is None:
+        pipeline.add("pdf", stage_pdf, ["single"], params=dict(path=f"{OUTPUT_DIR}/results.pdf"),
+                     code=["terminal_to_pdf"], outputs=[f"{OUTPUT_DIR}/results.pdf"])
+    # checkpoint / trace / file giá ngoài: tác dụng phụ hoặc dữ liệu ngoài => luôn chạy lại
+    pipeline.add("batch", stage_batch, ["single"],
+                 params=dict(settings=settings, precision_check=args.precision_check,
+                             precision_tolerance=args.precision_tolerance,
+                             checkpoint_every=args.checkpoint_every, resume=args.resume),
+                 context=dict(runner=runner, algorithms=algorithms, price_stream=price_stream,
+                              checkpoint=checkpoint, trace=trace),
+                 code=simulation_code + ["sampling.py"],
+                 cache=checkpoint is None and trace is None and price_stream is None)
+    pipeline.add("bootstrap", stage_bootstrap, ["batch"], params=dict(replicates=args.bootstrap, seed=args.seed),
+                 code=["bootstrap.py"])
+    # pyplot không thread-safe => các stage vẽ dùng chung 1 lock
+    pipeline.add("formula_plot", stage_formula_plot, ["prices", "single"],
+                 params=dict(config=config, path=f"{OUTPUT_DIR}/01_formula_proof.png"),
+                 code=["visualization/formula_proof.py"], outputs=[f"{OUTPUT_DIR}/01_formula_proof.png"],
+                 lock="matplotlib")
+    pipeline.add("detailed_plot", stage_detailed_plot, ["prices", "single"],
+                 params=dict(path=f"{OUTPUT_DIR}/03_detailed_analysis.png"),
+                 code=["visualization/detailed_analysis.py"], outputs=[f"{OUTPUT_DIR}/03_detailed_analysis.png"],
+                 lock="matplotlib")
+    pipeline.add("comparison_plot", stage_comparison_plot, ["batch", "bootstrap"],
+                 params=dict(path=f"{OUTPUT_DIR}/02_comparison.png"),
+                 code=["visualization/comparison.py"], outputs=[f"{OUTPUT_DIR}/02_comparison.png"],
+                 lock="matplotlib")
+    pipeline.add("summary", stage_summary, ["batch", "bootstrap"], params=dict(variance=variance),
+                 code=["main.py", "sampling.py"])
+
+    print(f"\nLog: PIPELINE: {len(pipeline.stages)} stages, {args.pipeline_workers} workers"
+          + ("" if args.no_cache else f", cache {args.cache_dir}"))
+    values = pipeline.run()
+    if args.trace:
+        print(f"Log: period trace written to {args.trace}")
+    print(values["summary"])
 
     print("\n" + "=" * 60)
     print(f"Charts saved in: {OUTPUT_DIR}/")
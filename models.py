@@ -1,5 +1,6 @@
 from dataclasses import dataclass
-from typing import List, Dict
+from typing import List, Dict, Tuple
+import numpy as np
 
 
 @dataclass
@@ -24,9 +25,192 @@ class BatchResult:
 
     @property
     def mean(self) -> float:
-        return sum(self.revenues) / len(self.revenues)
+        # cộng dồn float64 kể cả khi revenues là mảng float32 (--precision float32)
+        return float(np.sum(self.revenues, dtype=np.float64)) / len(self.revenues)
 
     @property
     def std(self) -> float:
-        import numpy as np
-        return float(np.std(self.revenues))
\ No newline at end of file
+        return float(np.std(self.revenues, dtype=np.float64))
+
+
+@dataclass
+class LongRunResult:
+    name: str
+    n: int
+    total_revenue: float
+    total_holding_cost: float  # h * tồn kho cuối mỗi kỳ (0 nếu h = 0), như AlgorithmResult / trace
+    total_retrieved: float
+    final_inventory: float
+
+    # vết thưa (mỗi trace_every kỳ), rỗng nếu không bật
+    trace_periods: np.ndarray
+    trace_retrievals: np.ndarray
+    trace_revenues: np.ndarray
+    trace_inventory: np.ndarray
+
+
+@dataclass
+class BootstrapResult:
+    name: str
+    confidence: float
+    replicates: int
+
+    # (cận dưới, cận trên) theo phân vị bootstrap
+    mean_ci: Tuple[float, float]
+    std_ci: Tuple[float, float]
+    ratio_ci: Tuple[float, float]  # CR = mean / mean Offline
+
+
+@dataclass
+class TailRiskResult:
+    name: str
+    alpha: float  # mức đuôi, vd 0.01 = 1% mùa doanh thu thấp nhất
+
+    var: float  # VaR_α: phân vị α của doanh thu
+    cvar: float  # CVaR_α: doanh thu trung bình trong đuôi α
+    var_ci: Tuple[float, float]
+    cvar_ci: Tuple[float, float]
+
+    scenarios: int
+    tail_samples: int  # số kịch bản rơi vào đuôi (Monte Carlo thường: ~ α·scenarios)
+    ess: float  # effective sample size của trọng số
+    variance_reduction: float  # so với Monte Carlo thường, cho P(R <= VaR)
+
+
+@dataclass
+class MultiSKUResult:
+    allocations: np.ndarray  # (SKU, kỳ) lượng lấy ra, thoả mọi ràng buộc
+    revenues: np.ndarray  # doanh thu kỳ vọng từng SKU
+    total_revenue: float
+    dual_bound: float  # cận trên của doanh thu tối ưu (hàm đối ngẫu)
+
+    # giá bóng: tồn kho từng SKU, năng lực từng kỳ, tổng năng lực mùa
+    sku_prices: np.ndarray
+    period_prices: np.ndarray
+    capacity_price: float
+    sweeps: int
+
+    @property
+    def gap(self) -> float:
+        return (self.dual_bound - self.total_revenue) / max(self.dual_bound, 1e-12)
+
+
+@dataclass
+class PrecisionCheck:
+    precision: str  # dtype đang kiểm tra, vd "float32"
+    scenarios: int  # số kịch bản mẫu chạy lại bằng float64
+
+    # theo thuật toán: max |r - r_64| / |r_64| trên các kịch bản, |CR - CR_64| / CR_64 của cả mẫu
+    revenue_error: Dict[str, float]
+    ratio_error: Dict[str, float]
+
+    @property
+    def max_revenue_error(self) -> float:
+        return max(self.revenue_error.values())
+
+    @property
+    def max_ratio_error(self) -> float:
+        return max(self.ratio_error.values())
+
+
+@dataclass
+class WorstCaseResult:
+    name: str
+    bound: float  # 1 / (1 + ln θ)
+
+    # các chuỗi giá xấu nhất tìm được, tăng dần theo CR
+    prices: np.ndarray
+    ratios: np.ndarray
+
+    history: List[float]  # CR xấu nhất sau mỗi thế hệ
+    evaluations: int
+
+    @property
+    def worst_ratio(self) -> float:
+        return float(self.ratios[0])
+
+
+def _compress_centroids(means: np.ndarray, weights: np.ndarray, compression: float):
+    # t-digest (hàm tỉ lệ k1): gộp các centroid liền kề có cùng bin k(q) = δ/(2π)·asin(2q-1)
+    # => centroid nhỏ ở 2 đuôi, lớn ở giữa; số centroid ~ δ
+    order = np.argsort(means, kind="stable")
+    means, weights = means[order], weights[order]
+    total = weights.sum()
+    q_mid = (np.cumsum(weights) - weights / 2) / total
+    bins = np.floor(compression / (2 * np.pi) * np.arcsin(2 * q_mid - 1)).astype(np.int64)
+    _, groups = np.unique(bins, return_inverse=True)
+    new_weights = np.bincount(groups, weights=weights)
+    new_means = np.bincount(groups, weights=means * weights) / new_weights
+    return new_means, new_weights
+
+
+@dataclass
+class BatchSummary:
+    """Mergeable per-algorithm aggregate: count/mean/M2 (Welford), min/max and a centroid quantile sketch."""
+    name: str
+    count: int
+    mean: float
+    m2: float
+    min: float
+    max: float
+    centroid_means: np.ndarray
+    centroid_weights: np.ndarray
+    compression: float = 100.0
+
+    @classmethod
+    def empty(cls, name: str, compression: float = 100.0) -> "BatchSummary":
+        return cls(name, 0, 0.0, 0.0, np.inf, -np.inf, np.empty(0), np.empty(0), compression)
+
+    @classmethod
+    def from_revenues(cls, name: str, revenues, compression: float = 100.0) -> "BatchSummary":
+        revenues = np.asarray(revenues, dtype=float)
+        if len(revenues) == 0:
+            return cls.empty(name, compression)
+        mean = float(revenues.mean())
+        means, weights = _compress_centroids(revenues, np.ones_like(revenues), compression)
+        return cls(name, len(revenues), mean, float(((revenues - mean) ** 2).sum()),
+                   float(revenues.min()), float(revenues.max()), means, weights, compression)
+
+    def merge(self, other: "BatchSummary") -> "BatchSummary":
+        if other.count == 0:
+            return self
+        if self.count == 0:
+            return other
+
+        # công thức gộp song song của Chan et al.
+        count = self.count + other.count
+        diff = other.mean - self.mean
+        mean = self.mean + diff * other.count / count
+        m2 = self.m2 + other.m2 + diff ** 2 * self.count * other.count / count
+
+        means, weights = _compress_centroids(
+            np.concatenate([self.centroid_means, other.centroid_means]),
+            np.concatenate([self.centroid_weights, other.centroid_weights]),
+            self.compression,
+        )
+        return BatchSummary(self.name, count, mean, m2, min(self.min, other.min), max(self.max, other.max),
+                            means, weights, self.compression)
+
+    @property
+    def std(self) -> float:
+        # độ lệch chuẩn tổng thể, giống np.std trong BatchResult
+        return float(np.sqrt(self.m2 / self.count))
+
+    def quantile(self, q: float) -> float:
+        positions = np.cumsum(self.centroid_weights) - self.centroid_weights / 2
+        return float(np.interp(q * self.count, np.concatenate([[0.0], positions, [self.count]]),
+                               np.concatenate([[self.min], self.centroid_means, [self.max]])))
+
+    def to_dict(self) -> dict:
+        return {
+            "name": self.name, "count": self.count, "mean": self.mean, "m2": self.m2,
+            "min": self.min, "max": self.max, "compression": self.compression,
+            "centroid_means": self.centroid_means.tolist(),
+            "centroid_weights": self.centroid_weights.tolist(),
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "BatchSummary":
+        return cls(data["name"], data["count"], data["mean"], data["m2"], data["min"], data["max"],
+                   np.asarray(data["centroid_means"]), np.asarray(data["centroid_weights"]),
+                   data["compression"])
@@ -0,0 +1,150 @@
+## chạy main.py theo DAG các stage (giá -> single -> batch -> bootstrap -> biểu đồ / PDF / summary)
+## stage chạy ngay khi mọi input xong, trên ThreadPoolExecutor:
+##   vd biểu đồ + PDF của lượt single vẽ trong lúc batch còn đang mô phỏng (numpy nhả GIL phần lớn thời gian)
+##   stage cùng `lock` không chạy chồng nhau (pyplot không an toàn khi nhiều thread vẽ cùng lúc)
+## cache theo nội dung: key = hash(tên, mã nguồn hàm stage, file mã nguồn liên quan, params, key các input)
+##   => sửa 1 hàm vẽ chỉ chạy lại stage vẽ đó; sửa simulator.py chạy lại mọi stage phụ thuộc vào nó
+##   giá trị trả về pickle vào cache_dir; stage có `outputs` (file ảnh / PDF) chỉ dùng cache khi file còn
+## cache=False: stage có tác dụng phụ không lặp lại được (checkpoint, trace, đọc file giá ngoài)
+
+import hashlib
+import inspect
+import pickle
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from pathlib import Path
+from typing import Any, Callable, Dict, Sequence
+
+
+def source_digest(paths: Sequence) -> str:
+    """sha256 over the bytes of the given files (directories: every .py inside)."""
+    digest = hashlib.sha256()
+    for path in sorted(Path(p) for p in paths):
+        files = sorted(path.rglob("*.py")) if path.is_dir() else [path]
+        for file in files:
+            digest.update(str(file).encode())
+            digest.update(file.read_bytes())
+    return digest.hexdigest()
+
+
+class Stage:
+    def __init__(self, name: str, func: Callable, inputs: Sequence[str] = (), params: Dict[str, Any] = None,
+                 context: Dict[str, Any] = None, code: Sequence = (), outputs: Sequence = (), cache: bool = True,
+                 lock: str = None):
+        """func(*input values, **params, **context).
+
+        params are part of the cache key; context (algorithms, runner, ...) is passed through unhashed.
+        code: extra source files / directories the result depends on.
+        """
+        self.name = name
+        self.func = func
+        self.inputs = tuple(inputs)
+        self.params = params or {}
+        self.context = context or {}
+        self.code = tuple(code)
+        self.outputs = tuple(Path(p) for p in outputs)
+        self.cache = cache
+        self.lock = lock
+        self.key = None
+
+
+class Pipeline:
+    def __init__(self, cache_dir=None, workers: int = 2):
+        self.cache_dir = Path(cache_dir) if cache_dir else None
+        self.workers = workers
+        self.stages: Dict[str, Stage] = {}
+        self.timings: Dict[str, float] = {}
+        self.cached = set()
+
+    def add(self, name: str, func: Callable, inputs: Sequence[str] = (), **kwargs) -> Stage:
+        for dependency in inputs:
+            if dependency not in self.stages:
+                raise ValueError(f"Stage {name}: unknown input {dependency} (add stages in dependency order)")
+        stage = Stage(name, func, inputs, **kwargs)
+        stage.key = self._key(stage)
+        self.stages[name] = stage
+        return stage
+
+    def _key(self, stage: Stage) -> str:
+        digest = hashlib.sha256(stage.name.encode())
+        digest.update(inspect.getsource(stage.func).encode())
+        digest.update(source_digest(stage.code).encode())
+        digest.update(pickle.dumps(sorted(stage.params.items()), protocol=4))
+        for dependency in stage.inputs:
+            digest.update(self.stages[dependency].key.encode())
+        # stage không cache làm đổi key của mọi stage phía sau (kết quả của nó không tái lập được)
+        if not stage.cache or any(not self.stages[d].cache for d in stage.inputs):
+            digest.update(repr(time.time_ns()).encode())
+        return digest.hexdigest()
+
+    def _cache_path(self, stage: Stage) -> Path:
+        return self.cache_dir / f"{stage.name}-{stage.key[:16]}.pkl"
+
+    def _load(self, stage: Stage):
+        if self.cache_dir is None or not stage.cache:
+            return False, None
+        path = self._cache_path(stage)
+        if not path.exists() or not all(output.exists() for output in stage.outputs):
+            return False, None
+        with open(path, "rb") as f:
+            return True, pickle.load(f)
+
+    def _store(self, stage: Stage, value):
+        if self.cache_dir is None or not stage.cache:
+            return
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        for old in self.cache_dir.glob(f"{stage.name}-*.pkl"):
+            old.unlink()
+        path = self._cache_path(stage)
+        tmp = path.with_suffix(".tmp")
+        with open(tmp, "wb") as f:
+            pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+        tmp.replace(path)
+
+    def run(self, progress: bool = True) -> Dict[str, Any]:
+        """Run every stage once its inputs are done; returns name -> value."""
+        values: Dict[str, Any] = {}
+        locks: Dict[str, threading.Lock] = {}
+        pending = dict(self.stages)
+        running = {}
+
+        def execute(stage: Stage):
+            args = [values[dependency] for dependency in stage.inputs]
+            start = time.perf_counter()
+            if stage.lock is None:
+                value = stage.func(*args, **stage.params, **stage.context)
+            else:
+                with locks.setdefault(stage.lock, threading.Lock()):
+                    value = stage.func(*args, **stage.params, **stage.context)
+            self.timings[stage.name] = time.perf_counter() - start
+            self._store(stage, value)
+            return value
+
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            while pending or running:
+                for name, stage in list(pending.items()):
+                    if not all(dependency in values for dependency in stage.inputs):
+                        continue
+                    del pending[name]
+                    hit, value = self._load(stage)
+                    if hit:
+                        values[name] = value
+                        self.cached.add(name)
+                        if progress:
+                            print(f"Log: stage {name}: cached")
+                    else:
+                        running[pool.submit(execute, stage)] = name
+                if not running:
+                    # mọi stage sẵn sàng đều lấy từ cache -> quét lại các stage vừa đủ input
+                    if pending and not any(all(d in values for d in s.inputs) for s in pending.values()):
+                        raise RuntimeError(f"Pipeline stuck: {', '.join(pending)}")
+                    continue
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    values[name] = future.result()
+                    if progress:
+                        print(f"Log: stage {name}: done in {self.timings[name]:.1f}s")
+        return values
@@ -0,0 +1,167 @@
+## rủi ro đuôi doanh thu (VaR / CVaR mức α, vd 1% mùa tệ nhất) bằng importance sampling
+## mọi nguồn ngẫu nhiên là 1 biến u ~ U(0,1): giá p = m + u(M - m), δ = F^-1(w)
+## phân phối đề xuất: exponential cắt trên [0,1], g_θ(u) = θ e^{-θu} / (1 - e^{-θ}) (θ > 0 dồn về u nhỏ = giá / δ thấp)
+##   θ riêng cho giá và cho δ (tuỳ chọn riêng từng kỳ); trọng số kịch bản w = Π 1 / g(u) (likelihood ratio)
+## θ chọn bằng cross-entropy trên thuật toán tham chiếu (mặc định ALG-IR):
+##   lấy mẫu -> chọn nhóm doanh thu thấp (elite) -> θ khớp trung bình có trọng số của u trong elite
+##   E_θ[u] = 1/θ - 1/(e^θ - 1) đơn điệu theo θ -> brentq
+## cùng 1 bộ mẫu + trọng số cho mọi thuật toán (không chệch cho tất cả, hiệu quả nhất với thuật toán tham chiếu)
+## CI: bootstrap theo kịch bản (cặp doanh thu, trọng số)
+
+from typing import Dict
+
+import numpy as np
+from scipy.optimize import brentq
+
+from models import TailRiskResult
+from simulator import MultiPolicySimulator
+
+_THETA_LIMIT = 50.0
+
+
+def _tilted_mean(theta: float) -> float:
+    if abs(theta) < 1e-6:
+        return 0.5 - theta / 12
+    return 1.0 / theta - 1.0 / np.expm1(theta)
+
+
+def _fit_theta(mean: float) -> float:
+    # θ với E_θ[u] = mean
+    mean = float(np.clip(mean, _tilted_mean(_THETA_LIMIT), _tilted_mean(-_THETA_LIMIT)))
+    if abs(mean - 0.5) < 1e-9:
+        return 0.0
+    return brentq(lambda theta: _tilted_mean(theta) - mean, -_THETA_LIMIT, _THETA_LIMIT, xtol=1e-10)
+
+
+def _sample_tilted(theta: np.ndarray, size) -> (np.ndarray, np.ndarray):
+    """u ~ g_θ (θ broadcast over the last axis) and log g_θ(u)."""
+    v = np.random.uniform(0.0, 1.0, size)
+    theta = np.broadcast_to(theta, size)
+    flat = np.abs(theta) < 1e-9
+    safe = np.where(flat, 1.0, theta)
+    u = np.where(flat, v, -np.log1p(v * np.expm1(-safe)) / safe)
+    log_density = np.where(flat, 0.0, np.log(np.abs(safe)) - safe * u - np.log(np.abs(-np.expm1(-safe))))
+    return np.clip(u, 0.0, 1.0), log_density
+
+
+def tail_risk(revenues, weights, alpha: float):
+    """(VaR, CVaR, P̂(R <= VaR)) of the lower revenue tail from importance weights (mean weight ~ 1)."""
+    order = np.argsort(revenues, axis=-1)
+    revenues = np.take_along_axis(revenues, order, axis=-1)
+    weights = np.take_along_axis(weights, order, axis=-1)
+    size = revenues.shape[-1]
+    cdf = np.cumsum(weights, axis=-1) / size
+
+    k = np.minimum(np.argmax(cdf >= alpha, axis=-1), size - 1)
+    k = np.where(cdf[..., -1] < alpha, size - 1, k)
+    value_at_risk = np.take_along_axis(revenues, k[..., None], axis=-1)[..., 0]
+
+    # CVaR = E[R | R <= VaR] với phần lẻ tại VaR: (Σ_{i<k} w_i R_i / N + VaR (α - F̂(VaR-))) / α
+    below = np.arange(size) < k[..., None]
+    mass_below = np.sum(np.where(below, weights, 0.0), axis=-1) / size
+    tail_sum = np.sum(np.where(below, weights * revenues, 0.0), axis=-1) / size
+    conditional = (tail_sum + value_at_risk * (alpha - mass_below)) / alpha
+    return value_at_risk, conditional, np.take_along_axis(cdf, k[..., None], axis=-1)[..., 0]
+
+
+class TailRiskEstimator:
+    def __init__(self, algorithms, config, demand, alpha: float = 0.01, reference: str = "ALG-IR",
+                 analytic_demand: bool = False, pilot: int = 2000, iterations: int = 5,
+                 elite: float = 0.1, smoothing: float = 0.7, per_period: bool = False):
+        self.algorithms = algorithms
+        self.config = config
+        self.demand = demand
+        self.alpha = alpha
+        self.reference = next(alg for alg in algorithms if alg.name() == reference)
+        self.analytic_demand = analytic_demand
+        self.pilot = pilot
+        self.iterations = iterations
+        self.elite = elite
+        self.smoothing = smoothing
+        self.per_period = per_period
+
+        n = config.n
+        self.theta_price = np.zeros(n)
+        self.theta_demand = np.zeros(n)
+        self.history = []  # (ngưỡng elite, ESS) mỗi vòng cross-entropy
+
+    def sample(self, num_scenarios: int):
+        """Tilted (prices, fluctuations, log-weights); fluctuations is None in analytic mode."""
+        m, M, n = self.config.m, self.config.M, self.config.n
+        u, log_g = _sample_tilted(self.theta_price, (num_scenarios, n))
+        prices = m + u * (M - m)
+        log_weights = -log_g.sum(axis=1)
+
+        fluctuations, w = None, None
+        if not self.analytic_demand:
+            w, log_g = _sample_tilted(self.theta_demand, (num_scenarios, n))
+            fluctuations = self.demand.fluctuation_ppf(w)
+            log_weights -= log_g.sum(axis=1)
+        return prices, fluctuations, log_weights, u, w
+
+    def _fit(self, elite_weights: np.ndarray, u: np.ndarray) -> np.ndarray:
+        # per_period=False: 1 θ chung cho mọi kỳ (ít tham số -> trọng số ít suy biến hơn)
+        means = elite_weights @ u
+        if not self.per_period:
+            means = np.full(len(means), means.mean())
+        return np.array([_fit_theta(mean) for mean in means])
+
+    def calibrate(self, progress: bool = False):
+        simulator = MultiPolicySimulator([self.reference], self.demand, self.analytic_demand)
+        for iteration in range(self.iterations):
+            prices, fluctuations, log_weights, u, w = self.sample(self.pilot)
+            revenues = simulator.run_matrix(prices, fluctuations=fluctuations)[self.reference.name()]
+            weights = np.exp(log_weights)
+
+            # elite: doanh thu <= VaR ước lượng hiện tại, nhưng ít nhất `elite` phần mẫu
+            value_at_risk, _, _ = tail_risk(revenues, weights, self.alpha)
+            threshold = max(value_at_risk, np.quantile(revenues, self.elite))
+            chosen = revenues <= threshold
+            elite_weights = weights[chosen] / weights[chosen].sum()
+
+            fitted = self._fit(elite_weights, u[chosen])
+            self.theta_price = self.smoothing * fitted + (1 - self.smoothing) * self.theta_price
+            if w is not None:
+                fitted = self._fit(elite_weights, w[chosen])
+                self.theta_demand = self.smoothing * fitted + (1 - self.smoothing) * self.theta_demand
+
+            ess = weights.sum() ** 2 / np.sum(weights ** 2)
+            self.history.append((float(threshold), float(ess)))
+            if progress:
+                print(f"Log: CE iteration {iteration + 1}/{self.iterations}: elite threshold {threshold:,.0f}, "
+                      f"ESS {ess:,.0f}/{self.pilot}")
+
+    def run(self, num_scenarios: int, bootstrap: int = 500, confidence: float = 0.95) -> Dict[str, TailRiskResult]:
+        prices, fluctuations, log_weights, _, _ = self.sample(num_scenarios)
+        weights = np.exp(log_weights)
+        revenues = MultiPolicySimulator(self.algorithms, self.demand, self.analytic_demand).run_matrix(
+            prices, fluctuations=fluctuations)
+
+        resample = np.random.randint(0, num_scenarios, size=(bootstrap, num_scenarios))
+        lower_q, upper_q = (1 - confidence) / 2, (1 + confidence) / 2
+        ess = float(weights.sum() ** 2 / np.sum(weights ** 2))
+
+        results = {}
+        for alg in self.algorithms:
+            name = alg.name()
+            value_at_risk, conditional, _ = tail_risk(revenues[name], weights, self.alpha)
+            boot_var, boot_cvar, _ = tail_risk(revenues[name][resample], weights[resample], self.alpha)
+
+            # hiệu quả so với Monte Carlo thường cho xác suất đuôi P(R <= VaR): α(1-α) / Var(w·1{R <= VaR})
+            indicator = weights * (revenues[name] <= value_at_risk)
+            spread = indicator.var()
+            reduction = self.alpha * (1 - self.alpha) / spread if spread > 0 else float("inf")
+
+            results[name] = TailRiskResult(
+                name=name,
+                alpha=self.alpha,
+                var=float(value_at_risk),
+                cvar=float(conditional),
+                var_ci=(float(np.quantile(boot_var, lower_q)), float(np.quantile(boot_var, upper_q))),
+                cvar_ci=(float(np.quantile(boot_cvar, lower_q)), float(np.quantile(boot_cvar, upper_q))),
+                scenarios=num_scenarios,
+                tail_samples=int(np.sum(revenues[name] <= value_at_risk)),
+                ess=ess,
+                variance_reduction=float(reduction),
+            )
+        return results
@@ -1,155 +1,283 @@
+import itertools
 import numpy as np
 from typing import List, Dict
 from tqdm import tqdm
 
-from models import AlgorithmResult, BatchResult
+from models import AlgorithmResult, BatchResult, BatchSummary, LongRunResult, PrecisionCheck
 from algorithms.base import Algorithm, DemandModel
+from algorithms.alg_ir import ALG_IR
+from algorithms.alg_ir_h import ALG_IR_H
+from algorithms.decision_table import CompiledALG_IR
+from algorithms.myopic import Myopic
+from algorithms.offline import Offline
+from algorithms.offline_cache import OfflineCache
+from algorithms.constant_rate import ConstantRate
+from algorithms.threshold import FixedThreshold
+from algorithms.random_policy import RandomPolicy
+from algorithms.dynamic_programming import DynamicProgramming
+from algorithms.moving_average import MovingAverage
+from algorithms.percentile_threshold import PercentileThreshold
+from algorithms.adaptive_myopic import AdaptiveMyopic
+from checkpoint import BatchCheckpoint, run_key
+from sampling import PriceSampler
+from simulator import MultiPolicySimulator
+from tracing import TraceSink, ConsoleTraceSink, RingBufferSink, TeeTraceSink
+
+# số kịch bản mỗi khối giá của run_batch (cố định => cùng seed cùng kết quả, có checkpoint hay không)
+BATCH_BLOCK = 1000
+
+
+def build_algorithms(config, demand: DemandModel, alg_ir_table: str = None,
+                     offline_cache: OfflineCache = None, dp_inventory_points: int = 1001,
+                     dp_price_points: int = 64) -> List[Algorithm]:
+    if alg_ir_table:
+        alg_ir = CompiledALG_IR(config.Q, config.m, config.M, demand, table_path=alg_ir_table)
+    else:
+        alg_ir = ALG_IR(config.Q, config.m, config.M, demand)
+
+    return [
+        alg_ir,
+        ALG_IR_H(config.Q, config.m, config.M, demand, config.h, n=config.n),
+        Myopic(config.Q, config.m, config.M, demand),
+        Offline(config.Q, config.m, config.M, demand, cache=offline_cache),
+        ConstantRate(config.Q, config.m, config.M, demand),
+        FixedThreshold(config.Q, config.m, config.M, demand),
+        RandomPolicy(config.Q, config.m, config.M, demand),
+        # value function giải lười ở lần decide đầu tiên (theo n thực tế)
+        DynamicProgramming(config.Q, config.m, config.M, demand,
+                           inventory_points=dp_inventory_points, price_points=dp_price_points),
+        MovingAverage(config.Q, config.m, config.M, demand),
+        PercentileThreshold(config.Q, config.m, config.M, demand),
+        AdaptiveMyopic(config.Q, config.m, config.M, demand, prior_error=getattr(config, "prior_error", 0.3)),
+    ]
 
 
 class SimulationRunner:
-    def __init__(self, config):
+    def __init__(self, config, analytic_demand: bool = False, sampling: str = "iid", sampling_points: int = 64,
+                 precision: str = "float64"):
         self.config = config
+        # True: doanh thu mỗi kịch bản = Σ π_t(x_t) (lấy kỳ vọng theo δ bằng công thức đóng)
+        # thay vì 1 lần rút δ ngẫu nhiên -> cần ít kịch bản hơn để CR ổn định
+        self.analytic_demand = analytic_demand
+        # cách sinh giá cho batch (sampling.SAMPLING_MODES): iid / antithetic / sobol / halton / lhs
+        self.sampling = sampling
+        self.sampling_points = sampling_points
+        # dtype của ma trận giá, δ, doanh thu trong batch: float64 / float32 (nhẹ 1/2 bộ nhớ + băng thông)
+        self.precision = precision
+
+    @property
+    def sampler(self) -> PriceSampler:
+        return PriceSampler(self.sampling, self.config.m, self.config.M, self.config.n, self.sampling_points)
+
+    @property
+    def dtype(self) -> np.dtype:
+        return np.dtype(self.precision)
 
 
     def generate_prices(self) -> List[float]:
         return np.random.uniform(self.config.m, self.config.M, self.config.n).tolist()
 
-    def run_single(self, algorithms: List[Algorithm]) -> Dict[str, AlgorithmResult]:
+    def run_single(self, algorithms: List[Algorithm], sinks: Dict[str, TraceSink] = None) -> Dict[str, AlgorithmResult]:
+        # 1 lượt qua kịch bản cho mọi thuật toán, cùng δ mỗi kỳ (sinks: mỗi thuật toán 1 sink riêng)
         prices = self.generate_prices()
-        results = {}
-        for alg in algorithms:
-            result = alg.run(prices)
-            results[alg.name()] = result
+        results = MultiPolicySimulator(algorithms, algorithms[0].demand).run(prices, sinks)
         return results, prices
 
-    def run_batch(self, algorithms: List[Algorithm]) -> Dict[str, BatchResult]:
-        batch_results = {alg.name(): [] for alg in algorithms}
-
-        for _ in tqdm(range(self.config.num_scenarios), desc="Running scenarios"):
-            prices = self.generate_prices()
-            for alg in algorithms:
-                result = alg.run(prices)
-                batch_results[alg.name()].append(result.total_revenue)
+    def generate_price_matrix(self, num_scenarios: int) -> np.ndarray:
+        return self.sampler.sample(num_scenarios).astype(self.dtype, copy=False)
+
+    def check_precision(self, algorithms: List[Algorithm], num_scenarios: int = 256,
+                        reference: str = "Offline") -> PrecisionCheck:
+        """Run the first num_scenarios of the batch in self.precision and in float64 and compare revenues.
+
+        Both runs start from the same RNG state (same prices and δ up to rounding); the state is restored
+        afterwards, so the batch that follows is unchanged by the check.
+        """
+        state = np.random.get_state()
+        revenues = {}
+        for precision in ("float64", self.precision):
+            np.random.set_state(state)
+            prices = self.sampler.sample(num_scenarios).astype(precision)
+            block = self._run_block(algorithms, prices, dtype=np.dtype(precision))
+            revenues[precision] = {name: values.astype(np.float64) for name, values in block.items()}
+        np.random.set_state(state)
+
+        exact, reduced = revenues["float64"], revenues[self.precision]
+        revenue_error, ratio_error = {}, {}
+        for name in exact:
+            scale = np.maximum(np.abs(exact[name]), 1e-12)
+            revenue_error[name] = float(np.max(np.abs(reduced[name] - exact[name]) / scale))
+            ratio = exact[name].mean() / exact[reference].mean()
+            ratio_error[name] = float(abs(reduced[name].mean() / reduced[reference].mean() - ratio) / ratio)
+        return PrecisionCheck(self.precision, num_scenarios, revenue_error, ratio_error)
+
+    def run_batch(self, algorithms: List[Algorithm], price_blocks=None, checkpoint: BatchCheckpoint = None,
+                  checkpoint_every: int = 1000, resume: bool = False,
+                  trace: TraceSink = None) -> Dict[str, BatchResult]:
+        """price_blocks: iterable of (scenarios, n) price matrices, e.g. a PriceStream over a 2-D .npy.
+
+        trace: sink for the period rows of every scenario (wrap in SampledTraceSink to keep every Nth).
+
+        Random prices are always drawn BATCH_BLOCK scenarios at a time, right before each block runs, so a
+        seed gives the same results with or without a checkpoint. checkpoint: save progress once every
+        checkpoint_every scenarios (at block boundaries); resume=True continues from it and gives the same
+        results as an uninterrupted run.
+        """
+        names = [alg.name() for alg in algorithms]
+        # mỗi thuật toán: list các mảng doanh thu theo khối (dtype của runner), nối 1 lần ở cuối
+        # => float32 thì đỉnh bộ nhớ cũng giảm một nửa (không qua list float Python)
+        batch_results = {name: [] for name in names}
+        summaries = {name: BatchSummary.empty(name) for name in names}
+        scenarios_done = 0
+        blocks_done = 0
+        revenue_bytes = 0
+
+        if checkpoint is not None:
+            key = run_key(sorted(vars(self.config).items()), names, self.analytic_demand, BATCH_BLOCK,
+                          price_blocks is None, self.sampling, self.sampling_points, self.precision)
+            state = checkpoint.load(key) if resume else None
+            if state is not None:
+                summaries = state["summaries"]
+                scenarios_done = state["scenarios_done"]
+                blocks_done = state["blocks_done"]
+                revenue_bytes = state["revenue_bytes"]
+                batch_results = {name: [block.astype(self.dtype, copy=False) for block in blocks]
+                                 for name, blocks in checkpoint.load_revenues(names, revenue_bytes).items()}
+                np.random.set_state(state["rng_state"])
+                print(f"Log: resuming batch from checkpoint ({scenarios_done} scenarios done)")
+            else:
+                if resume:
+                    print(f"Log: no checkpoint at {checkpoint.path}, starting from scratch")
+                checkpoint.clear()
+
+        if price_blocks is None:
+            price_blocks = self.generate_price_blocks(self.config.num_scenarios - scenarios_done, BATCH_BLOCK)
+        else:
+            price_blocks = itertools.islice(price_blocks, blocks_done, None)
+
+        # khối đã chạy nhưng chưa ghi vào checkpoint
+        pending = {name: [] for name in names}
+        for price_matrix in price_blocks:
+            price_matrix = np.atleast_2d(np.asarray(price_matrix, dtype=self.dtype))
+            block_results = self._run_block(algorithms, price_matrix, trace)
+            for name, revenues in block_results.items():
+                batch_results[name].append(revenues)
+
+            if checkpoint is not None:
+                for name, revenues in block_results.items():
+                    summaries[name] = summaries[name].merge(BatchSummary.from_revenues(name, revenues))
+                    pending[name].append(revenues)
+                previous = scenarios_done
+                scenarios_done += len(price_matrix)
+                blocks_done += 1
+                if scenarios_done // checkpoint_every > previous // checkpoint_every:
+                    revenue_bytes = checkpoint.append_revenues(
+                        names, {name: np.concatenate(blocks) for name, blocks in pending.items()})
+                    pending = {name: [] for name in names}
+                    checkpoint.save(key, summaries=summaries, scenarios_done=scenarios_done,
+                                    blocks_done=blocks_done, revenue_bytes=revenue_bytes,
+                                    rng_state=np.random.get_state())
+
+        if checkpoint is not None:
+            checkpoint.clear()
 
-        return {
-            name: BatchResult(name=name, revenues=revenues)
-            for name, revenues in batch_results.items()
-        }
+        results = {}
+        for name in names:
+            # pop: các khối của thuật toán này được giải phóng ngay sau khi nối
+            blocks = batch_results.pop(name)
+            results[name] = BatchResult(name=name, revenues=np.concatenate(blocks) if blocks
+                                        else np.empty(0, dtype=self.dtype))
+        return results
+
+    def run_shard(self, algorithms: List[Algorithm], spec) -> Dict[str, BatchSummary]:
+        """Scenarios [spec.start, spec.stop) as mergeable summaries; each block is seeded from its index."""
+        summaries = {alg.name(): BatchSummary.empty(alg.name()) for alg in algorithms}
+        for block, size in spec.blocks():
+            np.random.seed(spec.block_seed(block))
+            for name, revenues in self._run_block(algorithms, self.generate_price_matrix(size)).items():
+                summaries[name] = summaries[name].merge(BatchSummary.from_revenues(name, revenues))
+        return summaries
+
+    def generate_price_blocks(self, num_scenarios: int, block_size: int):
+        # sinh giá từng khối ngay trước khi chạy => trạng thái RNG lưu sau mỗi khối quyết định phần còn lại
+        # khối là bội của group_size để không cắt đôi 1 cặp antithetic / 1 bộ QMC
+        group_size = self.sampler.group_size
+        block_size = -(-block_size // group_size) * group_size
+        for start in range(0, num_scenarios, block_size):
+            yield self.generate_price_matrix(min(block_size, num_scenarios - start))
+
+    def _run_block(self, algorithms: List[Algorithm], price_matrix: np.ndarray, trace: TraceSink = None,
+                   dtype: np.dtype = None) -> Dict[str, np.ndarray]:
+        # doanh thu từng kịch bản của khối, mỗi thuật toán 1 mảng theo dtype (thứ tự như algorithms)
+        dtype = np.dtype(dtype or self.dtype)
+        block_results = {}
+
+        # Thuật toán có bản mảng: chạy cả ma trận kịch bản 1 lần, a(p) và δ tính chung cho mọi thuật toán
+        batch_algorithms = [alg for alg in algorithms if alg.batch_capable]
+        if batch_algorithms:
+            simulator = MultiPolicySimulator(batch_algorithms, batch_algorithms[0].demand, self.analytic_demand,
+                                             dtype=dtype)
+            block_results.update(simulator.run_matrix(price_matrix, trace, h=self.config.h))
+
+        # Còn lại (Offline, ...): từng kịch bản như cũ
+        scalar_algorithms = [alg for alg in algorithms if not alg.batch_capable]
+        if scalar_algorithms:
+            simulator = MultiPolicySimulator(scalar_algorithms, scalar_algorithms[0].demand)
+            for alg in scalar_algorithms:
+                block_results[alg.name()] = np.empty(len(price_matrix), dtype=dtype)
+            for s, row in enumerate(tqdm(price_matrix, desc="Running scenarios")):
+                prices = row.tolist()
+                # trace chung 1 sink cho mọi thuật toán -> không đi chung lượt (các kỳ sẽ xen kẽ nhau)
+                results = ({alg.name(): alg.run(prices, sink=trace, h=self.config.h) for alg in scalar_algorithms}
+                           if trace is not None else simulator.run(prices, h=self.config.h))
+                for alg in scalar_algorithms:
+                    result = results[alg.name()]
+                    if self.analytic_demand:
+                        revenue = float(alg.demand.expected_revenue(prices, result.retrievals))
+                    else:
+                        revenue = result.total_revenue
+                    block_results[alg.name()][s] = revenue
+        return {alg.name(): block_results[alg.name()] for alg in algorithms}
+
+    def generate_price_chunks(self, n: int, chunk_size: int, seed: int):
+        # sinh giá theo từng đoạn, cùng seed => cùng chuỗi giá cho mọi thuật toán
+        rng = np.random.default_rng(seed)
+        for start in range(0, n, chunk_size):
+            yield rng.uniform(self.config.m, self.config.M, min(chunk_size, n - start))
+
+    def run_long(self, algorithms: List[Algorithm], chunk_size: int = 65536,
+                 trace_every: int = None, price_stream=None) -> Dict[str, LongRunResult]:
+        """One scenario of n periods per algorithm, memory bounded by chunk_size.
+
+        price_stream: re-iterable source of price chunks (e.g. PriceStream); random prices if None.
+        """
+        seed = int(np.random.randint(0, 2 ** 31 - 1))
+        n = len(price_stream) if price_stream is not None else self.config.n
+        results = {}
+        for alg in algorithms:
+            # Offline cần toàn bộ giá trước -> không chạy theo stream
+            # DP-Optimal cần value function cho cả n kỳ (n ~ 10^6 thì không thực tế)
+            if alg.name() in ("Offline", "DP-Optimal"):
+                continue
+            if price_stream is not None:
+                prices = price_stream
+            else:
+                prices = self.generate_price_chunks(n, chunk_size, seed)
+            results[alg.name()] = alg.run_long(prices, n=n, chunk_size=chunk_size,
+                                               trace_every=trace_every, h=self.config.h)
+        return results
 
-    def run_verbose_single(self, algorithm: Algorithm):
-        """Print detailed  for PDF export"""
-        from colorama import Fore, Style, init
-        init(autoreset=True)
+    def run_verbose(self, algorithms: List[Algorithm], sink: TraceSink = None):
+        """One price scenario for every algorithm, traced period by period.
 
+        Returns (results, traces): traces[name] holds the rows for the PDF export.
+        """
         prices = self.generate_prices()
-        n = len(prices)
-
-        print(f"\n{'=' * 100}")
-        print(f"{Fore.CYAN}Log: ALGORITHM: {algorithm.name()}{Style.RESET_ALL}")
-        print(f"{'=' * 100}")
-        print(f"Initial Inventory: {self.config.Q}")
-        print(f"Periods: {n}")
-        print(f"Price Range: [{self.config.m}, {self.config.M}]")
-        print(f"Holding Cost: h={self.config.h}")
-        print(f"{'=' * 100}\n")
-
-        # OFFLINE
-        if algorithm.name() == "Offline":
-            print(f"{Fore.YELLOW}⚠Log:  Offline algorithm requires all prices upfront.{Style.RESET_ALL}")
-            print(f"{Fore.YELLOW}   Running full simulation instead of period-by-period...{Style.RESET_ALL}\n")
-
-            result = algorithm.run(prices)
-
-            print(f"{'Period':<8}{'Price':<10}{'Retrieval':<12}{'Revenue':<12}")
-            print("-" * 50)
-
-            for t, (price, retrieval, revenue) in enumerate(
-                    zip(prices, result.retrievals, result.revenues), start=1
-            ):
-                color = Fore.GREEN if retrieval > 0 else Fore.YELLOW
-                print(f"{color}{t:<8}{price:<10.2f}{retrieval:<12.1f}{revenue:<12.2f}{Style.RESET_ALL}")
-
-            print("-" * 50)
-            print(f"\n{Fore.CYAN}Log: SUMMARY:{Style.RESET_ALL}")
-            print(f"  Total Revenue:        ${result.total_revenue:,.2f}")
-            print(f"  Final Inventory:      {result.inventory[-1]}")
-            print(f"  Total Retrieved:      {sum(result.retrievals):.1f}")
-            print(f"  Utilization Rate:     {(sum(result.retrievals) / self.config.Q) * 100:.1f}%")
-            print(f"{'=' * 100}\n")
-
-            #  RETURN DATA FOR PDF
-            return {
-                "prices": prices,
-                "retrievals": result.retrievals,
-                "revenues": result.revenues,
-                "final_inventory": result.inventory[-1],
-                "total_revenue": result.total_revenue,
-                "total_holding_cost": 0.0,
-                "total_retrieved": sum(result.retrievals),
-            }
-
-        #  ONLINE ALGORITHMS
-        inventory = float(self.config.Q)
-        cumulative = 0.0
-        total_revenue = 0.0
-        total_holding_cost = 0.0
-
-        print(f"{'Period':<8}{'Price':<10}{'Inventory':<12}{'Retrieval':<12}"
-              f"{'δ_t':<10}{'Demand':<12}{'Sales':<10}{'Revenue':<12}{'Hold Cost':<12}{'Remaining':<12}")
-        print("-" * 120)
-
-        retrievals = []
-        revenues = []
-
-        for t, price in enumerate(prices, start=1):
-            retrieval = algorithm.decide(t, n, price, inventory, cumulative)
-            retrieval = max(0.0, min(retrieval, inventory))
-
-            base_demand = algorithm.demand.expected(price)
-
-            if algorithm.demand.distribution == "truncnorm":
-                fluctuation = algorithm.demand.truncnorm.rvs()
-            else:
-                fluctuation = algorithm.demand.dist.rvs()
-
-            actual_demand = base_demand * fluctuation
-
-            sales = min(retrieval, actual_demand)
-            revenue = price * sales
-
-            remaining_after_retrieval = inventory - retrieval
-            holding_cost = remaining_after_retrieval * self.config.h
-
-            inventory -= retrieval
-            cumulative += retrieval
-            total_revenue += revenue
-            total_holding_cost += holding_cost
-
-            retrievals.append(retrieval)
-            revenues.append(revenue)
-
-            color = Fore.GREEN if retrieval > 0 else Fore.YELLOW
-            print(f"{color}{t:<8}{price:<10.2f}{inventory + retrieval:<12.1f}{retrieval:<12.1f}"
-                  f"{fluctuation:<10.3f}{actual_demand:<12.1f}{sales:<10.1f}{revenue:<12.2f}"
-                  f"{holding_cost:<12.2f}{inventory:<12.1f}{Style.RESET_ALL}")
-
-        print("-" * 120)
-        print(f"\n{Fore.CYAN}Log: SUMMARY:{Style.RESET_ALL}")
-        print(f"  Total Revenue:        ${total_revenue:,.2f}")
-        print(f"  Total Holding Cost:   ${total_holding_cost:,.2f}")
-        print(f"  Net Profit:           ${total_revenue - total_holding_cost:,.2f}")
-        print(f"  Final Inventory:      {inventory:.1f}")
-        print(f"  Total Retrieved:      {cumulative:.1f}")
-        print(f"  Utilization Rate:     {(cumulative / self.config.Q) * 100:.1f}%")
-        print(f"{'=' * 100}\n")
-
-        # RETURN DATA FOR PDF
-        return {
-            "prices": prices,
-            "retrievals": retrievals,
-            "revenues": revenues,
-            "final_inventory": inventory,
-            "total_revenue": total_revenue,
-            "total_holding_cost": total_holding_cost,
-            "total_retrieved": cumulative,
-        }
+        sink = sink or ConsoleTraceSink()
+        results, traces = {}, {}
+        for algorithm in algorithms:
+            rows = RingBufferSink()
+            results[algorithm.name()] = algorithm.run(prices, sink=TeeTraceSink(sink, rows), h=self.config.h)
+            traces[algorithm.name()] = rows.rows()
+        sink.close()
+        return results, traces
@@ -0,0 +1,87 @@
+## sinh kịch bản giá giảm phương sai cho batch (thay cho np.random.uniform i.i.d.)
+## iid        : như cũ
+## antithetic : cặp (p, m + M - p), 2 hàng liền nhau
+## sobol/halton: quasi-Monte Carlo có scramble (scipy.stats.qmc), mỗi `points` hàng liền nhau là 1 bộ độc lập
+## lhs        : Latin hypercube, cũng theo bộ `points` hàng
+## => các hàng chia thành nhóm liền nhau cỡ group_size, các nhóm độc lập với nhau (randomized QMC)
+##    phương sai của ước lượng trung bình = var(trung bình nhóm) / số nhóm (đúng cho mọi mode)
+##    so với s² / N của i.i.d. cùng số kịch bản (mỗi hàng vẫn có phân phối U[m, M]^n) => hệ số giảm phương sai
+## seed của từng bộ QMC rút từ np.random => --seed và checkpoint (lưu trạng thái RNG) vẫn tái lập được
+
+import warnings
+from typing import Dict
+
+import numpy as np
+from scipy.stats import qmc
+
+SAMPLING_MODES = ("iid", "antithetic", "sobol", "halton", "lhs")
+
+
+class PriceSampler:
+    def __init__(self, mode: str, m: float, M: float, n: int, points: int = 64):
+        if mode not in SAMPLING_MODES:
+            raise ValueError(f"Unknown sampling mode: {mode} (use one of {', '.join(SAMPLING_MODES)})")
+        self.mode = mode
+        self.m = m
+        self.M = M
+        self.n = n
+        self.points = points
+
+    @property
+    def group_size(self) -> int:
+        """Rows per independent group (1 for iid, 2 for antithetic pairs, `points` for QMC / LHS)."""
+        return {"iid": 1, "antithetic": 2}.get(self.mode, self.points)
+
+    def _unit_group(self, seed: int) -> np.ndarray:
+        if self.mode == "lhs":
+            return qmc.LatinHypercube(d=self.n, seed=seed).random(self.points)
+        engine = (qmc.Sobol if self.mode == "sobol" else qmc.Halton)(d=self.n, scramble=True, seed=seed)
+        with warnings.catch_warnings():
+            # Sobol cân bằng nhất khi points là luỹ thừa 2; số khác vẫn dùng được
+            warnings.simplefilter("ignore", UserWarning)
+            return engine.random(self.points)
+
+    def sample(self, num_scenarios: int) -> np.ndarray:
+        """(num_scenarios, n) prices in [m, M]; the last group may be cut short."""
+        if self.mode == "iid":
+            return np.random.uniform(self.m, self.M, (num_scenarios, self.n))
+
+        if self.mode == "antithetic":
+            half = np.random.uniform(self.m, self.M, ((num_scenarios + 1) // 2, self.n))
+            pairs = np.stack([half, self.m + self.M - half], axis=1)
+            return pairs.reshape(-1, self.n)[:num_scenarios]
+
+        groups = -(-num_scenarios // self.points)
+        seeds = np.random.randint(0, 2 ** 31 - 1, size=groups)
+        unit = np.concatenate([self._unit_group(int(seed)) for seed in seeds])[:num_scenarios]
+        return self.m + unit * (self.M - self.m)
+
+
+def variance_report(batch_results, group_size: int, reference: str = "Offline") -> Dict[str, Dict[str, float]]:
+    """Standard errors of mean revenue and CR (vs `reference`) and their variance reduction over i.i.d.
+
+    Rows are read as consecutive groups of `group_size`; an incomplete last group is dropped.
+    """
+    offline = np.asarray(batch_results[reference].revenues, dtype=float)
+    groups = len(offline) // group_size
+    if groups < 2:
+        raise ValueError(f"Need at least 2 complete groups of {group_size} scenarios for a variance estimate")
+    size = groups * group_size
+    offline = offline[:size]
+    offline_mean = offline.mean()
+
+    report = {}
+    for name, result in batch_results.items():
+        revenues = np.asarray(result.revenues, dtype=float)[:size]
+        ratio = revenues.mean() / offline_mean
+        # CR = mean / mean_offline: tuyến tính hoá (delta method), phần dư (R - CR·O) / mean(O)
+        residual = (revenues - ratio * offline) / offline_mean
+
+        row = {"mean": float(revenues.mean()), "cr": float(ratio)}
+        for key, values in (("mean", revenues), ("cr", residual)):
+            iid_variance = values.var(ddof=1) / size
+            group_variance = values.reshape(groups, group_size).mean(axis=1).var(ddof=1) / groups
+            row[f"{key}_se"] = float(np.sqrt(group_variance))
+            row[f"{key}_reduction"] = float(iid_variance / group_variance) if group_variance > 0 else float("inf")
+        report[name] = row
+    return report
@@ -0,0 +1,107 @@
+## chia 1 batch lớn cho nhiều máy (shard)
+## kịch bản chia thành các khối cố định block_size; mỗi shard nhận 1 dải khối liên tiếp
+## seed mỗi khối suy ra từ (seed gốc, chỉ số khối) qua SeedSequence
+## => kết quả từng kịch bản không phụ thuộc số shard, gộp N shard == chạy 1 shard
+## mỗi shard ghi BatchSummary (count, mean, M2, min/max, sketch quantile) ra JSON, merge_shards gộp lại
+
+import json
+import math
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List
+
+import numpy as np
+
+from models import BatchSummary
+from runner import SimulationRunner
+
+
+@dataclass
+class ShardSpec:
+    index: int
+    num_shards: int
+    start: int  # kịch bản đầu (tính cả)
+    stop: int  # kịch bản cuối (không tính)
+    seed: int
+    block_size: int = 1000
+
+    @classmethod
+    def plan(cls, num_scenarios: int, num_shards: int, seed: int, block_size: int = 1000) -> List["ShardSpec"]:
+        num_blocks = math.ceil(num_scenarios / block_size)
+        specs = []
+        for index in range(num_shards):
+            first = index * num_blocks // num_shards
+            last = (index + 1) * num_blocks // num_shards
+            specs.append(cls(index, num_shards, min(first * block_size, num_scenarios),
+                             min(last * block_size, num_scenarios), seed, block_size))
+        return specs
+
+    @classmethod
+    def parse(cls, text: str, num_scenarios: int, seed: int, block_size: int = 1000) -> "ShardSpec":
+        """'i/N' (1-based, e.g. 2/4) -> spec of that shard."""
+        index, num_shards = (int(part) for part in text.split("/"))
+        if not 1 <= index <= num_shards:
+            raise ValueError(f"Shard must be i/N with 1 <= i <= N, got {text}")
+        return cls.plan(num_scenarios, num_shards, seed, block_size)[index - 1]
+
+    def blocks(self):
+        # (chỉ số khối, số kịch bản của khối)
+        for start in range(self.start, self.stop, self.block_size):
+            yield start // self.block_size, min(self.block_size, self.stop - start)
+
+    def block_seed(self, block: int) -> np.ndarray:
+        return np.random.SeedSequence([self.seed, block]).generate_state(4)
+
+
+def _config_fingerprint(config) -> dict:
+    return {key: value for key, value in sorted(vars(config).items())}
+
+
+def run_shard_worker(config, algorithms, spec: ShardSpec, out_dir, analytic_demand: bool = False) -> Path:
+    """Run one shard and write its partial aggregates to out_dir/shard_<i>_of_<N>.json."""
+    runner = SimulationRunner(config, analytic_demand=analytic_demand)
+    summaries = runner.run_shard(algorithms, spec)
+
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    path = out_dir / f"shard_{spec.index + 1}_of_{spec.num_shards}.json"
+    with open(path, 'w') as f:
+        json.dump({
+            "config": _config_fingerprint(config),
+            "analytic_demand": analytic_demand,
+            "shard": vars(spec),
+            "summaries": [summary.to_dict() for summary in summaries.values()],
+        }, f)
+    return path
+
+
+def merge_shards(shard_dir) -> Dict[str, BatchSummary]:
+    paths = sorted(Path(shard_dir).glob("shard_*_of_*.json"))
+    if not paths:
+        raise ValueError(f"No shard files in {shard_dir}")
+
+    merged = {}
+    reference = None
+    indices = set()
+    for path in paths:
+        with open(path, 'r') as f:
+            data = json.load(f)
+
+        # block_size quyết định dải kịch bản + RNG của từng khối; tập thuật toán phải trùng để gộp đúng
+        run = (data["config"], data["analytic_demand"], data["shard"]["num_shards"], data["shard"]["seed"],
+               data["shard"]["block_size"], sorted(item["name"] for item in data["summaries"]))
+        if reference is None:
+            reference = run
+        elif run != reference:
+            raise ValueError(f"{path.name} belongs to a different study "
+                             f"(config, seed, shard count, block size or algorithms differ)")
+        indices.add(data["shard"]["index"])
+
+        for item in data["summaries"]:
+            summary = BatchSummary.from_dict(item)
+            merged[summary.name] = merged[summary.name].merge(summary) if summary.name in merged else summary
+
+    missing = sorted(set(range(reference[2])) - indices)
+    if missing:
+        print(f"Log: missing shards {[i + 1 for i in missing]} of {reference[2]}, summary is partial")
+    return merged
@@ -0,0 +1,221 @@
+## mô phỏng nhiều thuật toán trong 1 lượt đi qua kịch bản
+## phần việc chung của mỗi kỳ (a - bp, δ, demand thật) tính 1 lần rồi đưa cho bước quyết định của từng thuật toán
+## => tổng công ~ số kỳ + số quyết định, không phải số kỳ x số thuật toán
+## mọi thuật toán gặp cùng δ (common random numbers): chênh lệch doanh thu giữa 2 thuật toán ít nhiễu hơn
+## Algorithm.run (1 thuật toán) cũng đi qua simulate_scenario => 1 vòng mô phỏng duy nhất trong repo
+## run_matrix theo dtype (float64 / float32): giá, a - bp, δ, retrievals và doanh thu giữ ở dtype đó
+##   float32 => ma trận (kịch bản, n) nhẹ một nửa; quyết định bên trong thuật toán vẫn tính float64
+
+from typing import Dict, List
+
+import numpy as np
+
+from models import AlgorithmResult
+from tracing import TraceSink, trace_context, trace_matrix
+
+
+class _PolicyWalk:
+    # state của 1 thuật toán trong lượt đi chung
+    __slots__ = ("algorithm", "decide", "sink", "tracing", "inventory", "cumulative", "retrieval",
+                 "retrievals", "revenues", "inventory_levels", "total_revenue", "total_holding_cost")
+
+    def __init__(self, algorithm, decide, sink: TraceSink, n: int, h: float):
+        self.algorithm = algorithm
+        self.decide = decide
+        self.sink = sink
+        self.tracing = sink is not None and sink.begin(algorithm.name(), n, trace_context(algorithm, h))
+        self.inventory = float(algorithm.Q)
+        self.cumulative = 0.0
+        self.retrieval = 0.0
+        self.retrievals = []
+        self.revenues = []
+        self.inventory_levels = [algorithm.Q]
+        self.total_revenue = 0.0
+        self.total_holding_cost = 0.0
+
+    def result(self) -> AlgorithmResult:
+        if self.tracing:
+            self.sink.end({
+                "total_revenue": self.total_revenue,
+                "total_holding_cost": self.total_holding_cost,
+                "final_inventory": self.inventory,
+                "total_retrieved": self.cumulative,
+            })
+        return AlgorithmResult(
+            name=self.algorithm.name(),
+            total_revenue=self.total_revenue,
+            retrievals=self.retrievals,
+            revenues=self.revenues,
+            inventory=self.inventory_levels
+        )
+
+
+def _step(walks, t: int, n: int, price: float, demand, draw, h: float):
+    # 1 kỳ cho mọi thuật toán trong lượt đi chung
+    # 1. Quyết định lấy bao nhiêu (trước khi rút δ, giữ đúng thứ tự RNG của vòng 1 thuật toán cũ)
+    for walk in walks:
+        retrieval = walk.decide(t, n, price, walk.inventory, walk.cumulative)
+        walk.retrieval = max(0.0, min(retrieval, walk.inventory))
+
+    # 2. Demand: 1 lần cho mọi thuật toán
+    base_demand = demand.expected(price)
+    fluctuation = draw()
+    actual_demand = base_demand * fluctuation
+
+    for walk in walks:
+        retrieval = walk.retrieval
+        inventory_before = walk.inventory
+
+        # 3. Sales & revenue
+        sales = min(retrieval, actual_demand)
+        revenue = price * sales
+        walk.algorithm.observe(t, price, retrieval, sales)
+
+        # 4. Holding cost (h = 0: không tính)
+        inventory_after = inventory_before - retrieval
+        holding_cost = inventory_after * h
+
+        # 5. Update trạng thái
+        walk.inventory = inventory_after
+        walk.cumulative += retrieval
+        walk.total_revenue += revenue
+        walk.total_holding_cost += holding_cost
+        walk.retrievals.append(retrieval)
+        walk.revenues.append(revenue)
+        walk.inventory_levels.append(inventory_after)
+
+        # 6. Trace (console / file / PDF)
+        if walk.tracing:
+            walk.sink.record(t, price, inventory_before, retrieval, fluctuation, actual_demand,
+                             sales, revenue, holding_cost, inventory_after)
+
+
+def _draw(demand):
+    return demand.truncnorm.rvs if demand.distribution == "truncnorm" else demand.dist.rvs
+
+
+def simulate_scenario(prices: List[float], policies, demand, h: float = 0.0) -> Dict[str, AlgorithmResult]:
+    """Walk one price scenario once for several policies.
+
+    policies: (algorithm, decide, sink) triples; sink may be None, one sink object per policy.
+    """
+    n = len(prices)
+    walks = [_PolicyWalk(algorithm, decide, sink, n, h) for algorithm, decide, sink in policies]
+    draw = _draw(demand)
+    for t, price in enumerate(prices, start=1):
+        _step(walks, t, n, price, demand, draw, h)
+    return {walk.algorithm.name(): walk.result() for walk in walks}
+
+
+class OnlineSession:
+    """Period-by-period decisions as prices arrive (e.g. periods closed by a TickAggregator).
+
+    Same step as simulate_scenario (shared δ per period), but the season is fed one price at a time.
+    """
+
+    def __init__(self, algorithms, demand, n: int, h: float = 0.0, sinks: Dict[str, TraceSink] = None):
+        # Offline cần cả chuỗi giá trước => không chạy online
+        self.algorithms = [alg for alg in algorithms if alg.name() != "Offline"]
+        self.demand = demand
+        self.n = n
+        self.h = h
+        self.t = 0
+        self._draw = _draw(demand)
+        self._walks = [_PolicyWalk(alg, alg.decide, sinks.get(alg.name()) if sinks else None, n, h)
+                       for alg in self.algorithms]
+
+    @property
+    def done(self) -> bool:
+        return self.t >= self.n
+
+    def step(self, price: float) -> Dict[str, float]:
+        """Decide period t + 1 at this price; returns the retrieval of every algorithm."""
+        if self.done:
+            raise ValueError(f"Season already has n={self.n} periods")
+        self.t += 1
+        _step(self._walks, self.t, self.n, float(price), self.demand, self._draw, self.h)
+        return {walk.algorithm.name(): walk.retrieval for walk in self._walks}
+
+    def step_many(self, prices) -> int:
+        """Feed closed periods in order until the season is full; returns how many were used."""
+        used = 0
+        for price in np.asarray(prices, dtype=float).tolist():
+            if self.done:
+                break
+            self.step(price)
+            used += 1
+        return used
+
+    def results(self) -> Dict[str, AlgorithmResult]:
+        return {walk.algorithm.name(): walk.result() for walk in self._walks}
+
+
+def run_lockstep(algorithms, prices: np.ndarray, actual_demand: np.ndarray) -> Dict[str, np.ndarray]:
+    """Step policies that learn from sales (decide_batch + observe_batch) through a (scenarios, n) matrix together."""
+    num_scenarios, n = prices.shape
+    retrievals = {alg.name(): np.zeros_like(prices) for alg in algorithms}
+    inventory = {alg.name(): np.full(num_scenarios, float(alg.Q)) for alg in algorithms}
+
+    for t in range(1, n + 1):
+        price, demand = prices[:, t - 1], actual_demand[:, t - 1]
+        for alg in algorithms:
+            name = alg.name()
+            retrieval = np.clip(alg.decide_batch(t, n, price, inventory[name], alg.Q - inventory[name]),
+                                0.0, inventory[name])
+            alg.observe_batch(t, price, retrieval, np.minimum(retrieval, demand))
+            retrievals[name][:, t - 1] = retrieval
+            inventory[name] = inventory[name] - retrieval
+    return retrievals
+
+
+class MultiPolicySimulator:
+    """Runs a price matrix through several algorithms sharing a(p), δ and the realized demand."""
+
+    def __init__(self, algorithms, demand, analytic_demand: bool = False, dtype=np.float64):
+        self.algorithms = algorithms
+        self.demand = demand
+        self.analytic_demand = analytic_demand
+        self.dtype = np.dtype(dtype)
+
+    def run(self, prices: List[float], sinks: Dict[str, TraceSink] = None, h: float = 0.0) -> Dict[str, AlgorithmResult]:
+        prices = list(prices)
+        policies = [(alg, alg.decision_rule(prices), sinks.get(alg.name()) if sinks else None)
+                    for alg in self.algorithms]
+        return simulate_scenario(prices, policies, self.demand, h)
+
+    def run_matrix(self, prices: np.ndarray, trace: TraceSink = None,
+                   fluctuations: np.ndarray = None, h: float = 0.0) -> Dict[str, np.ndarray]:
+        """Revenue per scenario for every algorithm (expected over δ when analytic_demand).
+
+        fluctuations: δ matrix to use instead of fresh draws (e.g. importance sampling in risk.py).
+        h: holding cost per unit per period, only for the Holding Cost column of the trace (as in run()).
+        """
+        dtype = self.dtype
+        prices = np.atleast_2d(np.asarray(prices, dtype=dtype))
+        base_demand = self.demand.expected_array(prices).astype(dtype, copy=False)
+        if self.analytic_demand:
+            fluctuations = None
+        elif fluctuations is None:
+            fluctuations = self.demand.sample_fluctuations(prices.shape).astype(dtype, copy=False)
+        else:
+            fluctuations = np.asarray(fluctuations, dtype=dtype)
+
+        # thuật toán học từ doanh số cần δ thật kể cả ở analytic mode -> rút 1 lần, dùng chung
+        learners = [alg for alg in self.algorithms if alg.uses_feedback]
+        learned = {}
+        if learners:
+            path = fluctuations if fluctuations is not None else self.demand.sample_fluctuations(prices.shape)
+            learned = run_lockstep(learners, prices, base_demand * path.astype(dtype, copy=False))
+
+        revenues = {}
+        for alg in self.algorithms:
+            retrievals = learned[alg.name()] if alg.uses_feedback else alg.plan(prices)
+            retrievals = np.asarray(retrievals).astype(dtype, copy=False)
+            if fluctuations is None:
+                revenue = self.demand.expected_revenue(prices, retrievals, base=base_demand)
+            else:
+                revenue = np.sum(prices * np.minimum(retrievals, base_demand * fluctuations), axis=1)
+            revenues[alg.name()] = np.asarray(revenue).astype(dtype, copy=False)
+            if trace is not None:
+                trace_matrix(trace, alg, prices, retrievals, fluctuations, h)
+        return revenues
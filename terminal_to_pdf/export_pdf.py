@@ -5,7 +5,8 @@ from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, Tabl
 from datetime import datetime
 
 
-def export_results_to_pdf(all_results, filename):
+def export_results_to_pdf(all_results, filename, traces=None):
+    # traces: {tên thuật toán: list dòng theo kỳ} từ RingBufferSink (tracing.py)
     print(">>> START EXPORT PDF:", filename)
 
     try:
@@ -40,7 +41,8 @@ def export_results_to_pdf(all_results, filename):
                 "Hold Cost", "Remaining"
             ]]
 
-            for row in result.period_logs:
+            rows = traces.get(alg_name, []) if traces else result.period_logs
+            for row in rows:
                 table_data.append([
                     row["Period"],
                     f'{row["Price"]:.2f}',
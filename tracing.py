@@ -0,0 +1,236 @@
+## trace theo từng kỳ cho vòng mô phỏng (Algorithm.run, run_batch, verbose, PDF)
+## 1 kịch bản = begin() -> record() mỗi kỳ -> end()
+## begin() trả False => kịch bản đó không được trace (vd SampledTraceSink chỉ lấy mỗi kịch bản thứ N)
+## không gắn sink => vòng lặp không tạo dict / list log nào
+
+import csv
+import json
+import sys
+from collections import deque
+from pathlib import Path
+from typing import Dict, Any, List
+
+import numpy as np
+
+# tên cột, trùng key period_logs cũ mà export PDF đang đọc
+FIELDS = ("Period", "Price", "Inventory", "Retrieval", "Delta", "Demand",
+          "Sales", "Revenue", "HoldingCost", "Remaining")
+
+
+class TraceSink:
+    def begin(self, name: str, n: int, context: Dict[str, Any]) -> bool:
+        """Start one scenario of `name`; return False to skip tracing it."""
+        return True
+
+    def record(self, t, price, inventory, retrieval, delta, demand, sales, revenue, holding_cost, remaining):
+        pass
+
+    def end(self, summary: Dict[str, Any]):
+        pass
+
+    def close(self):
+        pass
+
+
+class ConsoleTraceSink(TraceSink):
+    """Colored period table like the old verbose mode, written in blocks instead of one print per row."""
+
+    def __init__(self, stream=None, color: bool = True, flush_every: int = 256):
+        self.stream = stream or sys.stdout
+        self.flush_every = flush_every
+        self._lines = []
+
+        if color:
+            from colorama import Fore, Style, init
+            init(autoreset=True)
+            self._cyan, self._green, self._yellow, self._reset = Fore.CYAN, Fore.GREEN, Fore.YELLOW, Style.RESET_ALL
+        else:
+            self._cyan = self._green = self._yellow = self._reset = ""
+
+    def _flush(self):
+        if self._lines:
+            self.stream.write("\n".join(self._lines) + "\n")
+            self._lines = []
+
+    def begin(self, name: str, n: int, context: Dict[str, Any]) -> bool:
+        self._context = context
+        self._lines += [
+            "", "=" * 100,
+            f"{self._cyan}Log: ALGORITHM: {name}{self._reset}",
+            "=" * 100,
+            f"Initial Inventory: {context['Q']}",
+            f"Periods: {n}",
+            f"Price Range: [{context['m']}, {context['M']}]",
+            f"Holding Cost: h={context['h']}",
+            "=" * 100, "",
+            f"{'Period':<8}{'Price':<10}{'Inventory':<12}{'Retrieval':<12}"
+            f"{'δ_t':<10}{'Demand':<12}{'Sales':<10}{'Revenue':<12}{'Hold Cost':<12}{'Remaining':<12}",
+            "-" * 120,
+        ]
+        return True
+
+    def record(self, t, price, inventory, retrieval, delta, demand, sales, revenue, holding_cost, remaining):
+        color = self._green if retrieval > 0 else self._yellow
+        self._lines.append(
+            f"{color}{t:<8}{price:<10.2f}{inventory:<12.1f}{retrieval:<12.1f}"
+            f"{delta:<10.3f}{demand:<12.1f}{sales:<10.1f}{revenue:<12.2f}"
+            f"{holding_cost:<12.2f}{remaining:<12.1f}{self._reset}"
+        )
+        if len(self._lines) >= self.flush_every:
+            self._flush()
+
+    def end(self, summary: Dict[str, Any]):
+        Q = self._context["Q"]
+        self._lines += [
+            "-" * 120,
+            f"\n{self._cyan}Log: SUMMARY:{self._reset}",
+            f"  Total Revenue:        ${summary['total_revenue']:,.2f}",
+            f"  Total Holding Cost:   ${summary['total_holding_cost']:,.2f}",
+            f"  Net Profit:           ${summary['total_revenue'] - summary['total_holding_cost']:,.2f}",
+            f"  Final Inventory:      {summary['final_inventory']:.1f}",
+            f"  Total Retrieved:      {summary['total_retrieved']:.1f}",
+            f"  Utilization Rate:     {(summary['total_retrieved'] / Q) * 100:.1f}%",
+            "=" * 100,
+        ]
+        self._flush()
+        self.stream.flush()
+
+    def close(self):
+        self._flush()
+
+
+class FileTraceSink(TraceSink):
+    """Write rows to a .jsonl or .csv file, tagged with algorithm and scenario number."""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        if self.path.suffix not in (".jsonl", ".csv"):
+            raise ValueError(f"Unsupported trace file: {self.path.suffix} (use .jsonl or .csv)")
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+
+        self._file = open(self.path, 'w', newline="")
+        self._csv = None
+        if self.path.suffix == ".csv":
+            self._csv = csv.writer(self._file)
+            self._csv.writerow(("Algorithm", "Scenario") + FIELDS)
+        self._scenarios = {}
+
+    def begin(self, name: str, n: int, context: Dict[str, Any]) -> bool:
+        self._name = name
+        self._scenario = context.get("scenario", self._scenarios.get(name, 0))
+        self._scenarios[name] = self._scenario + 1
+        return True
+
+    def record(self, *row):
+        if self._csv is not None:
+            self._csv.writerow((self._name, self._scenario) + row)
+        else:
+            record = {"Algorithm": self._name, "Scenario": self._scenario, **dict(zip(FIELDS, row))}
+            self._file.write(json.dumps(record) + "\n")
+
+    def close(self):
+        self._file.close()
+
+
+class RingBufferSink(TraceSink):
+    """Keeps the last `capacity` periods in memory (all of them if capacity is None)."""
+
+    def __init__(self, capacity: int = None):
+        self._rows = deque(maxlen=capacity)
+
+    def record(self, *row):
+        self._rows.append(row)
+
+    def rows(self) -> List[Dict[str, Any]]:
+        return [dict(zip(FIELDS, row)) for row in self._rows]
+
+
+class SampledTraceSink(TraceSink):
+    """Forwards only every `every`-th scenario (counted per algorithm) to `sink`."""
+
+    def __init__(self, sink: TraceSink, every: int):
+        self.sink = sink
+        self.every = every
+        self._seen = {}
+
+    def begin(self, name: str, n: int, context: Dict[str, Any]) -> bool:
+        index = self._seen.get(name, 0)
+        self._seen[name] = index + 1
+        # chỉ số kịch bản thật (không phải thứ tự trong các kịch bản được lấy)
+        return index % self.every == 0 and self.sink.begin(name, n, {**context, "scenario": index})
+
+    def record(self, *row):
+        self.sink.record(*row)
+
+    def end(self, summary: Dict[str, Any]):
+        self.sink.end(summary)
+
+    def close(self):
+        self.sink.close()
+
+
+class TeeTraceSink(TraceSink):
+    """Sends every period to several sinks (e.g. console + ring buffer for the PDF)."""
+
+    def __init__(self, *sinks: TraceSink):
+        self.sinks = sinks
+
+    def begin(self, name: str, n: int, context: Dict[str, Any]) -> bool:
+        self._active = [sink for sink in self.sinks if sink.begin(name, n, context)]
+        return bool(self._active)
+
+    def record(self, *row):
+        for sink in self._active:
+            sink.record(*row)
+
+    def end(self, summary: Dict[str, Any]):
+        for sink in self._active:
+            sink.end(summary)
+
+    def close(self):
+        for sink in self.sinks:
+            sink.close()
+
+
+def trace_context(algorithm, h: float = 0.0) -> Dict[str, Any]:
+    return {"Q": algorithm.Q, "m": algorithm.m, "M": algorithm.M, "h": h}
+
+
+def trace_matrix(sink: TraceSink, algorithm, prices: np.ndarray, retrievals: np.ndarray,
+                 fluctuations: np.ndarray = None, h: float = 0.0):
+    """Feed the rows of a run_matrix / plan result to a sink, scenario by scenario.
+
+    fluctuations=None (analytic demand): Demand is (a-bp) and Sales/Revenue are expectations over δ.
+    """
+    prices = np.atleast_2d(prices)
+    n = prices.shape[1]
+    base_demand = algorithm.demand.expected_array(prices)
+    remaining = algorithm.Q - np.cumsum(retrievals, axis=1)
+    inventory = remaining + retrievals
+
+    if fluctuations is None:
+        delta = np.full(prices.shape, np.nan)
+        demand = base_demand
+        sales = algorithm.demand.expected_sales(retrievals, prices)
+    else:
+        delta = fluctuations
+        demand = base_demand * fluctuations
+        sales = np.minimum(retrievals, demand)
+    revenue = prices * sales
+    holding_cost = remaining * h
+
+    context = trace_context(algorithm, h)
+    periods = list(range(1, n + 1))
+    for s in range(len(prices)):
+        if not sink.begin(algorithm.name(), n, context):
+            continue
+        for row in zip(periods, prices[s].tolist(), inventory[s].tolist(), retrievals[s].tolist(),
+                       delta[s].tolist(), demand[s].tolist(), sales[s].tolist(), revenue[s].tolist(),
+                       holding_cost[s].tolist(), remaining[s].tolist()):
+            sink.record(*row)
+        sink.end({
+            "total_revenue": float(revenue[s].sum()),
+            "total_holding_cost": float(holding_cost[s].sum()),
+            "final_inventory": float(remaining[s, -1]),
+            "total_retrieved": float(retrievals[s].sum()),
+        })
@@ -5,10 +5,19 @@
 import matplotlib.pyplot as plt
 import numpy as np
 from typing import Dict
-from models import BatchResult
+from models import BatchResult, BootstrapResult
 
 
-def plot_algorithm_comparison(batch_results: Dict[str, BatchResult], save_path: str):
+def _error_bars(values, intervals, names, key):
+    # (dưới, trên) khoảng cách từ giá trị tới 2 cận CI, dạng yerr của matplotlib
+    if intervals is None:
+        return None
+    bounds = np.array([getattr(intervals[name], key) for name in names])
+    return np.maximum(np.array([values - bounds[:, 0], bounds[:, 1] - values]), 0.0)
+
+
+def plot_algorithm_comparison(batch_results: Dict[str, BatchResult], save_path: str,
+                              intervals: Dict[str, BootstrapResult] = None):
     fig, axes = plt.subplots(2, 2, figsize=(16, 12))
 
     sorted_results = sorted(batch_results.items(), key=lambda x: -x[1].mean)
@@ -17,11 +26,13 @@ def plot_algorithm_comparison(batch_results: Dict[str, BatchResult], save_path:
 
     offline_mean = batch_results["Offline"].mean
     ratios = [mean / offline_mean for mean in means]
+    error_style = dict(ecolor='black', capsize=4)
 
     # Chart 1: Revenue Bar Chart
     ax1 = axes[0, 0]
     colors = plt.cm.viridis(np.linspace(0, 1, len(names)))
-    bars = ax1.bar(names, means, color=colors, edgecolor='black', linewidth=1.2)
+    bars = ax1.bar(names, means, color=colors, edgecolor='black', linewidth=1.2,
+                   yerr=_error_bars(np.array(means), intervals, names, "mean_ci"), **error_style)
 
     for bar, mean in zip(bars, means):
         height = bar.get_height()
@@ -31,13 +42,15 @@ def plot_algorithm_comparison(batch_results: Dict[str, BatchResult], save_path:
                      ha='center', va='bottom', fontsize=10, fontweight='bold')
 
     ax1.set_ylabel('Mean Revenue ($)', fontsize=12, fontweight='bold')
-    ax1.set_title('Mean Revenue Comparison', fontsize=14, fontweight='bold')
+    ax1.set_title('Mean Revenue Comparison' + (' (95% bootstrap CI)' if intervals else ''),
+                  fontsize=14, fontweight='bold')
     ax1.tick_params(axis='x', rotation=45)
     ax1.grid(True, alpha=0.3, axis='y')
 
     # Chart 2: Competitive Ratio
     ax2 = axes[0, 1]
-    bars = ax2.bar(names, ratios, color=colors, edgecolor='black', linewidth=1.2)
+    bars = ax2.bar(names, ratios, color=colors, edgecolor='black', linewidth=1.2,
+                   yerr=_error_bars(np.array(ratios), intervals, names, "ratio_ci"), **error_style)
     ax2.axhline(y=1.0, color='red', linestyle='--', linewidth=2, label='Optimal')
 
     for bar, ratio in zip(bars, ratios):
@@ -70,7 +83,8 @@ def plot_algorithm_comparison(batch_results: Dict[str, BatchResult], save_path:
     # Chart 4: Standard Deviation
     ax4 = axes[1, 1]
     stds = [batch_results[name].std for name in names]
-    bars = ax4.bar(names, stds, color=colors, edgecolor='black', linewidth=1.2)
+    bars = ax4.bar(names, stds, color=colors, edgecolor='black', linewidth=1.2,
+                   yerr=_error_bars(np.array(stds), intervals, names, "std_ci"), **error_style)
 
     ax4.set_ylabel('Standard Deviation ($)', fontsize=12, fontweight='bold')
     ax4.set_title('Revenue Stability (Lower is Better)', fontsize=14, fontweight='bold')